@@ -20,57 +20,34 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import Any
+import sys
+from typing import TYPE_CHECKING, Any
 
-from .compare import compare_answer_no_html
-from .config import Config
+if TYPE_CHECKING:
+    from .compare import compare_answer_no_html
+    from .config import Config
 
+__all__ = ["Config", "compare_answer_no_html"]
 
-def get_config() -> Config:
-    try:
-        import aqt
 
-        return Config(aqt.mw.addonManager.getConfig(__name__) if aqt.mw else None)
-    except:
-        return Config()
+def __getattr__(name: str) -> Any:
+    # Only load the comparison modules once they are actually needed
+    if name == "compare_answer_no_html":
+        from .compare import compare_answer_no_html
 
+        return compare_answer_no_html
 
-# Load user config
-user_config = get_config()
+    if name == "Config":
+        from .config import Config
 
-# Custom CSS for numeric comparisons
-new_css = "<style>.typePass { background-color: #ffe49b; }</style>"
+        return Config
 
-# Up to Anki 2.1.54
-try:
-    from aqt.reviewer import Reviewer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    def correct(self: Reviewer, given: str, correct: str, **kwargs: Any) -> str:
-        return new_css + compare_answer_no_html(user_config, correct, given)
 
-    Reviewer.correct = correct  # type: ignore
-except:
-    pass
+# Only install hooks if loaded as an add-on, since Anki will already have
+# imported aqt before loading any add-ons
+if "aqt" in sys.modules:
+    from .hooks import install_hooks
 
-# Anki 2.1.56+ (correction was moved to Rust backend)
-try:
-    import aqt
-    from anki.collection import Collection
-    from anki.utils import html_to_text_line
-
-    def compare_answer(self: Collection, expected: str, provided: str) -> str:
-        # Strip AV tags if possible
-        try:
-            if aqt.mw:
-                expected = aqt.mw.col.media.strip_av_tags(expected)
-        except:
-            pass
-
-        # Strip HTML tags
-        expected = html_to_text_line(expected)
-
-        return new_css + compare_answer_no_html(user_config, expected, provided)
-
-    Collection.compare_answer = compare_answer  # type: ignore
-except:
-    pass
+    install_hooks()
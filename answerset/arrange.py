@@ -1,25 +1,149 @@
-from dataclasses import dataclass
-from typing import Optional, Union
+import functools
+from typing import Final, Optional, Union
 
-from .config import Config
-from .diff import Choice, ChoicePair
+from . import stats
+from .budget import Budget
+from .config import Config, casefold_if_ignore_case
+from .diff import Choice, ChoicePair, Diff, compile_text, diff_choice_pairs, numeric_diff
+from .numeric import NumericRange
+from .planner import get_cost_model
+
+# Minimum number of "correct" choices before similar choices are found using
+# an index instead of diffing every pair of choices
+candidate_index_min_choices = 64
+
+# Number of the most similar "correct" choices to diff for each "given" choice
+candidate_count = 8
+
+
+def choice_ngrams(config: Config, text: str) -> set[str]:
+    """Find the character bigrams in an answer choice, including at the start and end."""
+
+    text = " " + casefold_if_ignore_case(text, config.ignore_case) + " "
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+class CandidateIndex:
+    """
+    Index of "correct" choices by their character bigrams, used to quickly find
+    which choices are likely to be the most similar to a "given" choice.
+    """
+
+    __slots__ = "ngram_counts", "correct_by_ngram"
+
+    def __init__(self, config: Config, correct: list[Choice]) -> None:
+        self.ngram_counts: list[int] = []
+        self.correct_by_ngram: dict[str, list[int]] = {}
+
+        for correct_index, (text, _) in enumerate(correct):
+            ngrams = choice_ngrams(config, text)
+            self.ngram_counts.append(len(ngrams))
+            for ngram in ngrams:
+                self.correct_by_ngram.setdefault(ngram, []).append(correct_index)
+
+    def rank(self, config: Config, given: Choice) -> list[int]:
+        """
+        Find the "correct" choices which share any bigrams with a "given" choice,
+        from most to least similar.
+        """
+
+        given_ngrams = choice_ngrams(config, given[0])
+
+        shared: dict[int, int] = {}
+        for ngram in given_ngrams:
+            for correct_index in self.correct_by_ngram.get(ngram, ()):
+                shared[correct_index] = shared.get(correct_index, 0) + 1
+
+        # Sort by Dice coefficient, with ties in the original order
+        return sorted(
+            shared,
+            key=lambda correct_index: (
+                -shared[correct_index] / (len(given_ngrams) + self.ngram_counts[correct_index]),
+                correct_index,
+            ),
+        )
+
+
+class ExactMatches:
+    """Index of "correct" choices by the text which a "given" choice must match exactly."""
+
+    __slots__ = "config", "correct", "correct_by_text"
+
+    def __init__(self, config: Config, correct: list[Choice]) -> None:
+        self.config = config
+        self.correct = correct
+
+        # Comments are only compared if the "given" choice has a comment, so
+        # there is a separate index for each case (created when needed)
+        self.correct_by_text: dict[bool, dict[str, list[int]]] = {}
+
+    def find(self, given: Choice, used_correct: set[int]) -> Optional[int]:
+        """Find the first unused "correct" choice which exactly matches a "given" choice."""
+
+        given_str, given_comment = given
+        has_comment = bool(given_comment)
+
+        index = self.correct_by_text.get(has_comment)
+        if index is None:
+            index = self.correct_by_text[has_comment] = {}
+            for correct_index, (correct_str, correct_comment) in enumerate(self.correct):
+                if has_comment:
+                    correct_str += correct_comment
+
+                key = casefold_if_ignore_case(correct_str, self.config.ignore_case)
+                index.setdefault(key, []).append(correct_index)
+
+        key = casefold_if_ignore_case(given_str + given_comment, self.config.ignore_case)
+        for correct_index in index.get(key, ()):
+            if correct_index not in used_correct:
+                return correct_index
+
+        return None
 
 
-@dataclass(frozen=True)
 class UnmatchedChoice:
+    # Not a frozen dataclass, since mypyc can't compile dataclasses with __slots__
     __slots__ = "is_correct", "choice"
 
-    is_correct: bool
-    choice: Choice
+    def __init__(self, is_correct: bool, choice: Choice) -> None:
+        self.is_correct: Final = is_correct
+        self.choice: Final = choice
 
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, UnmatchedChoice) and self.is_correct == other.is_correct and self.choice == other.choice
 
-class Arranger:
-    __slots__ = "config", "given", "correct", "cached_pairs", "closest_to_given", "assigned_to_given", "used_correct"
+    def __hash__(self) -> int:
+        return hash((self.is_correct, self.choice))
 
-    def __init__(self, config: Config, given: list[Choice], correct: list[Choice]) -> None:
+    def __repr__(self) -> str:
+        return f"UnmatchedChoice(is_correct={self.is_correct!r}, choice={self.choice!r})"
+
+
+class Arranger:
+    __slots__ = (
+        "config",
+        "given",
+        "correct",
+        "budget",
+        "cached_pairs",
+        "closest_to_given",
+        "assigned_to_given",
+        "used_correct",
+        "candidate_index",
+        "ranked_candidates",
+    )
+
+    def __init__(
+        self,
+        config: Config,
+        given: list[Choice],
+        correct: list[Choice],
+        budget: Optional[Budget] = None,
+    ) -> None:
         self.config = config
         self.given = given
         self.correct = correct
+        self.budget = budget
 
         # ChoicePairs are created when needed to avoid doing unnecessary work
         self.cached_pairs: dict[tuple[int, int], ChoicePair] = {}
@@ -36,16 +160,36 @@ class Arranger:
         # Set of already used "correct" choices
         self.used_correct: set[int] = set()
 
+        # With many "correct" choices, only the most similar ones are diffed.
+        # This is an approximation, since the closest choice may not be one of
+        # the most similar ones by bigrams.
+        self.candidate_index = CandidateIndex(config, correct) if len(correct) >= candidate_index_min_choices else None
+        self.ranked_candidates: dict[int, list[int]] = {}
+
     def get_choice_pair(self, given_index: int, correct_index: int) -> ChoicePair:
         """Find the ChoicePair for a "given" part and a "correct" part."""
 
         if (given_index, correct_index) in self.cached_pairs:
+            if stats.current is not None:
+                stats.current.cache_hits["choice_pair"] += 1
+
             return self.cached_pairs[(given_index, correct_index)]
 
-        pair = ChoicePair(self.config, self.given[given_index], self.correct[correct_index])
+        pair = ChoicePair(self.config, self.given[given_index], self.correct[correct_index], self.budget)
         self.cached_pairs[(given_index, correct_index)] = pair
         return pair
 
+    def diff_choice_pairs(self, given_index: int, correct_indices: list[int]) -> None:
+        """Find the diffs for a "given" part and many "correct" parts at once."""
+
+        pairs = [self.get_choice_pair(given_index, correct_index) for correct_index in correct_indices]
+        pairs = [pair for pair in pairs if pair.cached_diff is None]
+
+        # Sharing work between choices with the same prefix only pays off
+        # once there are enough of them
+        if len(pairs) >= get_cost_model().choice_trie_min_pairs:
+            diff_choice_pairs(self.config, pairs, self.budget)
+
     def assign_to_closest(self, given_index: int) -> None:
         """Make the final assignment for a "given" part."""
 
@@ -66,21 +210,57 @@ class Arranger:
     def assign_exact_matches(self) -> None:
         """Assign all exact matches."""
 
-        for given_index in range(len(self.given)):
+        exact_matches = ExactMatches(self.config, self.correct)
+
+        for given_index, given_choice in enumerate(self.given):
             if self.is_finished():
                 break
 
-            for correct_index in range(len(self.correct)):
-                if correct_index in self.used_correct:
-                    continue
+            correct_index = exact_matches.find(given_choice, self.used_correct)
+            if correct_index is not None:
+                self.get_choice_pair(given_index, correct_index)
+                self.closest_to_given[given_index] = correct_index
+                self.assign_to_closest(given_index)
+
+    def closest_candidate_for(self, candidate_index: CandidateIndex, given_index: int) -> Optional[int]:
+        """
+        Find the closest "correct" part among the most similar candidates from
+        the index. Returns None if none of the candidates are close enough.
+        """
 
-                pair = self.get_choice_pair(given_index, correct_index)
+        ranked = self.ranked_candidates.get(given_index)
+        if ranked is None:
+            ranked = self.ranked_candidates[given_index] = candidate_index.rank(self.config, self.given[given_index])
 
-                if pair.is_exact_match():
-                    self.closest_to_given[given_index] = correct_index
-                    self.assign_to_closest(given_index)
+        candidates = []
+        for correct_index in ranked:
+            if correct_index not in self.used_correct:
+                candidates.append(correct_index)
+                if len(candidates) == candidate_count:
                     break
 
+        # Check candidates in their original order so ties are broken the
+        # same way as when checking every "correct" part
+        candidates.sort()
+        self.diff_choice_pairs(given_index, candidates)
+
+        closest = None
+        closest_choice_pair: Optional[ChoicePair] = None
+        for correct_index in candidates:
+            pair = self.get_choice_pair(given_index, correct_index)
+            if pair.is_better_than(closest_choice_pair):
+                closest = correct_index
+                closest_choice_pair = pair
+
+        # If less than half of the "given" part matches, check every part
+        if closest_choice_pair is None or closest_choice_pair.diff().matched_count * 2 < len(closest_choice_pair.given):
+            return None
+
+        if self.budget:
+            self.budget.stages.add("candidate_index")
+
+        return closest
+
     def best_choice_pair_for(self, given_index: int) -> Optional[ChoicePair]:
         """Find the best ChoicePair for a specific "given" part."""
 
@@ -88,14 +268,21 @@ class Arranger:
         if given_index in self.closest_to_given and self.closest_to_given[given_index] not in self.used_correct:
             return self.get_choice_pair(given_index, self.closest_to_given[given_index])
 
+        # Try to find the closest "correct" part using the index first
+        if self.candidate_index is not None:
+            closest = self.closest_candidate_for(self.candidate_index, given_index)
+            if closest is not None:
+                self.closest_to_given[given_index] = closest
+                return self.get_choice_pair(given_index, closest)
+
+        # Skip "correct" parts which were already used
+        unused_correct = [correct_index for correct_index in range(len(self.correct)) if correct_index not in self.used_correct]
+        self.diff_choice_pairs(given_index, unused_correct)
+
         # Find the closest "correct" part
         closest = None
         closest_choice_pair: Optional[ChoicePair] = None
-        for correct_index in range(len(self.correct)):
-            # Skip "correct" parts which were already used
-            if correct_index in self.used_correct:
-                continue
-
+        for correct_index in unused_correct:
             pair = self.get_choice_pair(given_index, correct_index)
             if pair.is_better_than(closest_choice_pair):
                 closest = correct_index
@@ -153,10 +340,182 @@ class Arranger:
         return parts
 
 
-def arrange(config: Config, given: list[Choice], correct: list[Choice]) -> list[Union[ChoicePair, UnmatchedChoice]]:
+def find_plain_number(config: Config, text: str, is_correct: bool) -> Optional[NumericRange]:
+    """Find the numeric range for an answer choice if it is only a number."""
+
+    compiled = compile_text(config, text, is_correct)
+    if len(compiled.numeric_ranges) != 1:
+        return None
+
+    (numeric_range,) = compiled.numeric_ranges.values()
+    if numeric_range.start_index != 0 or numeric_range.end_index != len(compiled.chars):
+        return None
+
+    return numeric_range
+
+
+def compare_diffs(a: Diff, b: Diff) -> int:
+    """Compare diffs for sorting, with better diffs first."""
+
+    if a.is_better_than(b):
+        return -1
+    elif b.is_better_than(a):
+        return 1
+    else:
+        return 0
+
+
+# Sort key which puts better diffs first
+diff_order = functools.cmp_to_key(compare_diffs)
+
+
+def arrange_numbers(
+    config: Config,
+    given: list[Choice],
+    correct: list[Choice],
+    budget: Optional[Budget] = None,
+) -> Optional[list[Union[ChoicePair, UnmatchedChoice]]]:
+    """
+    Rearrange parts without diffing each character if every part is a plain
+    number, giving the same result as diffing every pair of parts. Returns
+    None if any part isn't a plain number.
+    """
+
+    # Comments would be compared as part of the answer, so they aren't numbers
+    if not given or not correct or any(comment for _, comment in given):
+        return None
+
+    given_numbers = []
+    for text, _ in given:
+        given_number = find_plain_number(config, text, False)
+        if given_number is None:
+            return None
+
+        given_numbers.append(given_number)
+
+    correct_numbers = []
+    for text, _ in correct:
+        correct_number = find_plain_number(config, text, True)
+        if correct_number is None:
+            return None
+
+        correct_numbers.append(correct_number)
+
+    assigned_to_given: dict[int, int] = {}
+    used_correct: set[int] = set()
+
+    # Assign exact matches first, the same way as the Arranger
+    exact_matches = ExactMatches(config, correct)
+    for given_index, given_choice in enumerate(given):
+        if len(used_correct) == len(correct):
+            break
+
+        correct_index = exact_matches.find(given_choice, used_correct)
+        if correct_index is not None:
+            assigned_to_given[given_index] = correct_index
+            used_correct.add(correct_index)
+
+    # The Arranger assigns the pair with the best diff until there are none
+    # left, with ties going to the first "given" part and then the first
+    # "correct" part. The diff of two numbers doesn't depend on the other
+    # pairs, so sorting every pair once gives the same order. Closer values
+    # can't be used to skip pairs, since a pair with more matched digits is
+    # better even if its values are further apart.
+    pairs = [
+        (numeric_diff(config, given_numbers[given_index], correct_numbers[correct_index]), given_index, correct_index)
+        for given_index in range(len(given))
+        if given_index not in assigned_to_given
+        for correct_index in range(len(correct))
+        if correct_index not in used_correct
+    ]
+    pairs.sort(key=lambda pair: diff_order(pair[0]))
+
+    numeric_diffs: dict[int, Diff] = {}
+    for pair_diff, given_index, correct_index in pairs:
+        if given_index in assigned_to_given or correct_index in used_correct:
+            continue
+
+        assigned_to_given[given_index] = correct_index
+        used_correct.add(correct_index)
+        numeric_diffs[given_index] = pair_diff
+
+    # Put "given" parts and their matching "correct" parts first
+    parts: list[Union[ChoicePair, UnmatchedChoice]] = []
+    for given_index in range(len(given)):
+        if given_index not in assigned_to_given:
+            parts.append(UnmatchedChoice(False, given[given_index]))
+            continue
+
+        pair = ChoicePair(config, given[given_index], correct[assigned_to_given[given_index]], budget)
+        if given_index in numeric_diffs and not pair.is_exact_match():
+            pair.cached_diff = numeric_diffs[given_index]
+
+        parts.append(pair)
+
+    # Put all unused "correct" parts after
+    for correct_index in range(len(correct)):
+        if correct_index not in used_correct:
+            parts.append(UnmatchedChoice(True, correct[correct_index]))
+
+    if budget:
+        budget.stages.add("numeric_arrange")
+
+    return parts
+
+
+def arrange_exact_matches(config: Config, given: list[Choice], correct: list[Choice]) -> Optional[list[int]]:
+    """
+    Find the "correct" part for each "given" part if the parts are the same
+    except for their order, matching them the same way as arrange(). Returns
+    None if any part doesn't match exactly.
+    """
+
+    if len(given) != len(correct):
+        return None
+
+    exact_matches = ExactMatches(config, correct)
+    used_correct: set[int] = set()
+    assigned = []
+    for given_choice in given:
+        correct_index = exact_matches.find(given_choice, used_correct)
+        if correct_index is None:
+            return None
+
+        used_correct.add(correct_index)
+        assigned.append(correct_index)
+
+    # Parts which are all numbers are arranged by arrange_numbers() instead
+    if all(find_plain_number(config, text, True) is not None for text, _ in correct):
+        return None
+
+    return assigned
+
+
+def arrange(
+    config: Config,
+    given: list[Choice],
+    correct: list[Choice],
+    budget: Optional[Budget] = None,
+) -> list[Union[ChoicePair, UnmatchedChoice]]:
     """Rearrange parts so that similar ones line up."""
 
-    arranger = Arranger(config, given, correct)
+    # If every part is a number, they can be matched without diffing each character
+    numeric_parts = arrange_numbers(config, given, correct, budget)
+    if numeric_parts is not None:
+        return numeric_parts
+
+    return arrange_by_diff(config, given, correct, budget)
+
+
+def arrange_by_diff(
+    config: Config,
+    given: list[Choice],
+    correct: list[Choice],
+    budget: Optional[Budget] = None,
+) -> list[Union[ChoicePair, UnmatchedChoice]]:
+    """Rearrange parts so that similar ones line up, diffing the parts to find which are most similar."""
+
+    arranger = Arranger(config, given, correct, budget)
     arranger.assign_exact_matches()
     while arranger.step():
         pass
@@ -0,0 +1,360 @@
+"""
+Find answer keys which are slow to check or which don't parse as expected.
+
+Usage: python -m answerset.audit [options] <collection.anki2 | notes.txt>
+
+A collection file is read directly (Anki should be closed first), and every
+note field used by a non-cloze "type in the answer" template is audited. For a
+plain text export of notes, the answer column has to be given instead.
+"""
+
+import argparse
+import csv
+import functools
+import html
+import json
+import os
+import re
+import sqlite3
+import sys
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, astuple, dataclass
+from pathlib import Path
+from typing import Any, Optional, TextIO
+
+from . import util
+from .compare import compile_answer
+from .config import Config
+from .diff import compile_text, ends_with
+from .hooks import type_field_re
+
+# Separator between the fields of a note in the collection
+field_separator = "\x1f"
+
+# Separators named by the "#separator:" header of a text export
+export_separators = {
+    "tab": "\t",
+    "comma": ",",
+    "semicolon": ";",
+    "pipe": "|",
+    "space": " ",
+    "colon": ":",
+}
+
+# Matches the tags which Anki strips from expected answers
+av_tag_re = re.compile(r"\[sound:[^\]]*\]|\[anki:tts[^\]]*\].*?\[/anki:tts\]")
+html_line_break_re = re.compile(r"<br\s*/?>|<div>|\n", re.IGNORECASE)
+html_tag_re = re.compile(r"<[^>]*>")
+
+
+@dataclass(frozen=True)
+class AnswerSource:
+    __slots__ = "note_id", "field", "raw"
+
+    # ID of the note in the collection, or line number in a text export
+    note_id: int
+
+    # Name of the field, or column number in a text export
+    field: str
+
+    # Field contents before stripping tags
+    raw: str
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Frozen dataclasses with slots can't be unpickled by default
+        return AnswerSource, astuple(self)
+
+
+@dataclass(frozen=True)
+class AnswerReport:
+    __slots__ = (
+        "note_id",
+        "field",
+        "answer",
+        "graphemes",
+        "choices",
+        "jumps",
+        "equivalence_hits",
+        "estimated_cells",
+        "problems",
+    )
+
+    note_id: int
+    field: str
+
+    # Expected answer after stripping tags
+    answer: str
+
+    # Number of grapheme clusters in the answer choices
+    graphemes: int
+
+    # Number of answer choices after splitting on the separator
+    choices: int
+
+    # Number of lenient validation jumps over brackets and alternatives
+    jumps: int
+
+    # Number of places where an equivalent string could be matched
+    equivalence_hits: int
+
+    # Number of diff cells to check a given answer of the same size
+    estimated_cells: int
+
+    # Descriptions of anything which didn't parse as expected
+    problems: tuple[str, ...]
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return AnswerReport, astuple(self)
+
+
+def strip_tags(expected: str) -> str:
+    """Strip AV and HTML tags like Anki does when checking an answer."""
+
+    expected = av_tag_re.sub("", expected)
+    expected = html_line_break_re.sub(" ", expected)
+    expected = html_tag_re.sub("", expected)
+    return html.unescape(expected).replace("\xa0", " ").strip()
+
+
+def count_equivalence_hits(config: Config, chars: list[str]) -> int:
+    hits = 0
+    for end in range(1, len(chars) + 1):
+        for equivalent, _ in config.equivalent_strings_index.get(chars[end - 1], ()):
+            if ends_with(chars, end, equivalent):
+                hits += 1
+
+    return hits
+
+
+def audit_answer(config: Config, source: AnswerSource) -> AnswerReport:
+    """Compile an answer and measure how expensive it will be to check."""
+
+    answer = strip_tags(source.raw)
+    compiled = compile_answer(config, answer)
+
+    graphemes = 0
+    jumps = 0
+    equivalence_hits = 0
+    diff_size = 0
+    problems = []
+
+    for text, comment in compiled.choices:
+        compiled_text = compile_text(config, text + comment, True)
+        length = len(compiled_text.chars)
+
+        graphemes += length
+        jumps += sum(len(starts) for starts in compiled_text.jumps.values())
+        equivalence_hits += count_equivalence_hits(config, compiled_text.chars)
+
+        # Every choice of the given answer is compared with every correct choice
+        diff_size += length + 1
+
+    if any(ch in config.bracket_char_set for ch in compiled.text) and not util.find_bracket_ranges(compiled.text):
+        problems.append("unbalanced brackets")
+
+    return AnswerReport(
+        source.note_id,
+        source.field,
+        answer,
+        graphemes,
+        len(compiled.choices),
+        jumps,
+        equivalence_hits,
+        diff_size * diff_size,
+        tuple(problems),
+    )
+
+
+def read_varint(data: bytes, position: int) -> tuple[int, int]:
+    """Read a protocol buffer varint, returning its value and the next position."""
+
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, position
+
+
+def decode_template_question(config: bytes) -> str:
+    """Find the question format in a card template config from the collection."""
+
+    # The config is a protocol buffer message, with the question format as
+    # the first field. Only the wire format needs to be understood to find it.
+    position = 0
+    while position < len(config):
+        key, position = read_varint(config, position)
+        field_number, wire_type = key >> 3, key & 7
+
+        if wire_type == 0:
+            _, position = read_varint(config, position)
+        elif wire_type == 1:
+            position += 8
+        elif wire_type == 2:
+            length, position = read_varint(config, position)
+            if field_number == 1:
+                return config[position : position + length].decode("utf-8")
+            position += length
+        elif wire_type == 5:
+            position += 4
+        else:
+            break
+
+    return ""
+
+
+def read_type_fields(db: sqlite3.Connection) -> dict[int, list[tuple[int, str]]]:
+    """Find the index and name of each "type in the answer" field by notetype ID."""
+
+    tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    field_names: dict[int, dict[str, int]] = {}
+    questions: dict[int, list[str]] = {}
+
+    if "notetypes" in tables:
+        for notetype_id, ordinal, name in db.execute("SELECT ntid, ord, name FROM fields"):
+            field_names.setdefault(notetype_id, {})[name] = ordinal
+
+        for notetype_id, config in db.execute("SELECT ntid, config FROM templates ORDER BY ntid, ord"):
+            questions.setdefault(notetype_id, []).append(decode_template_question(config))
+    else:
+        # Older collections store notetypes as JSON
+        (models,) = db.execute("SELECT models FROM col").fetchone()
+        for notetype_id, model in json.loads(models or "{}").items():
+            field_names[int(notetype_id)] = {field["name"]: field["ord"] for field in model["flds"]}
+            questions[int(notetype_id)] = [template["qfmt"] for template in model["tmpls"]]
+
+    type_fields: dict[int, list[tuple[int, str]]] = {}
+    for notetype_id, notetype_questions in questions.items():
+        names = field_names.get(notetype_id, {})
+        found = type_fields.setdefault(notetype_id, [])
+        for question in notetype_questions:
+            match = type_field_re.search(question)
+            if match and match[1] in names and (names[match[1]], match[1]) not in found:
+                found.append((names[match[1]], match[1]))
+
+    return type_fields
+
+
+def read_collection(path: str) -> Iterator[AnswerSource]:
+    """Read the "type in the answer" fields of every note in a collection."""
+
+    # Open read-only so that the collection can't be modified by accident
+    db = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        type_fields = read_type_fields(db)
+        for note_id, notetype_id, fields in db.execute("SELECT id, mid, flds FROM notes ORDER BY id"):
+            values = fields.split(field_separator)
+            for ordinal, name in type_fields.get(notetype_id, ()):
+                if ordinal < len(values) and values[ordinal]:
+                    yield AnswerSource(note_id, name, values[ordinal])
+    finally:
+        db.close()
+
+
+def read_export(file: TextIO, column: int) -> Iterator[AnswerSource]:
+    """Read one column of every note in a plain text export of notes."""
+
+    separator = "\t"
+    lines: list[str] = []
+    for line in file:
+        # Headers at the start of the file describe the format
+        if line.startswith("#") and not lines:
+            name, _, value = line[1:].strip().partition(":")
+            if name == "separator":
+                separator = export_separators.get(value.lower(), value)
+
+            lines.append("")
+            continue
+
+        lines.append(line)
+
+    for line_number, row in enumerate(csv.reader(lines, delimiter=separator), 1):
+        if column <= len(row) and row[column - 1]:
+            yield AnswerSource(line_number, str(column), row[column - 1])
+
+
+def audit_answers(config: Config, sources: Iterable[AnswerSource], jobs: int = 1) -> list[AnswerReport]:
+    """Audit many answers, using a pool of processes if there is more than one job."""
+
+    audit = functools.partial(audit_answer, config)
+
+    if jobs <= 1:
+        return [audit(source) for source in sources]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(audit, sources, chunksize=64))
+
+
+def load_config(path: Optional[str]) -> Config:
+    """Load the config from a config.json file or from the add-on's meta.json file."""
+
+    if not path:
+        return Config()
+
+    with open(path, encoding="utf-8") as file:
+        config: Any = json.load(file)
+
+    # Anki saves the user's config in meta.json with other add-on metadata
+    if isinstance(config, dict) and isinstance(config.get("config"), dict):
+        config = config["config"]
+
+    return Config(config)
+
+
+def write_report(output: TextIO, reports: list[AnswerReport], limit: int) -> None:
+    output.write(f"Audited {len(reports)} answers.\n")
+
+    expensive = sorted(reports, key=lambda report: report.estimated_cells, reverse=True)[:limit]
+    if expensive:
+        output.write("\nMost expensive answers:\n")
+        output.write(f"{'cells':>12} {'graphemes':>9} {'choices':>7} {'jumps':>5} {'equiv':>5}  note / field / answer\n")
+        for report in expensive:
+            output.write(
+                f"{report.estimated_cells:>12} {report.graphemes:>9} {report.choices:>7} {report.jumps:>5} "
+                f"{report.equivalence_hits:>5}  {report.note_id} / {report.field} / {report.answer[:60]}\n",
+            )
+
+    problems = [report for report in reports if report.problems]
+    if problems:
+        output.write("\nAnswers which don't parse as expected:\n")
+        for report in problems:
+            output.write(f"{report.note_id} / {report.field} / {report.answer[:60]}: {', '.join(report.problems)}\n")
+
+
+def main(argv: Optional[list[str]] = None, output: TextIO = sys.stdout) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m answerset.audit",
+        description="Find answer keys which are slow to check or which don't parse as expected.",
+    )
+    parser.add_argument("path", help="collection.anki2 file or plain text export of notes")
+    parser.add_argument("--config", help="config.json or the add-on's meta.json (default: default config)")
+    parser.add_argument("--column", type=int, default=2, help="answer column in a text export (default: 2)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="number of processes (default: all CPUs)")
+    parser.add_argument("--limit", type=int, default=20, help="number of expensive answers to show (default: 20)")
+    parser.add_argument("--json", action="store_true", help="write every report as a line of JSON instead")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+
+    if args.path.endswith((".anki2", ".anki21")):
+        reports = audit_answers(config, read_collection(args.path), args.jobs)
+    else:
+        with open(args.path, encoding="utf-8", newline="") as file:
+            reports = audit_answers(config, read_export(file, args.column), args.jobs)
+
+    if args.json:
+        for report in reports:
+            output.write(json.dumps(asdict(report), ensure_ascii=False) + "\n")
+    else:
+        write_report(output, reports, args.limit)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
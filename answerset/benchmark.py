@@ -0,0 +1,370 @@
+"""
+Check that comparing answers hasn't become slower than a saved baseline.
+
+Usage: python -m answerset.benchmark <baseline.json> [--update] [--tolerance 1.5]
+
+Each scenario times diff(), arrange(), or compare_answer_no_html() on a fixed
+corpus of random answers, and measures the peak memory allocated while running
+it. Times are divided by the time of a fixed amount of plain Python work, so
+that a baseline saved on one computer can be checked on another. Scenarios
+with long answers also have a fixed limit on their peak memory.
+
+Different versions of Python speed up the scenarios and the calibration work
+by different amounts, so the baseline has to be saved with the same version
+of Python that checks it. The exit status is 1 if any measurement grew beyond
+its tolerance, and 2 without measuring anything if the baseline was saved with
+a different version of Python.
+
+The report lists which modules were compiled with mypyc (see "make mypyc"),
+since compiled modules are much faster than the baseline in pure Python.
+"""
+
+import argparse
+import gc
+import importlib
+import json
+import random
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import Any, Optional, TextIO
+
+from .arrange import arrange
+from .compare import compare_answer_no_html
+from .config import Config
+from .diff import compile_text, diff
+from .fuzz import mutate_answer, random_answer, random_config
+from .group import group_combining
+
+# Seed for the corpus, which has to stay the same for baselines to be comparable
+benchmark_seed = 0
+
+# Allowed slowdown compared to the baseline before a scenario fails
+default_time_tolerance = 1.5
+
+# Allowed growth in peak memory compared to the baseline before a scenario fails
+default_memory_tolerance = 1.25
+
+# Most peak memory in KiB which some scenarios may use regardless of the
+# baseline, so that long answers and long lists of answer choices can still be
+# checked on devices with little memory. Sizes on 32-bit devices are smaller.
+memory_ceilings = {
+    "long_answer": 192.0,
+    "many_choices": 512.0,
+}
+
+# Modules which can be compiled with mypyc, and fall back to pure Python otherwise
+compiled_module_names = [
+    "answerset.arrange",
+    "answerset.diff",
+    "answerset.group",
+    "answerset.numeric",
+    "answerset.util",
+]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    __slots__ = "name", "run"
+
+    name: str
+
+    # Does all of the work for the scenario once
+    run: Callable[[], object]
+
+
+@dataclass(frozen=True)
+class Measurement:
+    __slots__ = "relative_time", "peak_kib"
+
+    # Fastest time to run the scenario, divided by the time for the calibration work
+    relative_time: float
+
+    # Peak memory allocated while running the scenario, in KiB
+    peak_kib: float
+
+
+@dataclass(frozen=True)
+class Regression:
+    __slots__ = "scenario", "metric", "baseline", "current"
+
+    scenario: str
+
+    # Name of the measurement which grew too much
+    metric: str
+
+    baseline: float
+    current: float
+
+
+def calibration_work() -> int:
+    """Plain Python work similar to filling in a diff table, used as the unit of time."""
+
+    total = 0
+    rows: dict[int, list[int]] = {}
+    for i in range(20000):
+        row = rows.setdefault(i % 64, [0, 0])
+        row.append(i)
+        total += len(row) + row[-2]
+        if len(row) > 8:
+            del row[2:]
+
+    return total
+
+
+def build_scenarios(seed: int = benchmark_seed) -> list[Scenario]:
+    """Build the scenarios with answers generated from a seed."""
+
+    rng = random.Random(seed)
+
+    # Limit the size of comparisons like users with very long answers would
+    config = Config({"Comparison Size Limit": 100000})
+
+    def pairs(count: int, max_pieces: int) -> list[tuple[Config, str, str]]:
+        result = []
+        for _ in range(count):
+            pair_config = random_config(rng)
+            correct = random_answer(rng, max_pieces)
+            result.append((pair_config, mutate_answer(rng, correct), correct))
+        return result
+
+    def choices(count: int) -> list[tuple[str, str]]:
+        return [(random_answer(rng, 2), "") for _ in range(count)]
+
+    short_pairs = pairs(60, 6)
+    long_pairs = pairs(2, 30)
+
+    arrange_cases = []
+    for count in [4, 12, 30]:
+        correct = choices(count)
+        given = [(mutate_answer(rng, text), comment) for text, comment in correct]
+        rng.shuffle(given)
+        arrange_cases.append((given, correct))
+
+    compare_pairs = []
+    for _ in range(40):
+        correct_answer = ", ".join(text for text, _ in choices(rng.randint(1, 6)))
+        compare_pairs.append((correct_answer, mutate_answer(rng, correct_answer)))
+
+    # A single answer choice of about 200 characters
+    long_config = Config({"Separators": ""})
+    long_correct = " ".join(random_answer(rng) for _ in range(10))
+    long_given = mutate_answer(rng, long_correct)
+
+    # Enough answer choices to use the candidate index
+    many_correct = [text for text, _ in choices(64)]
+    many_correct_answer = ", ".join(many_correct)
+    many_given_answer = ", ".join(mutate_answer(rng, text) for text in rng.sample(many_correct, len(many_correct)))
+
+    def run_diffs(cases: list[tuple[Config, str, str]]) -> Callable[[], object]:
+        grouped = [(case_config, group_combining(given), group_combining(correct)) for case_config, given, correct in cases]
+        return lambda: [diff(case_config, given, correct) for case_config, given, correct in grouped]
+
+    return [
+        Scenario("diff_short", run_diffs(short_pairs)),
+        Scenario("diff_long", run_diffs(long_pairs)),
+        Scenario("arrange", lambda: [arrange(config, given, correct) for given, correct in arrange_cases]),
+        Scenario("compare_answer", lambda: [compare_answer_no_html(config, correct, given) for correct, given in compare_pairs]),
+        Scenario("long_answer", lambda: compare_answer_no_html(long_config, long_correct, long_given)),
+        Scenario("many_choices", lambda: compare_answer_no_html(config, many_correct_answer, many_given_answer)),
+    ]
+
+
+def best_time(run: Callable[[], object], repeats: int) -> float:
+    """Find the fastest time to run something, starting without any compiled texts each time."""
+
+    # Garbage collection would make the times depend on everything else in memory
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+
+    best = float("inf")
+    try:
+        for _ in range(repeats):
+            compile_text.cache_clear()
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return best
+
+
+def peak_kib(run: Callable[[], object]) -> float:
+    """Find the peak memory allocated while running something."""
+
+    compile_text.cache_clear()
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+
+    return (peak - start) / 1024
+
+
+def measure_scenarios(scenarios: list[Scenario], repeats: int = 5) -> dict[str, Measurement]:
+    """Measure every scenario relative to the calibration work."""
+
+    # Time the calibration work next to each scenario, so that a slow moment doesn't change the unit of time
+    unit = best_time(calibration_work, repeats)
+    times = {}
+    for scenario in scenarios:
+        times[scenario.name] = best_time(scenario.run, repeats)
+        unit = min(unit, best_time(calibration_work, repeats))
+
+    return {
+        scenario.name: Measurement(times[scenario.name] / unit, peak_kib(scenario.run)) for scenario in scenarios
+    }
+
+
+def is_compiled(name: str) -> bool:
+    """Check if a module was imported from an extension module instead of its source."""
+
+    return not str(importlib.import_module(name).__file__).endswith(".py")
+
+
+def compiled_modules() -> list[str]:
+    return [name for name in compiled_module_names if is_compiled(name)]
+
+
+def python_version() -> str:
+    return f"{sys.version_info.major}.{sys.version_info.minor}"
+
+
+def load_baseline(path: str) -> tuple[str, dict[str, Measurement]]:
+    """Load a baseline, returning the Python version it was saved with and its measurements."""
+
+    with open(path, encoding="utf-8") as file:
+        values = json.load(file)
+
+    return values["python"], {name: Measurement(**measurement) for name, measurement in values["scenarios"].items()}
+
+
+def save_baseline(path: str, measurements: dict[str, Measurement]) -> None:
+    values: dict[str, Any] = {
+        "python": python_version(),
+        "scenarios": {
+            name: {metric: float(f"{value:.4g}") for metric, value in asdict(measurement).items()}
+            for name, measurement in measurements.items()
+        },
+    }
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(values, file, indent=4)
+        file.write("\n")
+
+
+def find_regressions(
+    baseline: dict[str, Measurement],
+    current: dict[str, Measurement],
+    time_tolerance: float = default_time_tolerance,
+    memory_tolerance: float = default_memory_tolerance,
+) -> list[Regression]:
+    """Find scenarios which became slower or used more memory than allowed."""
+
+    regressions = []
+    for name, measurement in current.items():
+        ceiling = memory_ceilings.get(name)
+        if ceiling is not None and measurement.peak_kib > ceiling:
+            regressions.append(Regression(name, "memory ceiling", ceiling, measurement.peak_kib))
+
+        old = baseline.get(name)
+        if old is None:
+            continue
+
+        if measurement.relative_time > old.relative_time * time_tolerance:
+            regressions.append(Regression(name, "time", old.relative_time, measurement.relative_time))
+
+        if measurement.peak_kib > old.peak_kib * memory_tolerance:
+            regressions.append(Regression(name, "memory", old.peak_kib, measurement.peak_kib))
+
+    return regressions
+
+
+def write_report(
+    output: TextIO,
+    baseline: dict[str, Measurement],
+    current: dict[str, Measurement],
+    regressions: list[Regression],
+) -> None:
+    output.write(f"{'scenario':<16} {'time':>8} {'baseline':>8} {'memory':>10} {'baseline':>10}\n")
+    for name, measurement in current.items():
+        old = baseline.get(name)
+        old_time = f"{old.relative_time:>8.1f}" if old else f"{'-':>8}"
+        old_memory = f"{old.peak_kib:>8.0f}KiB" if old else f"{'-':>10}"
+        output.write(f"{name:<16} {measurement.relative_time:>8.1f} {old_time} {measurement.peak_kib:>7.0f}KiB {old_memory}\n")
+
+    if regressions:
+        output.write(f"\n{len(regressions)} measurements grew beyond the tolerance:\n")
+        for regression in regressions:
+            ratio = regression.current / regression.baseline if regression.baseline > 0.0 else float("inf")
+            output.write(
+                f"{regression.scenario}: {regression.metric} grew {ratio:.2f}x "
+                f"({regression.baseline:.1f} -> {regression.current:.1f})\n",
+            )
+    else:
+        output.write("\nNo regressions.\n")
+
+
+def main(argv: Optional[list[str]] = None, output: TextIO = sys.stdout) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m answerset.benchmark",
+        description="Check that comparing answers hasn't become slower than a saved baseline.",
+    )
+    parser.add_argument("baseline", help="baseline file to check against or to update")
+    parser.add_argument("--update", action="store_true", help="save the current measurements as the baseline")
+    parser.add_argument("--repeats", type=int, default=5, help="number of times to time each scenario (default: 5)")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=default_time_tolerance,
+        help=f"allowed slowdown before failing (default: {default_time_tolerance})",
+    )
+    parser.add_argument(
+        "--memory-tolerance",
+        type=float,
+        default=default_memory_tolerance,
+        help=f"allowed growth in peak memory before failing (default: {default_memory_tolerance})",
+    )
+    args = parser.parse_args(argv)
+
+    if args.update:
+        current = measure_scenarios(build_scenarios(), args.repeats)
+        save_baseline(args.baseline, current)
+        write_report(output, current, current, [])
+        output.write(f"Saved to {args.baseline}\n")
+        return 0
+
+    # Relative times and memory use depend on the version of Python, so it needs its own baseline
+    version, baseline = load_baseline(args.baseline)
+    if version != python_version():
+        output.write(
+            f"The baseline was saved with Python {version}, but this is Python {python_version()}, "
+            "so the results can't be compared. Run \"make benchmark-baseline\" to save a new baseline.\n",
+        )
+        return 2
+
+    current = measure_scenarios(build_scenarios(), args.repeats)
+    regressions = find_regressions(baseline, current, args.tolerance, args.memory_tolerance)
+    write_report(output, baseline, current, regressions)
+
+    compiled = compiled_modules()
+    if compiled:
+        output.write(f"Compiled with mypyc: {', '.join(compiled)}\n")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
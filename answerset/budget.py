@@ -0,0 +1,78 @@
+import time
+from typing import Optional
+
+from .config import Config
+from .planner import is_over_budget
+
+
+class BudgetExceeded(Exception):
+    """Raised by diff() when the deadline for a comparison has passed."""
+
+
+class Budget:
+    """
+    Limits the amount of work done for a single comparison. Once either the
+    size limit or the deadline is exceeded, the comparison is marked as
+    degraded and any remaining diffs are done with a cheaper strategy.
+    """
+
+    __slots__ = "remaining_cells", "spent_cells", "deadline", "degraded", "stages"
+
+    def __init__(self, max_cells: int = 0, max_seconds: float = 0.0) -> None:
+        # Number of diff cells which can still be computed (None is unlimited)
+        self.remaining_cells: Optional[int] = max_cells if max_cells > 0 else None
+
+        # Number of diff cells which were reserved so far
+        self.spent_cells = 0
+
+        # Time after which no more full diffs should be computed (None is unlimited)
+        self.deadline: Optional[float] = time.monotonic() + max_seconds if max_seconds > 0.0 else None
+
+        # Whether a cheaper strategy had to be used at any point
+        self.degraded = False
+
+        # Names of the optional stages which were used, for recording timings
+        self.stages: set[str] = set()
+
+    @staticmethod
+    def from_config(config: Config) -> "Budget":
+        return Budget(config.comparison_size_limit, config.comparison_time_limit)
+
+    def is_expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def remaining_seconds(self) -> Optional[float]:
+        return self.deadline - time.monotonic() if self.deadline is not None else None
+
+    def spend(self, cells: int, seconds: float = 0.0) -> bool:
+        """
+        Reserve cells for a full diff which is estimated to take some number of
+        seconds. Returns False and marks the comparison as degraded if there
+        isn't enough budget left.
+        """
+
+        if self.degraded:
+            return False
+
+        if self.is_expired() or (self.remaining_cells is not None and cells > self.remaining_cells):
+            self.degraded = True
+            return False
+
+        # Don't start a diff which won't finish in time
+        if is_over_budget(seconds, self.remaining_seconds()):
+            self.degraded = True
+            self.stages.add("planned_quick")
+            return False
+
+        if self.remaining_cells is not None:
+            self.remaining_cells -= cells
+
+        self.spent_cells += cells
+        return True
+
+    def check_deadline(self) -> None:
+        """Stop a diff which is in progress if the deadline has passed."""
+
+        if self.is_expired():
+            self.degraded = True
+            raise BudgetExceeded
@@ -1,12 +1,15 @@
 import html
 import re
 import unicodedata as ucd
-from typing import Optional
+from dataclasses import dataclass, replace
+from typing import Optional, Union
 
 from . import util
-from .arrange import arrange
-from .config import Config
-from .diff import Choice, ChoicePair, ErrorKind, empty_choice
+from .arrange import UnmatchedChoice, arrange, arrange_exact_matches
+from .budget import Budget
+from .config import Config, casefold_if_ignore_case
+from .diff import Choice, ChoicePair, ErrorKind, compile_text, empty_choice
+from .group import group_combining
 
 code_close_open_re = re.compile(r"</code><code>")
 
@@ -58,19 +61,14 @@ def split_comment(string: str, start: str, end: str, enabled: bool) -> tuple[str
     return string, ""
 
 
-def split_options(
-    config: Config,
-    string: str,
-    sep: Optional[str],
-    bracket_ranges: list[tuple[int, int]],
-) -> list[Choice]:
+def split_options(config: Config, parts: list[str]) -> list[Choice]:
     """
-    Split a string on a separator, trim whitespace, and remove a comment
-    delimited by square brackets.
+    Trim whitespace from answer choices which were split on a separator, and
+    remove a comment delimited by square brackets.
     """
 
     stripped = []
-    for part in util.split_except_for_ranges(string, sep, bracket_ranges):
+    for part in parts:
         s = part.strip()
         if s:
             stripped.append(split_comment(s, "[", "]", config.answer_choice_comments))
@@ -78,14 +76,23 @@ def split_options(
     return stripped
 
 
-def pick_separator(config: Config, correct: str, correct_bracket_ranges: list[tuple[int, int]]) -> Optional[str]:
-    """Pick a separator based on the separators config option."""
+def pick_separator(
+    config: Config,
+    correct: str,
+    correct_bracket_ranges: list[tuple[int, int]],
+) -> tuple[Optional[str], list[int]]:
+    """
+    Pick a separator based on the separators config option. Also returns the
+    indices where the correct answer should be split.
+    """
+
+    separator_indices = util.find_separator_indices(correct, config.separator_set, correct_bracket_ranges)
 
     for sep in config.separators:
-        if util.has_separator(correct, sep, correct_bracket_ranges):
-            return sep
+        if sep in separator_indices:
+            return sep, separator_indices[sep]
 
-    return None
+    return None, []
 
 
 def format_separator(sep: Optional[str]) -> str:
@@ -187,53 +194,346 @@ def render_diffs(pair: ChoicePair, given_elems: list[str], correct_elems: list[s
     return has_error, correct_count
 
 
+@dataclass(frozen=True)
+class GradedAnswer:
+    __slots__ = "html", "has_error", "correct_count", "cell_count", "degraded", "given_choice_count", "stages"
+
+    # Rendered corrections for the answer
+    html: str
+
+    # Whether any error was shown for the given answer
+    has_error: bool
+
+    # Number of grapheme clusters of the correct answer which were matched
+    correct_count: int
+
+    # Number of diff cells which were computed for the comparison
+    cell_count: int
+
+    # Whether the comparison went over budget and used a cheaper strategy
+    degraded: bool
+
+    # Number of answer choices in the given answer after splitting
+    given_choice_count: int
+
+    # Names of the optional stages used for the comparison (e.g. "numeric")
+    stages: frozenset[str]
+
+
+@dataclass(frozen=True)
+class CompiledAnswer:
+    """
+    Correct answer with all of the work which doesn't depend on the given
+    answer already done, so that it can be reused for many given answers.
+    """
+
+    __slots__ = "correct", "normalized", "exact", "text", "comment", "sep", "choices"
+
+    # Normalized correct answer
+    correct: str
+
+    # Normalized correct answer, which is casefolded if case is ignored
+    normalized: str
+
+    # Result of grading the correct answer itself, since it is always the same.
+    # It is only found when an exact match is first given.
+    exact: Optional[GradedAnswer]
+
+    # Normalized correct answer without the comment
+    text: str
+
+    # Comment in parentheses at the end of the correct answer
+    comment: str
+
+    # Separator used to split the answer choices
+    sep: Optional[str]
+
+    # Answer choices after splitting on the separator
+    choices: list[Choice]
+
+
+@dataclass(frozen=True)
+class GivenAnswer:
+    __slots__ = "text", "comment", "choices"
+
+    # Normalized given answer without the comment
+    text: str
+
+    # Comment in parentheses at the end of the given answer
+    comment: str
+
+    # Answer choices after splitting on the separator for the correct answer
+    choices: list[Choice]
+
+
+@dataclass(frozen=True)
+class CompiledAnswerKeys:
+    """
+    Several acceptable correct answers for the same card, such as different
+    spellings, which are compiled together so that the best one can be found.
+    """
+
+    __slots__ = "answers", "lengths", "by_normalized"
+
+    # Compiled correct answers in order of preference
+    answers: list[CompiledAnswer]
+
+    # Number of grapheme clusters in the answer choices of each correct answer
+    lengths: list[int]
+
+    # Index of the first correct answer for each normalized correct answer
+    by_normalized: dict[str, int]
+
+
 def compare_answer_no_html(config: Config, correct: str, given: str) -> str:
     """Display the corrections for a type-in answer."""
 
+    return grade_answer(config, correct, given).html
+
+
+def compare_answer_keys_no_html(config: Config, correct: list[str], given: str) -> str:
+    """Display the corrections for a type-in answer with several acceptable correct answers."""
+
+    return grade_answer_keys(config, correct, given)[1].html
+
+
+def grade_answer(config: Config, correct: str, given: str) -> GradedAnswer:
+    """Find and render the corrections for a type-in answer."""
+
+    return grade_compiled_answer(config, compile_answer(config, correct), given)
+
+
+def normalize(config: Config, answer: str) -> str:
     # Replace consecutive spaces with a single space
-    given = config.space_re.sub(" ", given)
-    correct = config.space_re.sub(" ", correct)
+    answer = config.space_re.sub(" ", answer)
 
     # Normalize using NFC to make comparison consistent
-    given = ucd.normalize("NFC", given)
-    correct = ucd.normalize("NFC", correct)
+    return ucd.normalize("NFC", answer)
+
+
+def parse_answer(config: Config, correct: str) -> CompiledAnswer:
+    """
+    Split a correct answer into its comment and answer choices. Unlike
+    compile_answer(), answer choices aren't compiled for diff() in advance.
+    """
+
+    normalized = normalize(config, correct)
 
     # Remove comments in parentheses
-    correct, correct_comment = split_comment(correct, "(", ")", config.answer_comments)
+    correct, correct_comment = split_comment(normalized, "(", ")", config.answer_comments)
+
+    # Find bracket ranges (if config option enabled)
+    correct_bracket_ranges = util.find_bracket_ranges(correct) if config.ignore_separators_in_brackets else []
+
+    # Pick a separator and split on it
+    sep, correct_sep_indices = pick_separator(config, correct, correct_bracket_ranges)
+    correct_split = split_options(config, util.split_at_indices(correct, correct_sep_indices))
+
+    return CompiledAnswer(
+        normalized,
+        casefold_if_ignore_case(normalized, config.ignore_case),
+        None,
+        correct,
+        correct_comment,
+        sep,
+        correct_split,
+    )
+
+
+def compile_answer(config: Config, correct: str, eager: bool = False) -> CompiledAnswer:
+    """
+    Prepare a correct answer for comparing with given answers. If eager, also
+    compile each answer choice for diff() now instead of when first needed.
+    """
+
+    compiled = parse_answer(config, correct)
+
+    if eager:
+        for text, _ in compiled.choices:
+            compile_text(config, text, True)
+
+    return compiled
+
+
+def grade_exact_match(config: Config, compiled: CompiledAnswer) -> GradedAnswer:
+    """
+    Find the result for a given answer which exactly matches a compiled correct
+    answer. It is graded the first time, and then kept so that later exact
+    matches don't need any diffs.
+    """
+
+    if compiled.exact is None:
+        exact = grade_given_answer(config, compiled, parse_given_answer(config, compiled, compiled.correct))
+
+        # The compiled answer is frozen, but this only fills in a result which
+        # is the same every time
+        object.__setattr__(compiled, "exact", replace(exact, stages=frozenset({"exact_match"})))
+
+    assert compiled.exact is not None
+    return compiled.exact
+
+
+def grade_answer_keys(config: Config, correct: list[str], given: str) -> tuple[int, GradedAnswer]:
+    """
+    Find and render the corrections for a type-in answer using whichever of the
+    correct answers is closest. Also returns the index of that correct answer.
+    """
+
+    return grade_compiled_answer_keys(config, compile_answer_keys(config, correct), given)
+
+
+def compile_answer_keys(config: Config, correct: list[str], eager: bool = False) -> CompiledAnswerKeys:
+    """Prepare several acceptable correct answers for comparing with given answers."""
+
+    if not correct:
+        raise ValueError("at least one correct answer is required")
+
+    answers = [compile_answer(config, answer, eager) for answer in correct]
+    lengths = [sum(len(group_combining(text + comment)) for text, comment in answer.choices) for answer in answers]
+
+    by_normalized: dict[str, int] = {}
+    for index, answer in enumerate(answers):
+        by_normalized.setdefault(answer.normalized, index)
+
+    return CompiledAnswerKeys(answers, lengths, by_normalized)
+
+
+def can_bound_by_length(config: Config, given: str) -> bool:
+    """
+    Check if each grapheme cluster of a given answer can match at most one
+    grapheme cluster of a correct answer. Equivalent strings, numbers, and
+    characters which expand when case folded can match more.
+    """
+
+    if config.equivalent_strings or config.numeric_comparison_factor > 0.0:
+        return False
+
+    return not config.ignore_case or given.isascii()
+
+
+def answer_key_score(graded: GradedAnswer, correct_length: int) -> tuple[bool, float]:
+    """Score a graded answer so that answers without errors, then more complete answers, are higher."""
+
+    return not graded.has_error, graded.correct_count / correct_length if correct_length else 1.0
+
+
+def grade_compiled_answer_keys(config: Config, compiled: CompiledAnswerKeys, given: str) -> tuple[int, GradedAnswer]:
+    """
+    Find and render the corrections for a type-in answer using whichever of the
+    correct answers which were already compiled is closest. Also returns the
+    index of that correct answer. If there are ties, the first one is used.
+    """
+
+    # Every correct answer would normalize the given answer the same way
+    given = normalize(config, given)
+
+    # If the answer exactly matches any correct answer, it is the best one and
+    # nothing needs a diff
+    index = compiled.by_normalized.get(casefold_if_ignore_case(given, config.ignore_case))
+    if index is not None:
+        return index, grade_exact_match(config, compiled.answers[index])
+
+    # A given answer can't match more grapheme clusters of a correct answer
+    # than it has, so there is an upper bound for the score from the lengths
+    if can_bound_by_length(config, given):
+        given_length = len(group_combining(given))
+        bounds = [min(given_length, length) / length if length else 1.0 for length in compiled.lengths]
+    else:
+        bounds = [1.0] * len(compiled.answers)
+
+    # Try the correct answers with the highest bound first, so that most of
+    # the rest can be skipped once one of them is close enough
+    order = sorted(range(len(compiled.answers)), key=lambda index: (-bounds[index], index))
+
+    best_index = -1
+    best: Optional[GradedAnswer] = None
+    best_score = (False, 0.0)
+    for index in order:
+        # Skip answers which couldn't be better even if all of the given answer matched
+        if best_score[0] and (best_score[1], -best_index) >= (bounds[index], -index):
+            continue
+
+        graded = grade_compiled_answer(config, compiled.answers[index], given)
+        score = answer_key_score(graded, compiled.lengths[index])
+        if best is None or score > best_score or (score == best_score and index < best_index):
+            best_index = index
+            best = graded
+            best_score = score
+
+    assert best is not None
+    return best_index, best
+
+
+def grade_compiled_answer(config: Config, compiled: CompiledAnswer, given: str) -> GradedAnswer:
+    """Find and render the corrections for a type-in answer which was already compiled."""
+
+    given = normalize(config, given)
+
+    # If the answer is exactly correct, the result is already known
+    if casefold_if_ignore_case(given, config.ignore_case) == compiled.normalized:
+        return grade_exact_match(config, compiled)
+
+    return grade_given_answer(config, compiled, parse_given_answer(config, compiled, given))
+
+
+def parse_given_answer(config: Config, compiled: CompiledAnswer, given: str) -> GivenAnswer:
+    """Split a normalized given answer the same way as a correct answer was split."""
 
     # Only separate comment for given if present for correct
-    if correct_comment:
+    if compiled.comment:
         given, given_comment = split_comment(given, "(", ")", config.answer_comments)
     else:
         given_comment = ""
 
-    # Find bracket ranges in both answers (if config option enabled)
-    if config.ignore_separators_in_brackets:
-        given_bracket_ranges = util.find_bracket_ranges(given)
-        correct_bracket_ranges = util.find_bracket_ranges(correct)
-    else:
-        given_bracket_ranges = []
-        correct_bracket_ranges = []
-
-    sep = pick_separator(config, correct, correct_bracket_ranges)
+    # Find bracket ranges (if config option enabled)
+    given_bracket_ranges = util.find_bracket_ranges(given) if config.ignore_separators_in_brackets else []
 
     # Split on the separator
-    given_split = split_options(config, given, sep, given_bracket_ranges)
-    correct_split = split_options(config, correct, sep, correct_bracket_ranges)
+    given_split = split_options(config, util.split_except_for_ranges(given, compiled.sep, given_bracket_ranges))
+
+    return GivenAnswer(given, given_comment, given_split)
+
+
+def grade_given_answer(config: Config, compiled: CompiledAnswer, parsed: GivenAnswer) -> GradedAnswer:
+    """Find and render the corrections for a given answer which was already split."""
+
+    # Limit the amount of work done for pathological answers
+    budget = Budget.from_config(config)
+
+    correct = compiled.text
+    correct_comment = compiled.comment
+    correct_split = compiled.choices
+    sep = compiled.sep
+
+    given = parsed.text
+    given_comment = parsed.comment
+    given_split = parsed.choices
 
     # Arrange the parts so that similar ones line up and render the diffs
     has_error = False
     correct_count = 0
     given_elems: list[str] = []
     correct_elems: list[str] = []
-    for pair in arrange(config, given_split, correct_split):
+
+    # If the parts are only in a different order, none of them need a diff
+    exact_indices = arrange_exact_matches(config, given_split, correct_split)
+    if exact_indices is not None:
+        budget.stages.add("exact_permutation")
+        parts: list[Union[ChoicePair, UnmatchedChoice]] = [
+            ChoicePair(config, given_choice, correct_split[correct_index], budget)
+            for given_choice, correct_index in zip(given_split, exact_indices)
+        ]
+    else:
+        parts = arrange(config, given_split, correct_split, budget)
+
+    for pair in parts:
         if isinstance(pair, ChoicePair):
             diff_error, diff_correct = render_diffs(pair, given_elems, correct_elems)
             has_error |= diff_error
             correct_count += diff_correct
         elif pair.is_correct:
             # Ignore result since this isn't a real diff
-            render_diffs(ChoicePair(config, empty_choice, pair.choice), given_elems, correct_elems)
+            render_diffs(ChoicePair(config, empty_choice, pair.choice, budget), given_elems, correct_elems)
         else:
             has_error = True
             given_elems.append(bad("".join(pair.choice)))
@@ -241,6 +541,8 @@ def compare_answer_no_html(config: Config, correct: str, given: str) -> str:
     # If there was an error and some of the correct answer choices were missing,
     # the user may have just forgotten to type a separator.
     if has_error and sep and len(given_elems) < len(correct_elems):
+        budget.stages.add("separator_retry")
+
         alt_given = given.strip()
         alt_correct = correct.strip()
 
@@ -250,13 +552,14 @@ def compare_answer_no_html(config: Config, correct: str, given: str) -> str:
         alt_given_elems: list[str] = []
         alt_correct_elems: list[str] = []
         alt_has_error, alt_correct_count = render_diffs(
-            ChoicePair(config, (alt_given, ""), (alt_correct, "")),
+            ChoicePair(config, (alt_given, ""), (alt_correct, ""), budget),
             alt_given_elems,
             alt_correct_elems,
         )
 
         # If the diff without splitting is more correct, then don't split
         if alt_correct_count - length_diff > correct_count:
+            budget.stages.add("unsplit")
             sep = None
             has_error = alt_has_error
             correct_count = alt_correct_count
@@ -267,10 +570,12 @@ def compare_answer_no_html(config: Config, correct: str, given: str) -> str:
     if given_comment:
         given = given_comment.strip()
         correct = correct_comment.strip()
-        has_error |= render_diffs(ChoicePair(config, (given, ""), (correct, "")), given_elems, correct_elems)[0]
+        has_error |= render_diffs(ChoicePair(config, (given, ""), (correct, ""), budget), given_elems, correct_elems)[0]
 
     sep = not_code(html.escape(format_separator(sep)))
-    res = "<div id=typeans><code>"
+
+    # Mark answers which were compared using a cheaper strategy
+    res = "<div id=typeans class=typeDegraded><code>" if budget.degraded else "<div id=typeans><code>"
 
     # Only show the given part if there was an error
     if has_error:
@@ -303,4 +608,4 @@ def compare_answer_no_html(config: Config, correct: str, given: str) -> str:
     # Merge adjacent code tags
     res = code_close_open_re.sub("", res)
 
-    return res
+    return GradedAnswer(res, has_error, correct_count, budget.spent_cells, budget.degraded, len(given_split), frozenset(budget.stages))
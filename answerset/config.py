@@ -1,6 +1,11 @@
+import hashlib
+import json
 import re
 import unicodedata as ucd
-from typing import Any, TypeVar
+from collections.abc import Mapping
+from dataclasses import FrozenInstanceError
+from types import MappingProxyType
+from typing import Any, Optional, TypeVar
 
 from .group import group_combining
 
@@ -26,53 +31,195 @@ def casefold_if_ignore_case(s: str, ignore_case: bool) -> str:
     return s.casefold() if ignore_case else s
 
 
-def get_equivalent_strings_config_var(
-    config: Any,
-    var_name: str,
-    default_value: list[list[str]],
-    ignore_case: bool,
-) -> list[list[list[str]]]:
+def get_equivalent_strings_config_var(config: Any, var_name: str, default_value: list[list[str]]) -> list[list[str]]:
+    return [
+        [x for x in xs if x and type(x) is str]
+        for xs in get_config_var(config, var_name, default_value)
+        if type(xs) is list
+    ]
+
+
+def compile_equivalent_strings(equivalent_strings: list[list[str]], ignore_case: bool) -> list[list[list[str]]]:
     # BUG: if there is an equivalence ["ß", "x"] and the answer is "ss", then "x" is not accepted
     # TODO: consider grouping combining characters after finding diff instead to resolve this bug
     return list(
         filter(
             lambda xs: len(xs) >= 2,
             (
-                [
-                    [casefold_if_ignore_case(ch, ignore_case) for ch in group_combining(ucd.normalize("NFC", x))]
-                    for x in xs
-                    if x and type(x) is str
-                ]
-                for xs in get_config_var(config, var_name, default_value)
-                if type(xs) is list
+                [[casefold_if_ignore_case(ch, ignore_case) for ch in group_combining(ucd.normalize("NFC", x))] for x in xs]
+                for xs in equivalent_strings
             ),
         ),
     )
 
 
+# Options which only affect the add-on and not how answers are graded
+ungraded_options = frozenset({
+    "Comparison Timings File",
+    "Precompile Answers",
+    "Precompile Upcoming Cards",
+    "Record Comparison Timings",
+})
+
+# Equivalent strings indexed by their last character. Each entry contains a
+# string and the list of other strings which are equivalent to it.
+EquivalenceIndex = dict[str, list[tuple[list[str], list[list[str]]]]]
+
+
+def index_equivalent_strings(
+    equivalent_strings: list[list[list[str]]],
+    index: Optional[EquivalenceIndex] = None,
+) -> EquivalenceIndex:
+    """
+    Index equivalent strings by their last character so that only strings which
+    could end at a certain position need to be checked. The order of the
+    equivalences is preserved within each entry.
+    """
+
+    index = {} if index is None else {ch: entries[:] for ch, entries in index.items()}
+
+    for xs in equivalent_strings:
+        for a in xs:
+            index.setdefault(a[-1], []).append((a, [b for b in xs if b != a]))
+
+    return index
+
+
 class Config:
+    """
+    Parsed and compiled add-on config. A Config cannot be modified after it is
+    created, and two configs with the same grading options have the same
+    fingerprint, so it can be used as part of the key for any cached results.
+    """
+
+    __slots__ = (
+        "options",
+        "answer_choice_comments",
+        "answer_comments",
+        "comparison_size_limit",
+        "comparison_time_limit",
+        "comparison_timings_file",
+        "diff_engine",
+        "lenient_validation",
+        "ignore_case",
+        "ignore_separators_in_brackets",
+        "numeric_comparison_factor",
+        "numeric_negative_numbers",
+        "numeric_scientific_notation",
+        "numeric_thousands_separators",
+        "precompile_answers",
+        "precompile_upcoming_cards",
+        "record_comparison_timings",
+        "separators",
+        "separator_set",
+        "ignored_characters",
+        "equivalent_strings",
+        "equivalent_strings_index",
+        "equivalent_strings_lookbehind",
+        "space_re",
+        "bracket_start",
+        "bracket_end",
+        "bracket_chars",
+        "bracket_char_set",
+        "whitespace_chars",
+        "keep_in_alternative_chars",
+        "junk_chars",
+        "junk_char_set",
+        "allow_alternative_continue",
+        "allow_alternative_continue_set",
+        "fingerprint",
+    )
+
     def __init__(self, config: Any = None) -> None:
         self.answer_choice_comments = get_config_var(config, "Enable Answer Choice Comments [...]", False)
         self.answer_comments = get_config_var(config, "Enable Answer Comments (...)", False)
+        self.comparison_size_limit = get_config_var(config, "Comparison Size Limit", 0)
+        self.comparison_time_limit = get_config_var(config, "Comparison Time Limit", 0.0)
+        self.comparison_timings_file = get_config_var(config, "Comparison Timings File", "")
+        self.diff_engine = get_config_var(config, "Diff Engine", "reference")
         self.lenient_validation = get_config_var(config, "Enable Lenient Validation", True)
         self.ignore_case = get_config_var(config, "Ignore Case", True)
         self.ignore_separators_in_brackets = get_config_var(config, "Ignore Separators in Brackets", True)
         self.numeric_comparison_factor = get_config_var(config, "Numeric Comparison Factor", 0.0)
+        self.numeric_negative_numbers = get_config_var(config, "Numeric Negative Numbers", False)
+        self.numeric_scientific_notation = get_config_var(config, "Numeric Scientific Notation", False)
+        self.numeric_thousands_separators = get_config_var(config, "Numeric Thousands Separators", "")
+        self.precompile_answers = get_config_var(config, "Precompile Answers", False)
+        self.precompile_upcoming_cards = get_config_var(config, "Precompile Upcoming Cards", 0)
+        self.record_comparison_timings = get_config_var(config, "Record Comparison Timings", False)
         self.separators = get_config_var(config, "Separators", ";,")
-
-        self.ignored_characters = ucd.normalize(
-            "NFC",
-            casefold_if_ignore_case(get_config_var(config, "Ignored Characters", " .-"), self.ignore_case),
-        )
-        self.equivalent_strings = get_equivalent_strings_config_var(config, "Equivalent Strings", [], self.ignore_case)
+        self.separator_set = frozenset(self.separators)
+
+        ignored_characters = get_config_var(config, "Ignored Characters", " .-")
+        equivalent_strings = get_equivalent_strings_config_var(config, "Equivalent Strings", [])
+
+        # All options after validation, used for pickling
+        options: dict[str, Any] = {
+            "Comparison Size Limit": self.comparison_size_limit,
+            "Comparison Time Limit": self.comparison_time_limit,
+            "Comparison Timings File": self.comparison_timings_file,
+            "Diff Engine": self.diff_engine,
+            "Enable Answer Choice Comments [...]": self.answer_choice_comments,
+            "Enable Answer Comments (...)": self.answer_comments,
+            "Enable Lenient Validation": self.lenient_validation,
+            "Equivalent Strings": equivalent_strings,
+            "Ignore Case": self.ignore_case,
+            "Ignore Separators in Brackets": self.ignore_separators_in_brackets,
+            "Ignored Characters": ignored_characters,
+            "Numeric Comparison Factor": self.numeric_comparison_factor,
+            "Numeric Negative Numbers": self.numeric_negative_numbers,
+            "Numeric Scientific Notation": self.numeric_scientific_notation,
+            "Numeric Thousands Separators": self.numeric_thousands_separators,
+            "Precompile Answers": self.precompile_answers,
+            "Precompile Upcoming Cards": self.precompile_upcoming_cards,
+            "Record Comparison Timings": self.record_comparison_timings,
+            "Separators": self.separators,
+        }
+        self.options: Mapping[str, Any] = MappingProxyType(options)
+
+        self.ignored_characters = ucd.normalize("NFC", casefold_if_ignore_case(ignored_characters, self.ignore_case))
+        self.equivalent_strings = compile_equivalent_strings(equivalent_strings, self.ignore_case)
+        self.equivalent_strings_index = index_equivalent_strings(self.equivalent_strings)
+        self.equivalent_strings_lookbehind = max((len(x) for xs in self.equivalent_strings for x in xs), default=0)
 
         self.space_re = re.compile(r" +")
 
         self.bracket_start = "(["
         self.bracket_end = ")]"
         self.bracket_chars = self.bracket_start + self.bracket_end
+        self.bracket_char_set = frozenset(self.bracket_chars)
         self.whitespace_chars = " \t\r\n"
         self.keep_in_alternative_chars = self.whitespace_chars + self.bracket_chars
         self.junk_chars = self.ignored_characters.replace(" ", self.whitespace_chars) + self.bracket_chars
+        self.junk_char_set = frozenset(self.junk_chars)
 
         self.allow_alternative_continue = "'-_"
+        self.allow_alternative_continue_set = frozenset(self.allow_alternative_continue)
+
+        # Must be set last, since the config can't be modified afterwards
+        grading_options = {name: value for name, value in options.items() if name not in ungraded_options}
+        self.fingerprint = hashlib.sha256(
+            json.dumps(grading_options, sort_keys=True, ensure_ascii=False).encode(),
+        ).hexdigest()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if hasattr(self, "fingerprint"):
+            raise FrozenInstanceError(f"cannot assign to field {name!r}")
+
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError(f"cannot delete field {name!r}")
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Config) and self.fingerprint == other.fingerprint
+
+    def __hash__(self) -> int:
+        return hash(self.fingerprint)
+
+    def __reduce__(self) -> tuple[type["Config"], tuple[dict[str, Any]]]:
+        # Only the options need to be sent, since everything else is derived
+        return Config, (dict(self.options),)
+
+    def __repr__(self) -> str:
+        return f"Config({dict(self.options)!r})"
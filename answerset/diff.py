@@ -1,12 +1,16 @@
 import collections
-from dataclasses import dataclass
+import os
+from collections.abc import Callable, Sequence
 from enum import Enum
-from typing import Optional
+from functools import lru_cache
+from typing import Final, Optional
 
-from . import util
-from .config import Config, casefold_if_ignore_case
+from . import stats, util
+from .budget import Budget, BudgetExceeded
+from .config import Config, casefold_if_ignore_case, index_equivalent_strings
 from .group import group_combining, has_multiple_chars
-from .numeric import find_numeric_ranges_by_end_index
+from .numeric import NumericRange, find_numeric_ranges_by_end_index
+from .planner import estimate_seconds
 
 # Exact matches need the highest possible matched count
 max_matched = 0x7FFFFFFF
@@ -14,111 +18,146 @@ max_matched = 0x7FFFFFFF
 
 def is_alternative_stop(config: Config, ch: str) -> bool:
     """Check if a character should stop an alternative outside of brackets."""
-    return not ch.isalnum() and ch not in config.allow_alternative_continue
+    return not ch.isalnum() and ch not in config.allow_alternative_continue_set
 
 
-def find_alternative_jumps(
+def is_alternative_stop_at(
+    config: Config,
+    correct: list[str],
+    bracket_depths: list[int],
+    i: int,
+    allow_spaces_in_brackets: bool,
+) -> bool:
+    """Version of is_alternative_stop() adjusted for allowing spaces in brackets."""
+
+    ch = correct[i]
+
+    if not is_alternative_stop(config, ch):
+        return False
+
+    return (
+        not allow_spaces_in_brackets
+        or ch == "/"
+        or ch in config.bracket_char_set
+        or not bracket_depths[i]
+    )
+
+
+def add_alternative_jumps(
     config: Config,
     correct: list[str],
     correct_bracket_ranges: list[tuple[int, int]],
-) -> dict[int, list[int]]:
+    bracket_depths: list[int],
+    allow_spaces_in_brackets: bool,
+    jumps: dict[int, list[int]],
+) -> bool:
     """
-    Find out which parts of the correct answer are allowed to be missing since
-    they are part of an alternative. Returns a dictionary mapping from end
-    index to a list of start indices.
+    Add the jumps for alternatives to a dictionary, either stopping
+    alternatives on spaces while inside of brackets or allowing them. Returns
+    whether any slashes were inside of brackets.
     """
 
-    if "/" not in correct:
-        return {}
-
     bracket_jumps: dict[int, int] = {(end - 1): start for start, end in correct_bracket_ranges}
     bracket_starts: set[int] = {start for start, _ in correct_bracket_ranges}
 
-    jumps: dict[int, list[int]] = {}
-
-    # All of the logic for this function will be run twice, once for stopping
-    # alternatives on spaces while inside of brackets, and once for allowing
-    # spaces inside of alternatives while inside of brackets.
-    def add_jumps(allow_spaces_in_brackets: bool) -> bool:
-        # Version of is_alternative_stop() adjusted for allowing spaces in brackets
-        def stop(i: int) -> bool:
-            ch = correct[i]
-
-            if not is_alternative_stop(config, ch):
-                return False
-
-            return (
-                not allow_spaces_in_brackets
-                or ch == "/"
-                or ch in config.bracket_chars
-                or not util.index_in_any_range(i, correct_bracket_ranges)
-            )
+    # In the first iteration, we want to know whether any slashes were
+    # inside of brackets so that we know to run the second iteration
+    had_slash_in_brackets = False
 
-        # In the first iteration, we want to know whether any slashes were
-        # inside of brackets so that we know to run the second iteration
-        had_slash_in_brackets = False
+    # This list tracks the index of the first alpha character in an alternative
+    first_alpha: list[Optional[int]] = [None for _ in range(len(correct))]
 
-        # This list tracks the index of the first alpha character in an alternative
-        first_alpha: list[Optional[int]] = [None for _ in range(len(correct))]
+    # This list tracks the index of the slash immediately before an alternative
+    first_slash = first_alpha[:]
 
-        # This list tracks the index of the slash immediately before an alternative
-        first_slash = first_alpha[:]
+    for i, ch in enumerate(correct):
+        if ch == "/" and i > 0 and first_alpha[i - 1] is not None:
+            first_slash[i] = i
+            had_slash_in_brackets = had_slash_in_brackets or bool(bracket_depths[i])
+            continue
 
-        for i, ch in enumerate(correct):
-            if ch == "/" and i > 0 and first_alpha[i - 1] is not None:
-                first_slash[i] = i
-                had_slash_in_brackets = had_slash_in_brackets or util.index_in_any_range(i, correct_bracket_ranges)
-                continue
+        if i in bracket_jumps:
+            jump = bracket_jumps[i]
+            if jump > 0:
+                first_alpha[i] = first_alpha[jump - 1]
+                first_slash[i] = first_slash[jump - 1]
 
-            if i in bracket_jumps:
-                jump = bracket_jumps[i]
-                if jump > 0:
-                    first_alpha[i] = first_alpha[jump - 1]
-                    first_slash[i] = first_slash[jump - 1]
+                first_alpha[jump - 1] = None
+                first_slash[jump - 1] = None
 
-                    first_alpha[jump - 1] = None
-                    first_slash[jump - 1] = None
+            if first_alpha[i] is None:
+                first_alpha[i] = jump
 
-                if first_alpha[i] is None:
-                    first_alpha[i] = jump
+        if is_alternative_stop_at(config, correct, bracket_depths, i, allow_spaces_in_brackets):
+            continue
 
-            if stop(i):
-                continue
+        prev_alpha = first_alpha[i - 1] if i > 0 else None
+        prev_slash = first_slash[i - 1] if i > 0 else None
 
+        if prev_alpha is None:
+            first_alpha[i] = i
+        else:
+            first_alpha[i - 1] = None
+            first_alpha[i] = prev_alpha
+
+        if prev_slash is not None:
+            first_slash[i - 1] = None
+            first_slash[i] = prev_slash
+
+    # Using the info in first_alpha and first_slash, find the valid jumps
+    for i in range(len(correct) + 1):
+        curr_ch = correct[i] if i < len(correct) else None
+
+        prev_slash = first_slash[i - 1] if i > 0 else None
+        if (
+            prev_slash is not None
+            and prev_slash != i - 1
+            and (curr_ch is None or is_alternative_stop_at(config, correct, bracket_depths, i, allow_spaces_in_brackets))
+        ):
+            current = jumps.setdefault(i, [])
+            if prev_slash not in current:
+                current.append(prev_slash)
+
+        if (
+            curr_ch == "/"
+            and i < len(correct) - 1
+            and (
+                (i + 1) in bracket_starts
+                or not is_alternative_stop_at(config, correct, bracket_depths, i + 1, allow_spaces_in_brackets)
+            )
+        ):
             prev_alpha = first_alpha[i - 1] if i > 0 else None
-            prev_slash = first_slash[i - 1] if i > 0 else None
+            if prev_alpha is not None:
+                current = jumps.setdefault(i + 1, [])
+                if prev_alpha not in current:
+                    current.append(prev_alpha)
 
-            if prev_alpha is None:
-                first_alpha[i] = i
-            else:
-                first_alpha[i - 1] = None
-                first_alpha[i] = prev_alpha
+    return had_slash_in_brackets
 
-            if prev_slash is not None:
-                first_slash[i - 1] = None
-                first_slash[i] = prev_slash
 
-        # Using the info in first_alpha and first_slash, find the valid jumps
-        for i in range(len(correct) + 1):
-            curr_ch = correct[i] if i < len(correct) else None
+def find_alternative_jumps(
+    config: Config,
+    correct: list[str],
+    correct_bracket_ranges: list[tuple[int, int]],
+) -> dict[int, list[int]]:
+    """
+    Find out which parts of the correct answer are allowed to be missing since
+    they are part of an alternative. Returns a dictionary mapping from end
+    index to a list of start indices.
+    """
 
-            prev_slash = first_slash[i - 1] if i > 0 else None
-            if prev_slash is not None and prev_slash != i - 1 and (curr_ch is None or stop(i)):
-                current = jumps.setdefault(i, [])
-                if prev_slash not in current:
-                    current.append(prev_slash)
+    if "/" not in correct:
+        return {}
 
-            if curr_ch == "/" and i < len(correct) - 1 and ((i + 1) in bracket_starts or not stop(i + 1)):
-                prev_alpha = first_alpha[i - 1] if i > 0 else None
-                if prev_alpha is not None:
-                    current = jumps.setdefault(i + 1, [])
-                    if prev_alpha not in current:
-                        current.append(prev_alpha)
+    bracket_depths = util.range_depths(len(correct), correct_bracket_ranges)
 
-        return had_slash_in_brackets
+    jumps: dict[int, list[int]] = {}
 
-    if add_jumps(False) and correct_bracket_ranges:
-        add_jumps(True)
+    # All of the logic for finding jumps will be run twice, once for stopping
+    # alternatives on spaces while inside of brackets, and once for allowing
+    # spaces inside of alternatives while inside of brackets.
+    if add_alternative_jumps(config, correct, correct_bracket_ranges, bracket_depths, False, jumps) and correct_bracket_ranges:
+        add_alternative_jumps(config, correct, correct_bracket_ranges, bracket_depths, True, jumps)
 
     return jumps
 
@@ -139,24 +178,70 @@ class ErrorKind(Enum):
     SKIP = 2
 
 
-@dataclass(frozen=True)
+# Records in this module are immutable, but they are plain classes instead of
+# frozen dataclasses, since mypyc can't compile dataclasses with __slots__
+
+
 class ErrorRange:
     __slots__ = "correct_range", "given_range", "report", "kind"
 
-    correct_range: tuple[int, int]
-    given_range: tuple[int, int]
-    report: bool
-    kind: ErrorKind
+    def __init__(self, correct_range: tuple[int, int], given_range: tuple[int, int], report: bool, kind: ErrorKind) -> None:
+        self.correct_range: Final = correct_range
+        self.given_range: Final = given_range
+        self.report: Final = report
+        self.kind: Final = kind
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, ErrorRange)
+            and self.correct_range == other.correct_range
+            and self.given_range == other.given_range
+            and self.report == other.report
+            and self.kind == other.kind
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.correct_range, self.given_range, self.report, self.kind))
+
+    def __repr__(self) -> str:
+        return (
+            f"ErrorRange(correct_range={self.correct_range!r}, given_range={self.given_range!r}, "
+            f"report={self.report!r}, kind={self.kind!r})"
+        )
 
 
-@dataclass(frozen=True)
 class Diff:
     __slots__ = "matched_count", "reported_error_count", "error_ranges", "current_error_range"
 
-    matched_count: int
-    reported_error_count: int
-    error_ranges: list[ErrorRange]
-    current_error_range: Optional[ErrorRange]
+    def __init__(
+        self,
+        matched_count: int,
+        reported_error_count: int,
+        error_ranges: list[ErrorRange],
+        current_error_range: Optional[ErrorRange],
+    ) -> None:
+        self.matched_count: Final = matched_count
+        self.reported_error_count: Final = reported_error_count
+        self.error_ranges: Final = error_ranges
+        self.current_error_range: Final = current_error_range
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, Diff)
+            and self.matched_count == other.matched_count
+            and self.reported_error_count == other.reported_error_count
+            and self.error_ranges == other.error_ranges
+            and self.current_error_range == other.current_error_range
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.matched_count, self.reported_error_count, tuple(self.error_ranges), self.current_error_range))
+
+    def __repr__(self) -> str:
+        return (
+            f"Diff(matched_count={self.matched_count!r}, reported_error_count={self.reported_error_count!r}, "
+            f"error_ranges={self.error_ranges!r}, current_error_range={self.current_error_range!r})"
+        )
 
     def add_matched(self, count: int = 1) -> "Diff":
         return self.replace_error(None, count)
@@ -260,54 +345,82 @@ def casefold_and_record_split_strings(ch: str, split_strings: dict[str, list[str
     return new_ch
 
 
-def diff(config: Config, given: list[str], correct: list[str]) -> Diff:
+class CompiledText:
     """
-    Find the differences between the correct answer and the given answer and
-    return a list of errors. If lenient validation is enabled, don't mark
-    missing bracketed text, alternative segments, or junk characters as
-    reported errors. Checks for equivalent strings while finding difference.
+    Answer text with everything needed by diff() which only depends on one side
+    of the comparison precomputed, so that it can be reused for every pair.
     """
 
-    # There may be more equivalent strings added after case folding
-    all_equivalent_strings = config.equivalent_strings
+    __slots__ = "chars", "split_strings", "numeric_ranges", "factor_skips", "jumps"
 
-    # If ignoring case, apply Unicode case folding to both
-    if config.ignore_case:
-        split_strings: dict[str, list[str]] = {}
+    def __init__(
+        self,
+        chars: list[str],
+        split_strings: dict[str, list[str]],
+        numeric_ranges: dict[int, NumericRange],
+        factor_skips: dict[int, int],
+        jumps: dict[int, list[int]],
+    ) -> None:
+        # Grouped characters, case folded if ignoring case
+        self.chars: Final = chars
 
-        correct = list(map(lambda ch: casefold_and_record_split_strings(ch, split_strings), correct))
-        given = list(map(lambda ch: casefold_and_record_split_strings(ch, split_strings), given))
+        # Case folded characters which expand to multiple characters
+        self.split_strings: Final = split_strings
 
-        # Record any new equivalences caused by case folding in correct or given
-        # Example: ['ß'] expands to ['ss'], but ['s', 's'] is equivalent
-        if split_strings:
-            all_equivalent_strings = all_equivalent_strings[:]
-            for new_ch in split_strings:
-                all_equivalent_strings.append([[new_ch], split_strings[new_ch]])
+        # Numeric ranges by digit end index
+        self.numeric_ranges: Final = numeric_ranges
+
+        # Ranges to skip over for factor overrides (only for correct answers)
+        self.factor_skips: Final = factor_skips
+
+        # Jumps for missing brackets and alternatives (only for correct answers)
+        self.jumps: Final = jumps
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, CompiledText)
+            and self.chars == other.chars
+            and self.split_strings == other.split_strings
+            and self.numeric_ranges == other.numeric_ranges
+            and self.factor_skips == other.factor_skips
+            and self.jumps == other.jumps
+        )
 
-    correct_numeric_ranges = {}
-    given_numeric_ranges = {}
+    def __repr__(self) -> str:
+        return (
+            f"CompiledText(chars={self.chars!r}, split_strings={self.split_strings!r}, "
+            f"numeric_ranges={self.numeric_ranges!r}, factor_skips={self.factor_skips!r}, jumps={self.jumps!r})"
+        )
 
-    # If numeric comparison is enabled, find all numeric ranges in both answers
+
+def compile_chars(config: Config, chars: list[str], is_correct: bool) -> CompiledText:
+    """Prepare grouped characters from one side of a comparison for diff()."""
+
+    split_strings: dict[str, list[str]] = {}
+
+    # If ignoring case, apply Unicode case folding
+    if config.ignore_case:
+        chars = [casefold_and_record_split_strings(ch, split_strings) for ch in chars]
+
+    # If numeric comparison is enabled, find all numeric ranges
     if config.numeric_comparison_factor > 0.0:
-        correct_numeric_ranges = find_numeric_ranges_by_end_index(correct, True)
+        numeric_ranges = find_numeric_ranges_by_end_index(chars, is_correct, config)
+    else:
+        numeric_ranges = {}
 
-        if correct_numeric_ranges:
-            given_numeric_ranges = find_numeric_ranges_by_end_index(given, False)
+    if not is_correct:
+        return CompiledText(chars, split_strings, numeric_ranges, {}, {})
 
     # Find ranges to skip over for factor overrides
-    factor_skips = {range.end_index: range.digit_end_index for range in correct_numeric_ranges.values() if range.factor is not None}
-
-    if not given and not factor_skips:
-        return Diff(0, 0, [ErrorRange((0, len(correct)), (0, 0), False, ErrorKind.REGULAR)], None)
+    factor_skips = {range.end_index: range.digit_end_index for range in numeric_ranges.values() if range.factor is not None}
 
     # If lenient validation is enabled, pre-compute the list of jumps which
     # are allowed to skip over parts which are allowed to be missing
     if config.lenient_validation:
-        correct_bracket_ranges = util.find_bracket_ranges(correct, lenient=True, nested=True)
+        bracket_ranges = util.find_bracket_ranges(chars, lenient=True, nested=True)
 
-        jumps: dict[int, list[int]] = find_alternative_jumps(config, correct, correct_bracket_ranges)
-        for start, end in correct_bracket_ranges:
+        jumps: dict[int, list[int]] = find_alternative_jumps(config, chars, bracket_ranges)
+        for start, end in bracket_ranges:
             jumps.setdefault(end, []).append(start)
 
         # Make sure the jumps are sorted for consistency
@@ -316,35 +429,222 @@ def diff(config: Config, given: list[str], correct: list[str]) -> Diff:
     else:
         jumps = {}
 
-    empty_diff = Diff(0, 0, [], None)
-    empty_diff_by_correct = [empty_diff for _ in range(len(correct) + 1)]
+    return CompiledText(chars, split_strings, numeric_ranges, factor_skips, jumps)
 
-    # Tracks the best diff for each substring of "correct" in the current iteration
-    best_diff_by_correct = empty_diff_by_correct[:]
 
-    # Calculate the number of previous iterations to keep (min: 1)
-    given_numeric_lookbehind = max(
-        (range.end_index - range.start_index for range in given_numeric_ranges.values()),
-        default=0,
+@lru_cache(maxsize=4096)
+def compile_text(config: Config, text: str, is_correct: bool) -> CompiledText:
+    """Prepare text from one side of a comparison for diff(), reusing previous results."""
+
+    return compile_chars(config, group_combining(text), is_correct)
+
+
+def diff(config: Config, given: list[str], correct: list[str], budget: Optional[Budget] = None) -> Diff:
+    """
+    Find the differences between the correct answer and the given answer and
+    return a list of errors. If lenient validation is enabled, don't mark
+    missing bracketed text, alternative segments, or junk characters as
+    reported errors. Checks for equivalent strings while finding difference.
+    Raises BudgetExceeded if the budget's deadline passes before finishing.
+    """
+
+    engine = get_diff_engine(config)
+    return engine(config, compile_chars(config, given, False), compile_chars(config, correct, True), budget)
+
+
+class DiffTable:
+    """
+    Everything needed to fill in the rows of the table used by diff(), where
+    each row has the best diff for each prefix of "correct" compared with one
+    prefix of "given". Each row only depends on the rows before it.
+
+    There can be multiple "correct" answers, in which case the columns form a
+    trie so that the columns for a shared prefix are only found once. Columns
+    are only shared if everything else about the prefixes also matches.
+    """
+
+    __slots__ = (
+        "config",
+        "given",
+        "correct_texts",
+        "split_strings",
+        "equivalent_strings_index",
+        "lookbehind",
+        "given_numeric_ranges",
+        "column_chars",
+        "column_ends",
+        "column_parents",
+        "column_paths",
+        "column_prefixes",
+        "column_numeric_ranges",
+        "column_factor_skips",
+        "column_jumps",
+        "answer_columns",
+        "empty_row",
     )
-    equivalent_string_lookbehind = max((len(x) for xs in all_equivalent_strings for x in xs), default=0)
-    diff_lookbehind = max(1, given_numeric_lookbehind, equivalent_string_lookbehind)
 
-    # Tracks the best diff for each substring of "correct" in previous iterations
-    best_diff_by_correct_and_prev_given_queue = collections.deque([empty_diff_by_correct[:]], diff_lookbehind)
+    def __init__(self, config: Config, given_text: CompiledText, correct_texts: Sequence[CompiledText]) -> None:
+        self.config = config
+        self.given = given_text.chars
+        self.correct_texts = correct_texts
+
+        # There may be more equivalent strings added after case folding
+        equivalent_strings_index = config.equivalent_strings_index
+        equivalent_string_lookbehind = config.equivalent_strings_lookbehind
+
+        # Record any new equivalences caused by case folding in correct or given
+        # Example: ['ß'] expands to ['ss'], but ['s', 's'] is equivalent. All of
+        # the "correct" answers must have the same case folded characters.
+        split_strings = correct_texts[0].split_strings
+        if given_text.split_strings:
+            split_strings = {**split_strings, **given_text.split_strings}
+
+        if split_strings:
+            new_equivalent_strings = [[[new_ch], split_strings[new_ch]] for new_ch in split_strings]
+            equivalent_strings_index = index_equivalent_strings(new_equivalent_strings, equivalent_strings_index)
+            equivalent_string_lookbehind = max(
+                equivalent_string_lookbehind,
+                max(len(x) for xs in new_equivalent_strings for x in xs),
+            )
+
+        self.split_strings = split_strings
+        self.equivalent_strings_index = equivalent_strings_index
+
+        # Numeric ranges in "given" are only needed if there are some in "correct"
+        has_numeric_ranges = any(correct_text.numeric_ranges for correct_text in correct_texts)
+        self.given_numeric_ranges = given_text.numeric_ranges if has_numeric_ranges else {}
+
+        # Calculate the number of previous rows needed for each row (min: 1)
+        given_numeric_lookbehind = max(
+            (range.end_index - range.start_index for range in self.given_numeric_ranges.values()),
+            default=0,
+        )
+        self.lookbehind = max(1, given_numeric_lookbehind, equivalent_string_lookbehind)
+
+        if len(correct_texts) == 1:
+            self.add_single_answer(correct_texts[0])
+        else:
+            self.add_answer_trie(correct_texts)
+
+        empty_diff = Diff(0, 0, [], None)
+        self.empty_row = [empty_diff for _ in range(len(self.column_chars))]
+
+        if stats.current is not None:
+            stats.current.diffs_created += 1
+
+    def add_single_answer(self, correct_text: CompiledText) -> None:
+        """Add a column for each prefix of a single "correct" answer."""
+
+        correct = correct_text.chars
+        indices = list(range(len(correct) + 1))
+
+        # Character at the end of each column (None for the empty prefix)
+        self.column_chars: list[Optional[str]] = [None, *correct]
+
+        # Length of the prefix for each column
+        self.column_ends = indices
+
+        # Column for the prefix without the last character
+        self.column_parents = [-1, *indices[:-1]]
+
+        # Columns for the shorter prefixes of each column, by length
+        self.column_paths = [indices] * len(indices)
+
+        # Characters of a "correct" answer starting with the prefix of each column
+        self.column_prefixes = [correct] * len(indices)
+
+        # Numeric ranges, factor skips, and jumps ending at each column
+        self.column_numeric_ranges = correct_text.numeric_ranges
+        self.column_factor_skips = correct_text.factor_skips
+        self.column_jumps = correct_text.jumps
+
+        # Column for each full "correct" answer
+        self.answer_columns = [len(correct)]
+
+    def add_answer_trie(self, correct_texts: Sequence[CompiledText]) -> None:
+        """Add columns for the prefixes of many "correct" answers, sharing columns where possible."""
+
+        root_path = [0]
+        self.column_chars = [None]
+        self.column_ends = [0]
+        self.column_parents = [-1]
+        self.column_paths = [root_path]
+        self.column_prefixes = [[]]
+        self.column_numeric_ranges = {}
+        self.column_factor_skips = {}
+        self.column_jumps = {}
+        self.answer_columns = []
+
+        children: dict[tuple[int, str, tuple[int, ...], Optional[int], Optional[NumericRange]], int] = {}
+        for correct_text in correct_texts:
+            column = 0
+            path = root_path[:]
+            for correct_end, ch in enumerate(correct_text.chars, 1):
+                jumps = correct_text.jumps.get(correct_end, [])
+                factor_skip = correct_text.factor_skips.get(correct_end)
+                numeric_range = correct_text.numeric_ranges.get(correct_end)
+
+                edge = (column, ch, tuple(jumps), factor_skip, numeric_range)
+                child = children.get(edge)
+                if child is None:
+                    child = children[edge] = len(self.column_chars)
+                    self.column_chars.append(ch)
+                    self.column_ends.append(correct_end)
+                    self.column_parents.append(column)
+
+                    # The path is shared since only the earlier columns are used
+                    self.column_paths.append(path)
+                    self.column_prefixes.append(correct_text.chars)
+
+                    if jumps:
+                        self.column_jumps[child] = jumps
+                    if factor_skip is not None:
+                        self.column_factor_skips[child] = factor_skip
+                    if numeric_range is not None:
+                        self.column_numeric_ranges[child] = numeric_range
+
+                column = child
+                path.append(column)
+
+            self.answer_columns.append(column)
+
+    def row(self, given_end: int, prev_rows: Sequence[list[Diff]]) -> list[Diff]:
+        """
+        Find the row for a prefix of "given" with a certain length. The previous
+        rows must be in order, ending with the row for the previous prefix.
+        """
+
+        config = self.config
+        given = self.given
+        equivalent_strings_index = self.equivalent_strings_index
+        given_numeric_ranges = self.given_numeric_ranges
+        column_chars = self.column_chars
+        column_ends = self.column_ends
+        column_parents = self.column_parents
+        column_paths = self.column_paths
+        column_numeric_ranges = self.column_numeric_ranges
+        column_factor_skips = self.column_factor_skips
+        column_jumps = self.column_jumps
+
+        # Tracks the best diff for each substring of "correct" in the current iteration
+        best_diff_by_correct = self.empty_row[:]
 
-    # Iterate over all possible substrings of "given"
-    for given_end in range(len(given) + 1):
         given_char = given[given_end - 1] if given_end > 0 else None
 
+        # Transitions which depend on both texts are counted for the stats as
+        # they are found
+        equivalence_count = 0
+        numeric_count = 0
+
         # Iterate over all possible substrings of "correct"
-        for correct_end in range(len(correct) + 1):
-            correct_char = correct[correct_end - 1] if correct_end > 0 else None
+        for column in range(len(column_chars)):
+            correct_char = column_chars[column]
 
             # Comparison of empty given and empty correct gives empty diff
             if not given_char and not correct_char:
                 continue
 
+            correct_end = column_ends[column]
             best_diff: Optional[Diff] = None
 
             if correct_char:
@@ -352,25 +652,25 @@ def diff(config: Config, given: list[str], correct: list[str]) -> Diff:
 
                 # Handle "correct" character missing
                 best_diff = (
-                    best_diff_by_correct[correct_end - 1]
+                    best_diff_by_correct[column_parents[column]]
                     .add_error(ErrorRange((correct_end - 1, correct_end), (given_end, given_end), report_missing, ErrorKind.REGULAR))
                     .pick_best(best_diff)
                 )
 
                 # Can also skip over missing factor overrides
-                if correct_end in factor_skips:
-                    skip = factor_skips[correct_end]
+                if column in column_factor_skips:
+                    skip = column_factor_skips[column]
 
                     best_diff = (
-                        best_diff_by_correct[skip]
+                        best_diff_by_correct[column_paths[column][skip]]
                         .add_error(ErrorRange((skip, correct_end), (given_end, given_end), False, ErrorKind.SKIP), correct_end - skip)
                         .pick_best(best_diff)
                     )
 
                 # Can also jump backwards for missing brackets/alternatives
-                for jump in jumps.get(correct_end, ()):
+                for jump in column_jumps.get(column, ()):
                     best_diff = (
-                        best_diff_by_correct[jump]
+                        best_diff_by_correct[column_paths[column][jump]]
                         .add_error(ErrorRange((jump, correct_end), (given_end, given_end), False, ErrorKind.REGULAR))
                         .pick_best(best_diff)
                     )
@@ -378,45 +678,41 @@ def diff(config: Config, given: list[str], correct: list[str]) -> Diff:
             # Handle "given" character wrong
             if given_char:
                 best_diff = (
-                    best_diff_by_correct_and_prev_given_queue[-1][correct_end]
+                    prev_rows[-1][column]
                     .add_error(ErrorRange((correct_end, correct_end), (given_end - 1, given_end), True, ErrorKind.REGULAR))
                     .pick_best(best_diff)
                 )
 
             # Handle "given" character matching "correct" character
             if given_char == correct_char:
-                best_diff = (
-                    best_diff_by_correct_and_prev_given_queue[-1][correct_end - 1]
-                    .add_matched()
-                    .pick_best(best_diff)
-                )
+                best_diff = prev_rows[-1][column_parents[column]].add_matched().pick_best(best_diff)
 
             if correct_char and given_char:
                 # Handle matching equivalent strings
-                for equivalent_strings in all_equivalent_strings:
-                    for a in equivalent_strings:
-                        if not ends_with(given, given_end, a):
-                            continue
+                for a, equivalent_strings in equivalent_strings_index.get(given_char, ()):
+                    if not ends_with(given, given_end, a):
+                        continue
 
-                        for b in equivalent_strings:
-                            if a == b or not ends_with(correct, correct_end, b):
-                                continue
+                    for b in equivalent_strings:
+                        if not ends_with(self.column_prefixes[column], correct_end, b):
+                            continue
 
-                            best_diff = (
-                                best_diff_by_correct_and_prev_given_queue[-len(a)][correct_end - len(b)]
-                                .add_matched(min(len(a), len(b)))
-                                .pick_best(best_diff)
-                            )
+                        best_diff = (
+                            prev_rows[-len(a)][column_paths[column][correct_end - len(b)]]
+                            .add_matched(min(len(a), len(b)))
+                            .pick_best(best_diff)
+                        )
+                        equivalence_count += 1
 
                 # Handle numeric comparisons
-                if given_end in given_numeric_ranges and correct_end in correct_numeric_ranges:
+                if given_end in given_numeric_ranges and column in column_numeric_ranges:
                     given_numeric_range = given_numeric_ranges[given_end]
-                    correct_numeric_range = correct_numeric_ranges[correct_end]
+                    correct_numeric_range = column_numeric_ranges[column]
 
                     given_numeric_len = given_numeric_range.length()
                     correct_numeric_len = correct_numeric_range.length()
 
-                    numeric_diff = best_diff_by_correct_and_prev_given_queue[-given_numeric_len][correct_numeric_range.start_index]
+                    numeric_diff = prev_rows[-given_numeric_len][column_paths[column][correct_numeric_range.start_index]]
 
                     # Mark every digit as matching and add one to ensure numeric comparison is prioritized
                     numeric_matched = min(given_numeric_len, correct_numeric_len) + 1
@@ -433,16 +729,471 @@ def diff(config: Config, given: list[str], correct: list[str]) -> Diff:
                         numeric_diff = numeric_diff.add_error(numeric_error, numeric_matched)
 
                     best_diff = numeric_diff.pick_best(best_diff)
+                    numeric_count += 1
 
             if best_diff:
-                best_diff_by_correct[correct_end] = best_diff
+                best_diff_by_correct[column] = best_diff
+
+        if stats.current is not None:
+            self.add_row_stats(stats.current, given_char, equivalence_count, numeric_count)
+
+        return best_diff_by_correct
+
+    def add_row_stats(
+        self,
+        counts: "stats.DiffStats",
+        given_char: Optional[str],
+        equivalence_count: int,
+        numeric_count: int,
+    ) -> None:
+        """
+        Add the cells and transitions checked by row() to the stats. Other than
+        equivalences and numbers, every transition is checked once for each
+        column it applies to, so they are counted from the columns.
+        """
+
+        # Every column except the first has a "correct" character
+        correct_columns = len(self.column_chars) - 1
+        factor_skip_count = len(self.column_factor_skips)
+        jump_count = sum(len(starts) for starts in self.column_jumps.values())
+        wrong_count = correct_columns + 1 if given_char else 0
+        match_count = self.column_chars.count(given_char) if given_char else 0
+
+        transitions = counts.transitions
+        transitions["missing"] += correct_columns
+        transitions["factor_skip"] += factor_skip_count
+        transitions["jump"] += jump_count
+        transitions["wrong"] += wrong_count
+        transitions["match"] += match_count
+        transitions["equivalence"] += equivalence_count
+        transitions["numeric"] += numeric_count
+
+        # The first column is only skipped if both prefixes are empty
+        counts.cells += correct_columns + (1 if given_char else 0)
+
+        # Every transition creates a diff
+        counts.diffs_created += (
+            correct_columns + factor_skip_count + jump_count + wrong_count + match_count + equivalence_count + numeric_count
+        )
+
+    def answer_diff(self, row: list[Diff], answer_index: int = 0) -> Diff:
+        """Find the diff for a full "correct" answer from the last row."""
+
+        if stats.current is not None:
+            stats.current.diffs_created += 1
+
+        return row[self.answer_columns[answer_index]].replace_error(None)
+
+    def empty_given_diff(self, answer_index: int = 0) -> Optional[Diff]:
+        """Find the diff for an empty "given" without filling in the table, if possible."""
 
-        # Push the current list into a queue for later iterations
-        best_diff_by_correct_and_prev_given_queue.append(best_diff_by_correct)
-        best_diff_by_correct = empty_diff_by_correct[:]
+        correct_text = self.correct_texts[answer_index]
+        if self.given or correct_text.factor_skips:
+            return None
+
+        if stats.current is not None:
+            stats.current.diffs_created += 1
+
+        return Diff(0, 0, [ErrorRange((0, len(correct_text.chars)), (0, 0), False, ErrorKind.REGULAR)], None)
+
+
+def diff_compiled(config: Config, given_text: CompiledText, correct_text: CompiledText, budget: Optional[Budget] = None) -> Diff:
+    """Same as diff(), but for answers which were already compiled."""
+
+    table = DiffTable(config, given_text, [correct_text])
+
+    empty_given_diff = table.empty_given_diff()
+    if empty_given_diff is not None:
+        return empty_given_diff
+
+    record_table_stages(table, budget)
 
     # Return the error ranges from the best diff for the whole strings
-    return best_diff_by_correct_and_prev_given_queue[-1][-1].replace_error(None)
+    return table.answer_diff(fill_table(table, budget))
+
+
+def diff_compiled_full_rows(
+    config: Config,
+    given_text: CompiledText,
+    correct_text: CompiledText,
+    budget: Optional[Budget] = None,
+) -> Diff:
+    """
+    Same as diff_compiled(), but keeps every row in a list instead of only the
+    rows which can still be looked back to. This uses more memory for long
+    answers, but doesn't need a bounded deque.
+    """
+
+    table = DiffTable(config, given_text, [correct_text])
+
+    empty_given_diff = table.empty_given_diff()
+    if empty_given_diff is not None:
+        return empty_given_diff
+
+    record_table_stages(table, budget)
+
+    # Starts with an empty row which is only used as the previous row for row 0
+    rows = [table.empty_row[:]]
+    for given_end in range(len(table.given) + 1):
+        # Give up if this comparison is taking too long
+        if budget:
+            budget.check_deadline()
+
+        rows.append(table.row(given_end, rows))
+
+    return table.answer_diff(rows[-1])
+
+
+def plan_seconds(
+    config: Config,
+    budget: Budget,
+    given_text: CompiledText,
+    correct_texts: list[CompiledText],
+    cells: int,
+) -> float:
+    """Estimate how long a diff will take, which is only needed if there is a deadline."""
+
+    if budget.deadline is None:
+        return 0.0
+
+    return estimate_seconds(config, given_text, correct_texts, cells)
+
+
+def record_table_stages(table: DiffTable, budget: Optional[Budget]) -> None:
+    """Record which optional stages are used for a comparison."""
+
+    if budget:
+        if table.given_numeric_ranges:
+            budget.stages.add("numeric")
+        if table.column_jumps:
+            budget.stages.add("lenient_jumps")
+
+
+def fill_table(table: DiffTable, budget: Optional[Budget] = None) -> list[Diff]:
+    """Find every row of a table, returning the last row."""
+
+    # Tracks the best diff for each substring of "correct" in previous iterations
+    best_diff_by_correct_and_prev_given_queue = collections.deque([table.empty_row[:]], table.lookbehind)
+
+    # Iterate over all possible substrings of "given"
+    for given_end in range(len(table.given) + 1):
+        # Give up if this comparison is taking too long
+        if budget:
+            budget.check_deadline()
+
+        best_diff_by_correct_and_prev_given_queue.append(table.row(given_end, best_diff_by_correct_and_prev_given_queue))
+
+    return best_diff_by_correct_and_prev_given_queue[-1]
+
+
+class PrefixNode:
+    """Node in a trie of "given" answers, used to share rows between answers with the same prefix."""
+
+    __slots__ = "table", "children", "answer_indices"
+
+    def __init__(self, table: DiffTable) -> None:
+        # Table for any answer with this prefix, since their rows are the same
+        self.table = table
+
+        # Child nodes by next character and numeric range ending at that character
+        self.children: dict[tuple[str, Optional[NumericRange]], PrefixNode] = {}
+
+        # Indices of answers which end at this node
+        self.answer_indices: list[int] = []
+
+
+def diff_many(config: Config, given: list[list[str]], correct: list[str], budget: Optional[Budget] = None) -> list[Diff]:
+    """
+    Same as diff() for many "given" answers compared with the same "correct"
+    answer. The answers are put in a trie, so rows for a prefix which is shared
+    by several answers are only found once.
+    """
+
+    correct_text = compile_chars(config, correct, True)
+    tables = [DiffTable(config, compile_chars(config, chars, False), [correct_text]) for chars in given]
+    results: list[Optional[Diff]] = [table.empty_given_diff() for table in tables]
+
+    # Answers with different equivalences from case folding can't share rows
+    roots: dict[tuple[str, ...], PrefixNode] = {}
+    for answer_index, table in enumerate(tables):
+        if results[answer_index] is not None:
+            continue
+
+        key = tuple(table.split_strings)
+        node = roots.get(key)
+        if node is None:
+            node = roots[key] = PrefixNode(table)
+
+        # Each row also depends on any numeric range ending there
+        for given_end, ch in enumerate(table.given, 1):
+            edge = (ch, table.given_numeric_ranges.get(given_end))
+            child = node.children.get(edge)
+            if child is None:
+                child = node.children[edge] = PrefixNode(table)
+
+            node = child
+
+        node.answer_indices.append(answer_index)
+
+    for root in roots.values():
+        # Rows for the current prefix, starting with an empty row which is
+        # only used as the previous row for row 0
+        rows = [root.table.empty_row[:]]
+
+        # Walk the trie depth-first, so each row is found once
+        stack = [(root, 0)]
+        while stack:
+            node, given_end = stack.pop()
+
+            # Give up if this comparison is taking too long
+            if budget:
+                budget.check_deadline()
+
+            del rows[given_end + 1 :]
+            rows.append(node.table.row(given_end, rows))
+
+            for answer_index in node.answer_indices:
+                results[answer_index] = node.table.answer_diff(rows[-1])
+
+            stack.extend((child, given_end + 1) for child in node.children.values())
+
+    return [result for result in results if result is not None]
+
+
+class IncrementalDiff:
+    """
+    Finds the same diff as diff() for a "given" answer which is being typed.
+    Rows of the table are kept between updates, so adding a character to the
+    end only requires finding one new row, and deleting characters from the
+    end only requires dropping rows.
+    """
+
+    __slots__ = "config", "correct_text", "given_str", "table", "rows"
+
+    def __init__(self, config: Config, correct: str) -> None:
+        self.config = config
+        self.correct_text = compile_text(config, correct, True)
+        self.given_str = ""
+        self.table = DiffTable(config, compile_chars(config, [], False), [self.correct_text])
+
+        # Rows which are still valid for the current "given" answer, starting
+        # with an empty row which is only used as the previous row for row 0
+        self.rows = [self.table.empty_row[:]]
+
+    def valid_row_count(self, new_table: DiffTable) -> int:
+        """Find how many of the saved rows (including the empty row) don't need to change."""
+
+        old_table = self.table
+
+        # New equivalences from case folding can change every row
+        if new_table.split_strings.keys() != old_table.split_strings.keys():
+            return 1
+
+        # Each row depends on the "given" characters up to its end
+        valid = 0
+        max_valid = min(len(self.rows) - 1, len(new_table.given) + 1)
+        while valid < max_valid and (valid == 0 or old_table.given[valid - 1] == new_table.given[valid - 1]):
+            valid += 1
+
+        # Each row also depends on any numeric range ending there. These can
+        # change when a number is extended, such as when typing "12" after "1".
+        for given_end in range(valid):
+            if old_table.given_numeric_ranges.get(given_end) != new_table.given_numeric_ranges.get(given_end):
+                valid = given_end
+                break
+
+        return valid + 1
+
+    def set_given(self, given: str) -> Diff:
+        """Replace the "given" answer, only finding rows which changed."""
+
+        new_table = DiffTable(self.config, compile_chars(self.config, group_combining(given), False), [self.correct_text])
+
+        del self.rows[self.valid_row_count(new_table) :]
+
+        self.given_str = given
+        self.table = new_table
+        return self.diff()
+
+    def append(self, text: str) -> Diff:
+        """Add text to the end of the "given" answer."""
+
+        return self.set_given(self.given_str + text)
+
+    def delete(self, count: int = 1) -> Diff:
+        """Delete characters from the end of the "given" answer."""
+
+        return self.set_given(self.given_str[: max(0, len(self.given_str) - count)])
+
+    def diff(self) -> Diff:
+        """Find the diff for the current "given" answer."""
+
+        empty_given_diff = self.table.empty_given_diff()
+        if empty_given_diff is not None:
+            return empty_given_diff
+
+        for given_end in range(len(self.rows) - 1, len(self.table.given) + 1):
+            self.rows.append(self.table.row(given_end, self.rows))
+
+        return self.table.answer_diff(self.rows[-1])
+
+
+# Function which finds the diff between compiled "given" and "correct" texts.
+# Every engine must return exactly the same diff as the reference engine.
+DiffEngine = Callable[[Config, CompiledText, CompiledText, Optional[Budget]], Diff]
+
+# Name of the engine which every other engine is checked against
+reference_engine = "reference"
+
+# Environment variable which overrides the "Diff Engine" option
+diff_engine_env_var = "ANSWERSET_DIFF_ENGINE"
+
+# Engine selected by the environment variable. It is only read once, since
+# the engine is looked up for every pair of answer choices.
+diff_engine_override = os.environ.get(diff_engine_env_var, "")
+
+# Engines which can be selected by name
+diff_engines: dict[str, DiffEngine] = {
+    reference_engine: diff_compiled,
+    "full_rows": diff_compiled_full_rows,
+}
+
+
+def register_diff_engine(name: str, engine: DiffEngine) -> None:
+    """Make an engine available to be selected by name."""
+
+    if name == reference_engine:
+        raise ValueError("the reference engine can't be replaced")
+
+    diff_engines[name] = engine
+
+
+def get_diff_engine(config: Config) -> DiffEngine:
+    """
+    Find the engine selected by the environment variable, or by the config if
+    the variable wasn't set at startup. Unknown engines fall back to the
+    reference engine.
+    """
+
+    return diff_engines.get(diff_engine_override or config.diff_engine, diff_compiled)
+
+
+def diff_choice_pairs(config: Config, pairs: list["ChoicePair"], budget: Optional[Budget] = None) -> None:
+    """
+    Find the diffs for pairs with the same "given" choice all at once. The
+    "correct" choices are put in a trie, so columns for a shared prefix are only
+    found once. Each pair gets the same diff as if it was found separately.
+    """
+
+    # The trie is only used with the reference engine, so that other engines
+    # are used for every pair when they are selected
+    if get_diff_engine(config) is not diff_compiled:
+        return
+
+    given_text = compile_text(config, pairs[0].given_str, False)
+    if not given_text.chars:
+        return
+
+    # Choices with different equivalences from case folding can't share columns
+    groups: dict[tuple[str, ...], list[tuple[ChoicePair, CompiledText]]] = {}
+    for pair in pairs:
+        correct_text = compile_text(config, pair.correct_str, True)
+        groups.setdefault(tuple(correct_text.split_strings), []).append((pair, correct_text))
+
+    for group in groups.values():
+        # Single choices are diffed on their own when needed
+        if len(group) < 2:
+            continue
+
+        correct_texts = [correct_text for _, correct_text in group]
+        table = DiffTable(config, given_text, correct_texts)
+
+        # The work for the whole trie has to fit in the budget
+        if budget:
+            cells = (len(given_text.chars) + 1) * len(table.column_chars)
+            if not budget.spend(cells, plan_seconds(config, budget, given_text, correct_texts, cells)):
+                return
+
+            budget.stages.add("choice_trie")
+            record_table_stages(table, budget)
+
+        try:
+            row = fill_table(table, budget)
+        except BudgetExceeded:
+            return
+
+        for answer_index, (pair, _) in enumerate(group):
+            pair.cached_diff = table.answer_diff(row, answer_index)
+
+        if stats.current is not None:
+            stats.current.pairs_diffed += len(group)
+
+
+def quick_diff(config: Config, given: list[str], correct: list[str]) -> Diff:
+    """
+    Cheaper replacement for diff() used when a comparison is over budget. Only
+    the common prefix and suffix are matched, and everything in between them is
+    marked as a single error range.
+    """
+
+    if config.ignore_case:
+        given = [ch.casefold() for ch in given]
+        correct = [ch.casefold() for ch in correct]
+
+    # Find the longest common prefix
+    max_len = min(len(given), len(correct))
+    prefix = 0
+    while prefix < max_len and given[prefix] == correct[prefix]:
+        prefix += 1
+
+    # Find the longest common suffix which doesn't overlap the prefix
+    suffix = 0
+    while suffix < max_len - prefix and given[-1 - suffix] == correct[-1 - suffix]:
+        suffix += 1
+
+    given_end = len(given) - suffix
+    correct_end = len(correct) - suffix
+
+    if prefix == given_end and prefix == correct_end:
+        return Diff(len(correct), 0, [], None)
+
+    # Only report the error if something was wrong or missing that is required
+    report = given_end > prefix or any(
+        not config.lenient_validation or not util.is_junk(config, ch) for ch in correct[prefix:correct_end]
+    )
+
+    error = ErrorRange((prefix, correct_end), (prefix, given_end), report, ErrorKind.REGULAR)
+    return Diff(prefix + suffix, 0, [], error).replace_error(None)
+
+
+def numeric_diff(config: Config, given_range: NumericRange, correct_range: NumericRange) -> Diff:
+    """
+    Find the diff between a given answer and a correct answer which are both
+    a single number, without needing to check each character. The result is
+    the same as diff() would return for those answers.
+    """
+
+    given_len = given_range.length()
+    correct_len = correct_range.length()
+
+    # Mark every digit as matching and add one like diff() does
+    numeric_matched = min(given_len, correct_len) + 1
+
+    result = Diff(0, 0, [], None)
+
+    if correct_range.value == given_range.value:
+        result = result.add_matched(numeric_matched)
+    else:
+        minor = correct_range.accepts(given_range, config)
+        kind = ErrorKind.MINOR if minor else ErrorKind.REGULAR
+        result = result.add_error(ErrorRange(correct_range.range(), given_range.range(), not minor, kind), numeric_matched)
+
+    # Skip over the factor override if there was one
+    if correct_range.factor is not None:
+        skip = ErrorRange((correct_range.digit_end_index, correct_range.end_index), (given_len, given_len), False, ErrorKind.SKIP)
+        result = result.add_error(skip, correct_range.end_index - correct_range.digit_end_index)
+
+    return result.replace_error(None)
 
 
 # Answer choice and comment tuple
@@ -453,10 +1204,17 @@ empty_choice: Choice = ("", "")
 
 
 class ChoicePair:
-    __slots__ = "config", "given", "correct", "correct_comment", "cached_diff"
-
-    def __init__(self, config: Config, given_choice: Choice, correct_choice: Choice) -> None:
+    __slots__ = "config", "given_str", "correct_str", "given", "correct", "correct_comment", "cached_diff", "budget"
+
+    def __init__(
+        self,
+        config: Config,
+        given_choice: Choice,
+        correct_choice: Choice,
+        budget: Optional[Budget] = None,
+    ) -> None:
         self.config = config
+        self.budget = budget
 
         # Separate comments from parts
         given_str, given_comment = given_choice
@@ -470,6 +1228,9 @@ class ChoicePair:
         else:
             self.correct_comment = correct_comment
 
+        self.given_str = given_str
+        self.correct_str = correct_str
+
         # Group combining characters to give cleaner diffs
         self.given = group_combining(given_str)
         self.correct = group_combining(correct_str)
@@ -482,9 +1243,32 @@ class ChoicePair:
 
     def diff(self) -> Diff:
         if self.cached_diff:
+            if stats.current is not None:
+                stats.current.cache_hits["diff"] += 1
+
             return self.cached_diff
 
-        self.cached_diff = diff(self.config, self.given, self.correct)
+        if stats.current is not None:
+            stats.current.pairs_diffed += 1
+
+        # Each side is only compiled once even if it is in many pairs
+        given_text = compile_text(self.config, self.given_str, False)
+        correct_text = compile_text(self.config, self.correct_str, True)
+
+        # Only do a full diff if it fits in the budget for the comparison
+        cells = (len(self.given) + 1) * (len(self.correct) + 1)
+        if self.budget is None or self.budget.spend(
+            cells,
+            plan_seconds(self.config, self.budget, given_text, [correct_text], cells),
+        ):
+            try:
+                engine = get_diff_engine(self.config)
+                self.cached_diff = engine(self.config, given_text, correct_text, self.budget)
+                return self.cached_diff
+            except BudgetExceeded:
+                pass
+
+        self.cached_diff = quick_diff(self.config, self.given, self.correct)
         return self.cached_diff
 
     def is_better_than(self, other: Optional["ChoicePair"]) -> bool:
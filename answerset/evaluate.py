@@ -0,0 +1,417 @@
+"""
+Compare how answers would be graded with different configs.
+
+Usage: python -m answerset.evaluate [options] --config <config.json> <answers.txt>
+
+The answers file has a correct answer and a given answer on each line,
+separated by a tab. Every answer is graded with the baseline config and with
+each other config, and the answers which are accepted by one config but not
+the other are listed.
+"""
+
+import argparse
+import csv
+import sys
+import unicodedata as ucd
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from itertools import zip_longest
+from typing import Optional, TextIO
+
+from .audit import load_config
+from .compare import (
+    CompiledAnswer,
+    GivenAnswer,
+    GradedAnswer,
+    grade_given_answer,
+    normalize,
+    parse_answer,
+    parse_given_answer,
+)
+from .config import Config, ungraded_options
+
+# Options which change how answers are split into comments and answer
+# choices. Configs which only differ in other options can share the splitting.
+parse_options = (
+    "Enable Answer Choice Comments [...]",
+    "Enable Answer Comments (...)",
+    "Ignore Separators in Brackets",
+    "Separators",
+)
+
+
+# Characters which can start a number
+digit_chars = frozenset("0123456789")
+
+
+@dataclass(frozen=True)
+class Dependencies:
+    """
+    Facts about a graded answer which decide whether changing an option could
+    change its result, so that it only needs to be graded again if it could.
+    """
+
+    __slots__ = "chars", "correct_chars", "has_case", "cell_count", "degraded"
+
+    # Characters in either answer, both before and after case folding
+    chars: frozenset[str]
+
+    # Characters in the correct answer, both before and after case folding
+    correct_chars: frozenset[str]
+
+    # Whether either answer is changed by case folding
+    has_case: bool
+
+    # Number of diff cells which were computed for the comparison
+    cell_count: int
+
+    # Whether the comparison went over budget and used a cheaper strategy
+    degraded: bool
+
+
+@dataclass(frozen=True)
+class GradedPair:
+    __slots__ = "correct", "given", "result", "dependencies"
+
+    correct: str
+    given: str
+    result: GradedAnswer
+    dependencies: Dependencies
+
+
+@dataclass(frozen=True)
+class Evaluation:
+    __slots__ = "correct", "given", "results"
+
+    correct: str
+    given: str
+
+    # Result of grading the answer with each config, in the same order
+    results: tuple[GradedAnswer, ...]
+
+
+@dataclass(frozen=True)
+class VerdictChanges:
+    __slots__ = "accepted", "newly_accepted", "newly_rejected", "changed_html"
+
+    # Number of answers accepted without any errors
+    accepted: int
+
+    # Answers accepted by this config but not the baseline
+    newly_accepted: list[Evaluation]
+
+    # Answers accepted by the baseline but not this config
+    newly_rejected: list[Evaluation]
+
+    # Number of answers which are shown differently from the baseline
+    changed_html: int
+
+
+def parse_key(config: Config) -> tuple[object, ...]:
+    return tuple(config.options[name] for name in parse_options)
+
+
+def text_chars(text: str) -> frozenset[str]:
+    text = ucd.normalize("NFC", text)
+    casefolded = text.casefold()
+    return frozenset(text + casefolded + ucd.normalize("NFC", casefolded))
+
+
+def find_dependencies(correct: str, given: str, result: GradedAnswer) -> Dependencies:
+    """Record the facts about a graded answer which options can depend on."""
+
+    correct_chars = text_chars(correct)
+    return Dependencies(
+        correct_chars | text_chars(given),
+        correct_chars,
+        correct.casefold() != correct or given.casefold() != given,
+        result.cell_count,
+        result.degraded,
+    )
+
+
+def could_contain(chars: frozenset[str], strings: Iterable[str]) -> bool:
+    """Check if any of the strings could be in a text with the given characters."""
+
+    return any(chars.issuperset(string) or chars.issuperset(string.casefold()) for string in strings)
+
+
+def equivalent_strings_changed(old: Config, new: Config) -> list[str]:
+    """Find the strings in any group of equivalent strings which was added, removed, or moved."""
+
+    # The order of the groups breaks ties, so a group in a different position
+    # counts as changed even if it is still in the list
+    old_groups = [tuple(group) for group in old.options["Equivalent Strings"]]
+    new_groups = [tuple(group) for group in new.options["Equivalent Strings"]]
+    return [
+        string
+        for old_group, new_group in zip_longest(old_groups, new_groups, fillvalue=())
+        if old_group != new_group
+        for string in old_group + new_group
+    ]
+
+
+def depends_on_size_limit(dependencies: Dependencies, old: Config, new: Config) -> bool:
+    if dependencies.degraded:
+        return True
+
+    return new.comparison_size_limit > 0 and dependencies.cell_count > new.comparison_size_limit
+
+
+def depends_on_time_limit(dependencies: Dependencies, old: Config, new: Config) -> bool:
+    if dependencies.degraded:
+        return True
+
+    # If there were any diffs, they might not finish within a shorter limit
+    old_limit = old.comparison_time_limit
+    new_limit = new.comparison_time_limit
+    shorter = new_limit > 0.0 and (old_limit <= 0.0 or new_limit < old_limit)
+    return shorter and dependencies.cell_count > 0
+
+
+def depends_on_choice_comments(dependencies: Dependencies, old: Config, new: Config) -> bool:
+    return "[" in dependencies.chars
+
+
+def depends_on_comments(dependencies: Dependencies, old: Config, new: Config) -> bool:
+    # Given answers only have a comment if the correct answer does
+    return "(" in dependencies.correct_chars
+
+
+def depends_on_lenient_validation(dependencies: Dependencies, old: Config, new: Config) -> bool:
+    # Only junk characters and alternatives can be missing from the correct answer
+    return bool(dependencies.correct_chars & (old.junk_char_set | new.junk_char_set | {"/"}))
+
+
+def depends_on_equivalent_strings(dependencies: Dependencies, old: Config, new: Config) -> bool:
+    return could_contain(dependencies.chars, equivalent_strings_changed(old, new))
+
+
+def depends_on_case(dependencies: Dependencies, old: Config, new: Config) -> bool:
+    if dependencies.has_case:
+        return True
+
+    # Ignored characters and equivalent strings are also case folded
+    strings = [old.options["Ignored Characters"], new.options["Ignored Characters"]]
+    for config in (old, new):
+        strings.extend(string for group in config.options["Equivalent Strings"] for string in group)
+
+    return any(string.casefold() != string for string in strings)
+
+
+def depends_on_brackets(dependencies: Dependencies, old: Config, new: Config) -> bool:
+    return bool(dependencies.chars & old.bracket_char_set)
+
+
+def depends_on_ignored_characters(dependencies: Dependencies, old: Config, new: Config) -> bool:
+    # Ignored characters are only allowed to be missing with lenient validation
+    if not old.lenient_validation and not new.lenient_validation:
+        return False
+
+    return bool(dependencies.correct_chars & (old.junk_char_set ^ new.junk_char_set))
+
+
+def depends_on_numbers(dependencies: Dependencies, old: Config, new: Config) -> bool:
+    # Numbers are only compared if the correct answer has any
+    if old.numeric_comparison_factor <= 0.0 and new.numeric_comparison_factor <= 0.0:
+        return False
+
+    return bool(dependencies.correct_chars & digit_chars)
+
+
+def depends_on_separators(dependencies: Dependencies, old: Config, new: Config) -> bool:
+    # Given answers are split on the separator picked for the correct answer
+    return bool(dependencies.correct_chars & (old.separator_set | new.separator_set))
+
+
+# Checks for whether changing an option could change the result for an answer
+option_dependencies: dict[str, Callable[[Dependencies, Config, Config], bool]] = {
+    "Comparison Size Limit": depends_on_size_limit,
+    "Comparison Time Limit": depends_on_time_limit,
+    "Enable Answer Choice Comments [...]": depends_on_choice_comments,
+    "Enable Answer Comments (...)": depends_on_comments,
+    "Enable Lenient Validation": depends_on_lenient_validation,
+    "Equivalent Strings": depends_on_equivalent_strings,
+    "Ignore Case": depends_on_case,
+    "Ignore Separators in Brackets": depends_on_brackets,
+    "Ignored Characters": depends_on_ignored_characters,
+    "Numeric Comparison Factor": depends_on_numbers,
+    "Numeric Negative Numbers": depends_on_numbers,
+    "Numeric Scientific Notation": depends_on_numbers,
+    "Numeric Thousands Separators": depends_on_numbers,
+    "Separators": depends_on_separators,
+}
+
+
+def changed_options(old: Config, new: Config) -> list[str]:
+    """Find the options which are different between two configs and affect grading."""
+
+    return [
+        name
+        for name, value in new.options.items()
+        if name not in ungraded_options and old.options.get(name) != value
+    ]
+
+
+def affecting_options(dependencies: Dependencies, old: Config, new: Config) -> list[str]:
+    """Find the changed options which could change the result for a graded answer."""
+
+    return [
+        name
+        for name in changed_options(old, new)
+        # Options without a check are assumed to affect every answer
+        if name not in option_dependencies or option_dependencies[name](dependencies, old, new)
+    ]
+
+
+def grade_pair(config: Config, correct: str, given: str) -> GradedPair:
+    compiled = parse_answer(config, correct)
+    result = grade_given_answer(config, compiled, parse_given_answer(config, compiled, normalize(config, given)))
+    return GradedPair(correct, given, result, find_dependencies(correct, given, result))
+
+
+def grade_pairs(config: Config, pairs: Iterable[tuple[str, str]]) -> Iterator[GradedPair]:
+    """Grade pairs of correct and given answers, recording what each result depends on."""
+
+    for correct, given in pairs:
+        yield grade_pair(config, correct, given)
+
+
+def regrade_pairs(old: Config, new: Config, graded: Iterable[GradedPair]) -> Iterator[GradedPair]:
+    """
+    Grade answers again after the config changed from "old" to "new", only
+    grading the ones whose dependencies are affected by the changed options.
+    """
+
+    for pair in graded:
+        if affecting_options(pair.dependencies, old, new):
+            yield grade_pair(new, pair.correct, pair.given)
+        else:
+            yield pair
+
+
+def evaluate_configs(configs: Sequence[Config], pairs: Iterable[tuple[str, str]]) -> Iterator[Evaluation]:
+    """
+    Grade each pair of correct and given answers with every config. Answers are
+    normalized and split once for all configs which split them the same way,
+    and results from the first config are reused by the other configs if none
+    of the options which they change could affect them.
+    """
+
+    # Group the configs which can share the splitting
+    groups: dict[tuple[object, ...], list[int]] = {}
+    for index, config in enumerate(configs):
+        groups.setdefault(parse_key(config), []).append(index)
+
+    # The same correct answer is usually given many times
+    parsed_correct: dict[tuple[tuple[object, ...], str], CompiledAnswer] = {}
+
+    for correct, given in pairs:
+        results: dict[int, GradedAnswer] = {}
+        dependencies: Optional[Dependencies] = None
+
+        for key, indices in groups.items():
+            parse_config = configs[indices[0]]
+            parsed: Optional[tuple[CompiledAnswer, GivenAnswer]] = None
+
+            for index in sorted(indices):
+                config = configs[index]
+                if dependencies is not None and not affecting_options(dependencies, configs[0], config):
+                    results[index] = results[0]
+                    continue
+
+                if parsed is None:
+                    compiled = parsed_correct.get((key, correct))
+                    if compiled is None:
+                        compiled = parsed_correct[key, correct] = parse_answer(parse_config, correct)
+
+                    parsed = compiled, parse_given_answer(parse_config, compiled, normalize(parse_config, given))
+
+                results[index] = grade_given_answer(config, *parsed)
+                if index == 0:
+                    dependencies = find_dependencies(correct, given, results[0])
+
+        yield Evaluation(correct, given, tuple(results[index] for index in range(len(configs))))
+
+
+def compare_verdicts(evaluations: Sequence[Evaluation], index: int, baseline: int = 0) -> VerdictChanges:
+    """Find the answers which are accepted differently by a config than by the baseline."""
+
+    accepted = 0
+    newly_accepted = []
+    newly_rejected = []
+    changed_html = 0
+
+    for evaluation in evaluations:
+        result = evaluation.results[index]
+        baseline_result = evaluation.results[baseline]
+
+        if not result.has_error:
+            accepted += 1
+
+        if result.has_error != baseline_result.has_error:
+            if result.has_error:
+                newly_rejected.append(evaluation)
+            else:
+                newly_accepted.append(evaluation)
+
+        if result.html != baseline_result.html:
+            changed_html += 1
+
+    return VerdictChanges(accepted, newly_accepted, newly_rejected, changed_html)
+
+
+def read_pairs(file: TextIO) -> Iterator[tuple[str, str]]:
+    """Read tab-separated pairs of correct and given answers."""
+
+    for row in csv.reader(file, delimiter="\t"):
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def write_table(output: TextIO, names: Sequence[str], evaluations: Sequence[Evaluation], limit: int) -> None:
+    output.write(f"Evaluated {len(evaluations)} answers.\n\n")
+
+    changes = [compare_verdicts(evaluations, index) for index in range(len(names))]
+
+    width = max(len(name) for name in names)
+    output.write(f"{'config':<{width}} {'accepted':>8} {'+accepted':>9} {'-accepted':>9} {'changed':>7}\n")
+    for name, change in zip(names, changes):
+        output.write(
+            f"{name:<{width}} {change.accepted:>8} {len(change.newly_accepted):>9} "
+            f"{len(change.newly_rejected):>9} {change.changed_html:>7}\n",
+        )
+
+    for name, change in zip(names[1:], changes[1:]):
+        if not change.newly_accepted and not change.newly_rejected:
+            continue
+
+        output.write(f"\nVerdict changes for {name}:\n")
+        for sign, evaluations_changed in (("+", change.newly_accepted), ("-", change.newly_rejected)):
+            for evaluation in evaluations_changed[:limit]:
+                output.write(f"{sign} {evaluation.correct[:60]} / {evaluation.given[:60]}\n")
+
+
+def main(argv: Optional[list[str]] = None, output: TextIO = sys.stdout) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m answerset.evaluate",
+        description="Compare how answers would be graded with different configs.",
+    )
+    parser.add_argument("path", help="file with a correct answer and a given answer on each line, separated by a tab")
+    parser.add_argument("--baseline", help="config.json or the add-on's meta.json to compare with (default: default config)")
+    parser.add_argument("--config", action="append", required=True, help="config.json or meta.json to evaluate (repeatable)")
+    parser.add_argument("--limit", type=int, default=20, help="number of verdict changes to show per config (default: 20)")
+    args = parser.parse_args(argv)
+
+    names = [args.baseline or "default", *args.config]
+    configs = [load_config(args.baseline), *(load_config(path) for path in args.config)]
+
+    with open(args.path, encoding="utf-8", newline="") as file:
+        evaluations = list(evaluate_configs(configs, read_pairs(file)))
+
+    write_table(output, names, evaluations, args.limit)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""
+Check every registered diff engine against the reference engine using random
+answers, and compare how fast each engine is. The fast paths which find diffs
+without diff() (the trie of "correct" choices, diff_many(), IncrementalDiff,
+and the numeric arrangement) are also checked against the reference engine.
+
+Usage: python -m answerset.fuzz [--seed 0] [--rounds 500] [--engine name] [--fast-path name]
+
+The answers are generated from a seed, so any mismatch can be reproduced by
+running again with the same seed and number of rounds.
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Optional, TextIO, Union
+
+from .arrange import UnmatchedChoice, arrange_by_diff, arrange_numbers
+from .config import Config
+from .diff import (
+    ChoicePair,
+    CompiledText,
+    Diff,
+    IncrementalDiff,
+    compile_text,
+    diff_choice_pairs,
+    diff_compiled,
+    diff_engines,
+    diff_many,
+    reference_engine,
+)
+from .group import group_combining
+
+# Pieces which random answers are built from
+fuzz_words = ["a", "ab", "abc", "ba", "cab", "i am", "i'm", "colour", "color"]
+fuzz_numbers = ["1", "2", "12", "3.5", "-4", "1,000", "2e3", "0.5x"]
+fuzz_joiners = [" ", " ", "/", "-", ".", "'", ", ", "; ", "/ "]
+
+# Answers which are only a number, including factor overrides and negative numbers
+fuzz_plain_numbers = ["1", "2", "12", "13", "3.5", "-4", "-5", "1,000", "2e3", "100", "105", "13?2", "0", "-0.5"]
+
+# Words with combining marks, which are grouped with the character before them
+fuzz_combining_words = ["e\u0301", "cafe\u0301", "n\u0303o", "u\u0308ber"]
+
+# Equivalences which can be matched by the pieces above
+fuzz_equivalent_strings = [["i am", "i'm"], ["colour", "color"], ["ab", "ba"], ["1", "one"]]
+
+
+@dataclass(frozen=True)
+class Mismatch:
+    __slots__ = "engine", "options", "given", "correct", "expected", "actual"
+
+    # Name of the engine or fast path which didn't match the reference engine
+    engine: str
+
+    # Options of the config used for the comparison
+    options: dict[str, Any]
+
+    given: str
+    correct: str
+
+    # Diff (or arrangement for the numbers fast path) from the reference
+    # engine and from the engine or fast path being checked
+    expected: object
+    actual: object
+
+
+@dataclass(frozen=True)
+class FuzzReport:
+    __slots__ = "rounds", "seconds", "fast_path_checks", "mismatches"
+
+    # Number of random pairs compared by each engine
+    rounds: int
+
+    # Total time spent in each engine
+    seconds: dict[str, float]
+
+    # Number of diffs or arrangements checked for each fast path
+    fast_path_checks: dict[str, int]
+
+    mismatches: list[Mismatch]
+
+    def relative_speed(self, engine: str) -> float:
+        """Find how many times faster an engine is than the reference engine."""
+
+        seconds = self.seconds[engine]
+        return self.seconds[reference_engine] / seconds if seconds > 0.0 else 0.0
+
+
+def random_piece(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.15:
+        return rng.choice(fuzz_numbers)
+    elif kind < 0.3:
+        return rng.choice(fuzz_combining_words)
+    elif kind < 0.45:
+        return "(" + rng.choice(fuzz_words) + ")"
+    elif kind < 0.55:
+        return "[" + rng.choice(fuzz_words) + rng.choice(fuzz_joiners) + rng.choice(fuzz_words) + "]"
+    else:
+        return rng.choice(fuzz_words)
+
+
+def random_answer(rng: random.Random, max_pieces: int = 6) -> str:
+    pieces = [random_piece(rng) for _ in range(rng.randint(1, max_pieces))]
+    answer = pieces[0]
+    for piece in pieces[1:]:
+        answer += rng.choice(fuzz_joiners) + piece
+
+    # Sometimes change the case to check case folding
+    return answer.upper() if rng.random() < 0.1 else answer
+
+
+def mutate_answer(rng: random.Random, answer: str) -> str:
+    """Make a "given" answer which is similar to a "correct" answer."""
+
+    chars = list(answer)
+    for _ in range(rng.randint(0, 4)):
+        position = rng.randint(0, len(chars))
+        action = rng.random()
+        if action < 0.4 and position < len(chars):
+            del chars[position]
+        elif action < 0.7:
+            chars.insert(position, rng.choice(["a", "b", "1", "2", "/", " ", "(", ")", "\u0301"]))
+        elif position < len(chars):
+            chars[position] = rng.choice("abxyz9")
+
+    given = "".join(chars)
+
+    # Replace whole words with their equivalences
+    for xs in fuzz_equivalent_strings:
+        if xs[0] in given and rng.random() < 0.5:
+            given = given.replace(xs[0], xs[1], 1)
+
+    return given
+
+
+def random_config(rng: random.Random) -> Config:
+    return Config({
+        "Enable Lenient Validation": rng.random() < 0.7,
+        "Ignore Case": rng.random() < 0.7,
+        "Equivalent Strings": fuzz_equivalent_strings if rng.random() < 0.5 else [],
+        "Numeric Comparison Factor": rng.choice([0.0, 1.0, 1.5]),
+        "Numeric Negative Numbers": rng.random() < 0.5,
+        "Numeric Scientific Notation": rng.random() < 0.3,
+        "Numeric Thousands Separators": rng.choice(["", ","]),
+    })
+
+
+# Given and correct answers checked by a fast path, with the result expected
+# from the reference engine and the result from the fast path
+FastPathResult = tuple[str, str, object, object]
+
+# Runs a fast path on a random case, returning each result it found
+FastPath = Callable[[random.Random, Config, str, str], list[FastPathResult]]
+
+
+def reference_diff(config: Config, given: str, correct: str) -> Diff:
+    return diff_compiled(config, compile_text(config, given, False), compile_text(config, correct, True))
+
+
+def fast_path_choice_trie(rng: random.Random, config: Config, given: str, correct: str) -> list[FastPathResult]:
+    """Diff several "correct" choices with shared prefixes all at once."""
+
+    cut = rng.randint(0, len(correct))
+    choices = [correct, correct + rng.choice(fuzz_joiners) + random_piece(rng), correct[:cut], mutate_answer(rng, correct)]
+    pairs = [ChoicePair(config, (given, ""), (choice, "")) for choice in choices if choice]
+
+    # Exact matches are found before diffing, so they don't have a full diff
+    pairs = [pair for pair in pairs if pair.cached_diff is None]
+    if not pairs:
+        return []
+
+    diff_choice_pairs(config, pairs)
+    return [
+        (pair.given_str, pair.correct_str, reference_diff(config, pair.given_str, pair.correct_str), pair.diff())
+        for pair in pairs
+    ]
+
+
+def fast_path_diff_many(rng: random.Random, config: Config, given: str, correct: str) -> list[FastPathResult]:
+    """Diff several "given" answers with shared prefixes all at once."""
+
+    cut = rng.randint(0, len(given))
+    answers = [given, given[:cut], given[:cut] + mutate_answer(rng, given[cut:]), mutate_answer(rng, given)]
+    diffs = diff_many(config, [group_combining(answer) for answer in answers], group_combining(correct))
+    return [(answer, correct, reference_diff(config, answer, correct), result) for answer, result in zip(answers, diffs)]
+
+
+def fast_path_incremental(rng: random.Random, config: Config, given: str, correct: str) -> list[FastPathResult]:
+    """Type the "given" answer a few characters at a time, sometimes deleting some."""
+
+    incremental = IncrementalDiff(config, correct)
+    results: list[FastPathResult] = []
+    typed = 0
+    while typed < len(given):
+        if rng.random() < 0.2 and incremental.given_str:
+            result = incremental.delete(rng.randint(1, 3))
+            typed = len(incremental.given_str)
+        else:
+            count = rng.randint(1, 3)
+            result = incremental.append(given[typed : typed + count])
+            typed += count
+
+        results.append((incremental.given_str, correct, reference_diff(config, incremental.given_str, correct), result))
+
+    return results
+
+
+def describe_arrangement(parts: list[Union[ChoicePair, UnmatchedChoice]]) -> list[object]:
+    """Describe an arrangement by the choices in each part and the diff of each pair."""
+
+    return [(part.given_str, part.correct_str, part.diff()) if isinstance(part, ChoicePair) else part for part in parts]
+
+
+def fast_path_numbers(rng: random.Random, config: Config, given: str, correct: str) -> list[FastPathResult]:
+    """Arrange answers made only of numbers without diffing each character."""
+
+    correct_choices = [(rng.choice(fuzz_plain_numbers), "") for _ in range(rng.randint(1, 5))]
+    given_choices = [(rng.choice(fuzz_plain_numbers), "") for _ in range(rng.randint(1, 5))]
+
+    parts = arrange_numbers(config, given_choices, correct_choices)
+    if parts is None:
+        return []
+
+    # The whole arrangement has to match, including which parts are paired
+    expected = describe_arrangement(arrange_by_diff(config, given_choices, correct_choices))
+    return [
+        (
+            ", ".join(text for text, _ in given_choices),
+            ", ".join(text for text, _ in correct_choices),
+            expected,
+            describe_arrangement(parts),
+        ),
+    ]
+
+
+# Fast paths which can be checked by name
+fast_paths: dict[str, FastPath] = {
+    "choice_trie": fast_path_choice_trie,
+    "diff_many": fast_path_diff_many,
+    "incremental": fast_path_incremental,
+    "numbers": fast_path_numbers,
+}
+
+
+def fuzz_engines(
+    seed: int = 0,
+    rounds: int = 500,
+    engines: Optional[list[str]] = None,
+    paths: Optional[list[str]] = None,
+) -> FuzzReport:
+    """
+    Compare random answers with every engine and fast path, checking each one
+    against the reference engine.
+    """
+
+    rng = random.Random(seed)
+    names = [reference_engine, *[name for name in engines or diff_engines if name != reference_engine]]
+
+    cases: list[tuple[Config, str, str, CompiledText, CompiledText]] = []
+    for _ in range(rounds):
+        config = random_config(rng)
+        correct = random_answer(rng)
+        given = mutate_answer(rng, correct) if rng.random() < 0.8 else random_answer(rng)
+        cases.append((config, given, correct, compile_text(config, given, False), compile_text(config, correct, True)))
+
+    seconds: dict[str, float] = {}
+    results: dict[str, list[Diff]] = {}
+    for name in names:
+        engine = diff_engines[name]
+
+        start = time.perf_counter()
+        results[name] = [engine(config, given_text, correct_text, None) for config, _, _, given_text, correct_text in cases]
+        seconds[name] = time.perf_counter() - start
+
+    mismatches = [
+        Mismatch(name, dict(config.options), given, correct, expected, actual)
+        for name in names[1:]
+        for (config, given, correct, _, _), expected, actual in zip(cases, results[reference_engine], results[name])
+        if expected != actual
+    ]
+
+    fast_path_checks: dict[str, int] = {}
+    for name in paths if paths is not None else fast_paths:
+        fast_path = fast_paths[name]
+        fast_path_checks[name] = 0
+
+        # Each fast path gets its own random numbers, so they can be checked separately
+        path_rng = random.Random(f"{seed}:{name}")
+        for config, given, correct, _, _ in cases:
+            for path_given, path_correct, expected, actual in fast_path(path_rng, config, given, correct):
+                fast_path_checks[name] += 1
+                if expected != actual:
+                    mismatches.append(Mismatch(name, dict(config.options), path_given, path_correct, expected, actual))
+
+    return FuzzReport(rounds, seconds, fast_path_checks, mismatches)
+
+
+def write_report(output: TextIO, report: FuzzReport, limit: int) -> None:
+    output.write(f"Compared {report.rounds} random answers.\n\n")
+    output.write(f"{'engine':<16} {'seconds':>8} {'speed':>6}\n")
+    for name, seconds in report.seconds.items():
+        output.write(f"{name:<16} {seconds:>8.3f} {report.relative_speed(name):>5.2f}x\n")
+
+    if report.fast_path_checks:
+        output.write(f"\n{'fast path':<16} {'checks':>8}\n")
+        for name, count in report.fast_path_checks.items():
+            output.write(f"{name:<16} {count:>8}\n")
+
+    if report.mismatches:
+        output.write(f"\n{len(report.mismatches)} results didn't match the reference engine:\n")
+        for mismatch in report.mismatches[:limit]:
+            output.write(f"{mismatch.engine}: given {mismatch.given!r}, correct {mismatch.correct!r}\n")
+            output.write(f"  options: {mismatch.options}\n")
+            output.write(f"  expected: {mismatch.expected}\n")
+            output.write(f"  actual:   {mismatch.actual}\n")
+
+
+def main(argv: Optional[list[str]] = None, output: TextIO = sys.stdout) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m answerset.fuzz",
+        description="Check every diff engine against the reference engine using random answers.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random answers (default: 0)")
+    parser.add_argument("--rounds", type=int, default=500, help="number of random answers to compare (default: 500)")
+    parser.add_argument("--engine", action="append", choices=sorted(diff_engines), help="engine to check (default: all)")
+    parser.add_argument("--fast-path", action="append", choices=sorted(fast_paths), help="fast path to check (default: all)")
+    parser.add_argument("--limit", type=int, default=10, help="number of mismatches to show (default: 10)")
+    args = parser.parse_args(argv)
+
+    report = fuzz_engines(args.seed, args.rounds, args.engine, args.fast_path)
+    write_report(output, report, args.limit)
+    return 1 if report.mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
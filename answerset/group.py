@@ -1,33 +1,46 @@
 import unicodedata as ucd
+from functools import cache, lru_cache
 
 
+@cache
 def is_combining(ch: str) -> bool:
     """Check if a character is a Unicode combining mark."""
 
     return ucd.category(ch).startswith("M")
 
 
-def group_combining(string: str) -> list[str]:
-    """Group combining characters with the previous character."""
+@lru_cache(maxsize=1024)
+def group_combining_cached(string: str) -> tuple[str, ...]:
+    combining = [is_combining(ch) for ch in string]
+
+    # Strings without combining characters don't need to be grouped
+    if not any(combining):
+        return tuple(string)
 
     parts = []
-    current = ""
-    for ch in string:
-        if is_combining(ch):
-            if not current:
-                current = "\xa0"
+    start = 0
+    for i in range(1, len(string)):
+        if not combining[i]:
+            parts.append(string[start:i])
+            start = i
+
+    parts.append(string[start:])
 
-            current += ch
-        else:
-            if current:
-                parts.append(current)
+    # Combining characters at the start of the string have nothing to combine with
+    if combining[0]:
+        parts[0] = "\xa0" + parts[0]
 
-            current = ch
+    return tuple(parts)
+
+
+def group_combining(string: str) -> list[str]:
+    """Group combining characters with the previous character."""
 
-    if current:
-        parts.append(current)
+    # There are no combining characters in ASCII
+    if string.isascii():
+        return list(string)
 
-    return parts
+    return list(group_combining_cached(string))
 
 
 def has_multiple_chars(string: str) -> bool:
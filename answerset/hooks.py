@@ -0,0 +1,384 @@
+import contextlib
+import functools
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from concurrent.futures import Executor, Future
+
+    from anki.cards import Card
+    from anki.collection import Collection
+    from aqt.reviewer import Reviewer
+
+    from .compare import CompiledAnswer, GradedAnswer
+    from .config import Config
+    from .telemetry import LatencyRecorder
+
+# Custom CSS for numeric comparisons
+new_css = "<style>.typePass { background-color: #ffe49b; }</style>"
+
+# Name of the add-on package, used to look up the add-on config
+addon_name = __name__.rpartition(".")[0]
+
+# User config, loaded when the first answer is compared
+user_config: Optional["Config"] = None
+
+# Maximum number of compiled answers to keep for repeat reviews
+compiled_answer_cache_size = 256
+
+# Recently compiled correct answers by raw expected answer, in least to most
+# recently used order. Since the raw expected answer is rendered from the note,
+# editing the note automatically results in a different key.
+compiled_answer_cache: "OrderedDict[str, CompiledAnswer]" = OrderedDict()
+
+# Answers which are being compiled in the background, by raw expected answer
+pending_answers: "dict[str, Future[CompiledAnswer]]" = {}
+
+# Lock for the compiled answers, since they may be added from the background
+compiled_answer_lock = threading.Lock()
+
+# Background worker for compiling answers, created when first needed
+executor: Optional["Executor"] = None
+
+# Recorder for comparison timings, created when first needed if enabled
+latency_recorder: Optional["LatencyRecorder"] = None
+
+# Matches a non-cloze "type in the answer" field in a card template
+type_field_re = re.compile(r"{{type:(?:nc:)?([^}:]+)}}")
+
+
+def get_config() -> "Config":
+    from .config import Config
+
+    try:
+        import aqt
+
+        return Config(aqt.mw.addonManager.getConfig(addon_name) if aqt.mw else None)
+    except:
+        return Config()
+
+
+def get_user_config() -> "Config":
+    global user_config
+
+    if user_config is None:
+        user_config = get_config()
+
+    return user_config
+
+
+def on_config_updated(config: Any) -> None:
+    from .config import Config
+
+    global user_config, latency_recorder
+
+    previous_config = user_config
+    user_config = Config(config)
+
+    # The timings file may have changed, so start a new recorder
+    if latency_recorder is not None:
+        latency_recorder.close()
+        latency_recorder = None
+
+    # Options which don't affect grading can be changed without compiling again
+    if user_config == previous_config:
+        return
+
+    # Compiled answers depend on the config, so they need to be compiled again
+    with compiled_answer_lock:
+        compiled_answer_cache.clear()
+
+        for future in pending_answers.values():
+            future.cancel()
+
+        pending_answers.clear()
+
+
+def strip_tags(expected: str) -> str:
+    """Strip AV and HTML tags from an expected answer."""
+
+    import aqt
+    from anki.utils import html_to_text_line
+
+    # Strip AV tags if possible
+    try:
+        if aqt.mw:
+            expected = aqt.mw.col.media.strip_av_tags(expected)
+    except:
+        pass
+
+    # Strip HTML tags
+    return html_to_text_line(expected)
+
+
+def cache_compiled_answer(expected: str, compiled: "CompiledAnswer") -> None:
+    """Add a compiled answer to the cache. The lock must be held."""
+
+    compiled_answer_cache[expected] = compiled
+    compiled_answer_cache.move_to_end(expected)
+
+    if len(compiled_answer_cache) > compiled_answer_cache_size:
+        compiled_answer_cache.popitem(last=False)
+
+
+def get_compiled_answer(expected: str) -> "CompiledAnswer":
+    """Strip tags from an expected answer and compile it, reusing previous results."""
+
+    with compiled_answer_lock:
+        compiled = compiled_answer_cache.get(expected)
+        if compiled is not None:
+            compiled_answer_cache.move_to_end(expected)
+            return compiled
+
+        future = pending_answers.get(expected)
+
+    # If the answer is already being compiled in the background, wait for it
+    if future is not None:
+        with contextlib.suppress(Exception):
+            compiled = future.result()
+
+    if compiled is None:
+        from .compare import compile_answer
+
+        compiled = compile_answer(get_user_config(), strip_tags(expected))
+
+    with compiled_answer_lock:
+        cache_compiled_answer(expected, compiled)
+
+    return compiled
+
+
+def finish_precompiling(expected: str, future: "Future[CompiledAnswer]") -> None:
+    with compiled_answer_lock:
+        # The config may have been updated while compiling
+        if pending_answers.get(expected) is not future:
+            return
+
+        del pending_answers[expected]
+
+        if not future.cancelled() and future.exception() is None:
+            cache_compiled_answer(expected, future.result())
+
+
+def precompile_answer(expected: str) -> None:
+    """Start compiling an expected answer in the background before it is needed."""
+
+    global executor
+
+    with compiled_answer_lock:
+        if expected in compiled_answer_cache or expected in pending_answers:
+            return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    from .compare import compile_answer
+
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="answerset")
+
+    # Stripping tags uses the collection, so it must be done on the main thread
+    future = executor.submit(compile_answer, get_user_config(), strip_tags(expected), eager=True)
+
+    with compiled_answer_lock:
+        pending_answers[expected] = future
+
+    future.add_done_callback(functools.partial(finish_precompiling, expected))
+
+
+def get_expected_answer(card: "Card") -> Optional[str]:
+    """Find the expected answer for a card with a non-cloze "type in the answer" field."""
+
+    qfmt = card.template()["qfmt"]
+    if not isinstance(qfmt, str):
+        return None
+
+    match = type_field_re.search(qfmt)
+    if not match:
+        return None
+
+    note = card.note()
+    field = match[1]
+    if field not in note:
+        return None
+
+    return note[field]
+
+
+def on_show_question(card: "Card") -> None:
+    """Compile the answer for the current card and upcoming cards while the question is shown."""
+
+    import aqt
+
+    config = get_user_config()
+    if not config.precompile_answers or not aqt.mw:
+        return
+
+    # The reviewer finds the expected answer while rendering the question
+    expected = getattr(aqt.mw.reviewer, "typeCorrect", None)
+    if expected:
+        precompile_answer(expected)
+
+    if config.precompile_upcoming_cards <= 0:
+        return
+
+    # Only the v3 scheduler can list upcoming cards
+    get_queued_cards = getattr(aqt.mw.col.sched, "get_queued_cards", None)
+    if get_queued_cards is None:
+        return
+
+    try:
+        queued_cards = get_queued_cards(fetch_limit=config.precompile_upcoming_cards + 1).cards
+    except:
+        return
+
+    for queued_card in queued_cards:
+        if queued_card.card.id == card.id:
+            continue
+
+        try:
+            expected = get_expected_answer(aqt.mw.col.get_card(queued_card.card.id))
+        except:
+            continue
+
+        if expected:
+            precompile_answer(expected)
+
+
+def get_latency_recorder(config: "Config") -> "LatencyRecorder":
+    from .telemetry import LatencyRecorder
+
+    global latency_recorder
+
+    if latency_recorder is None:
+        path = None
+        if config.comparison_timings_file:
+            # Relative paths are kept with the add-on's user files
+            user_files = os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_files")
+            path = os.path.join(user_files, config.comparison_timings_file)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        latency_recorder = LatencyRecorder(path)
+
+    return latency_recorder
+
+
+def record_comparison(config: "Config", compiled: "CompiledAnswer", provided: str, graded: "GradedAnswer", start: float) -> None:
+    """Record how long a comparison took, along with the size of its inputs."""
+
+    from .group import group_combining
+    from .telemetry import ComparisonRecord, max_answer_length
+
+    milliseconds = (time.perf_counter() - start) * 1000.0
+
+    get_latency_recorder(config).record(
+        ComparisonRecord(
+            milliseconds,
+            compiled.text[:max_answer_length],
+            len(group_combining(provided)),
+            len(group_combining(compiled.text)),
+            graded.given_choice_count,
+            len(compiled.choices),
+            tuple(sorted(graded.stages)),
+            graded.degraded,
+        ),
+    )
+
+
+def show_comparison_timings() -> None:
+    """Show the recorded comparison timings, opened from the Tools menu."""
+
+    from aqt.utils import showText
+
+    config = get_user_config()
+    if config.record_comparison_timings:
+        text = get_latency_recorder(config).report()
+    else:
+        text = 'Enable "Record Comparison Timings" in the add-on config to record how long checking each answer takes.'
+
+    showText(text, title="Answer Set Comparison Timings")
+
+
+def grade_with_user_config(compiled_answer: "Callable[[], CompiledAnswer]", provided: str) -> str:
+    # The comparison modules are only loaded once the first answer is checked
+    from .compare import grade_compiled_answer
+
+    config = get_user_config()
+    start = time.perf_counter()
+    compiled = compiled_answer()
+    graded = grade_compiled_answer(config, compiled, provided)
+
+    if config.record_comparison_timings:
+        record_comparison(config, compiled, provided, graded, start)
+
+    return new_css + graded.html
+
+
+def compare_with_user_config(correct: str, given: str) -> str:
+    from .compare import compile_answer
+
+    return grade_with_user_config(lambda: compile_answer(get_user_config(), correct), given)
+
+
+# Up to Anki 2.1.54
+def correct(self: "Reviewer", given: str, correct: str, **kwargs: Any) -> str:
+    return compare_with_user_config(correct, given)
+
+
+# Anki 2.1.56+ (correction was moved to Rust backend)
+def compare_answer(self: "Collection", expected: str, provided: str) -> str:
+    return grade_with_user_config(lambda: get_compiled_answer(expected), provided)
+
+
+def install_hooks() -> None:
+    """
+    Replace Anki's answer comparison. This should only be called when running
+    in Anki, where the modules being patched have already been loaded.
+    """
+
+    try:
+        import aqt
+
+        # Apply config changes without restarting
+        if aqt.mw:
+            aqt.mw.addonManager.setConfigUpdatedAction(addon_name, on_config_updated)
+    except ImportError:
+        pass
+
+    try:
+        import aqt
+        from aqt.qt import QAction, qconnect
+
+        # Recorded timings are kept in memory, so they can be shown from the Tools menu
+        if aqt.mw:
+            action = QAction("Answer Set Comparison Timings", aqt.mw)
+            qconnect(action.triggered, show_comparison_timings)
+            aqt.mw.form.menuTools.addAction(action)
+    except ImportError:
+        pass
+
+    try:
+        from aqt import gui_hooks
+
+        gui_hooks.reviewer_did_show_question.append(on_show_question)
+    except ImportError:
+        pass
+
+    try:
+        from aqt.reviewer import Reviewer
+
+        Reviewer.correct = correct  # type: ignore
+    except ImportError:
+        pass
+
+    try:
+        from anki.collection import Collection
+        from anki.utils import html_to_text_line  # noqa: F401
+
+        Collection.compare_answer = compare_answer  # type: ignore
+    except ImportError:
+        pass
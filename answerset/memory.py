@@ -0,0 +1,147 @@
+"""
+Find how much memory checking one answer takes, and where it is allocated.
+
+Usage: python -m answerset.memory [--config config.json] <correct> <given>
+
+The answer is checked with tracemalloc tracing every allocation. Along with
+the peak memory, the lines which allocated the most memory still in use near
+the peak are listed, since these are what would need to shrink to lower it.
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from types import FrameType
+from typing import Any, Optional, TextIO
+
+from .audit import load_config
+from .compare import compare_answer_no_html
+from .config import Config
+from .diff import compile_text
+
+# Only take a new snapshot once memory has grown this much past the last one,
+# since taking a snapshot is much slower than checking the traced memory
+snapshot_growth = 1.1
+
+
+@dataclass(frozen=True)
+class AllocationSite:
+    __slots__ = "location", "kib", "count"
+
+    # File and line where the memory was allocated
+    location: str
+
+    # Memory allocated by the line which was still in use
+    kib: float
+
+    # Number of blocks allocated by the line which were still in use
+    count: int
+
+
+@dataclass(frozen=True)
+class MemoryProfile:
+    __slots__ = "peak_kib", "sites"
+
+    # Peak memory allocated while checking the answer
+    peak_kib: float
+
+    # Lines which allocated the most memory in use near the peak, largest first
+    sites: list[AllocationSite]
+
+
+class PeakSnapshots:
+    """Profiler function which takes a snapshot whenever traced memory reaches a new peak."""
+
+    __slots__ = "snapshot", "snapshot_size"
+
+    def __init__(self) -> None:
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.snapshot_size = 0
+
+    def __call__(self, frame: FrameType, event: str, arg: Any) -> None:
+        if event != "return":
+            return
+
+        size, _ = tracemalloc.get_traced_memory()
+        if size > self.snapshot_size * snapshot_growth:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_size = size
+
+
+def short_location(filename: str, lineno: int) -> str:
+    """Show a location with only the file's folder, like "answerset/diff.py:42"."""
+
+    folder, name = os.path.split(filename)
+    return f"{os.path.join(os.path.basename(folder), name)}:{lineno}"
+
+
+def profile_answer(config: Config, correct: str, given: str, limit: int = 10) -> MemoryProfile:
+    """Check an answer while tracing memory, without anything already compiled."""
+
+    compile_text.cache_clear()
+
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+
+    peak_snapshots = PeakSnapshots()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        peak_snapshots.snapshot_size = start
+
+        sys.setprofile(peak_snapshots)
+        try:
+            compare_answer_no_html(config, correct, given)
+        finally:
+            sys.setprofile(None)
+
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+
+    sites = []
+    if peak_snapshots.snapshot is not None:
+        # Ignore memory used by the profiler itself
+        snapshot = peak_snapshots.snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+
+        for statistic in snapshot.statistics("lineno")[:limit]:
+            frame = statistic.traceback[0]
+            sites.append(AllocationSite(short_location(frame.filename, frame.lineno), statistic.size / 1024, statistic.count))
+
+    return MemoryProfile((peak - start) / 1024, sites)
+
+
+def write_profile(output: TextIO, profile: MemoryProfile) -> None:
+    output.write(f"Peak memory: {profile.peak_kib:.1f} KiB\n")
+
+    if profile.sites:
+        output.write("\nLargest allocations near the peak:\n")
+        output.write(f"{'KiB':>10} {'blocks':>8}  location\n")
+        for site in profile.sites:
+            output.write(f"{site.kib:>10.1f} {site.count:>8}  {site.location}\n")
+
+
+def main(argv: Optional[list[str]] = None, output: TextIO = sys.stdout) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m answerset.memory",
+        description="Find how much memory checking one answer takes, and where it is allocated.",
+    )
+    parser.add_argument("correct", help="expected answer")
+    parser.add_argument("given", help="typed answer")
+    parser.add_argument("--config", help="config.json or the add-on's meta.json (default: default config)")
+    parser.add_argument("--limit", type=int, default=10, help="number of allocation sites to show (default: 10)")
+    args = parser.parse_args(argv)
+
+    write_profile(output, profile_answer(load_config(args.config), args.correct, args.given, args.limit))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,11 @@
 import math
+import re
 from dataclasses import dataclass
+from functools import cache
 from typing import Optional, Union
 
 from .config import Config
 
-digits = "0123456789"
 factor_separator = "?"
 
 
@@ -27,19 +28,20 @@ class NumericRange:
         if factor == 1.0:
             return False
 
-        try:
-            big = float(max(self.value, other.value))
-            small = float(min(self.value, other.value))
+        # Factors only make sense for numbers with the same sign, and nothing is
+        # close to zero except zero itself
+        if self.value == 0 or other.value == 0 or (self.value < 0) != (other.value < 0):
+            return False
 
-            if factor > 1.0:
-                difference_factor = big / small
-                return math.isfinite(difference_factor) and difference_factor <= factor
-            else:
-                difference_factor = small / big
-                return math.isfinite(difference_factor) and factor <= difference_factor
+        big = float(max(abs(self.value), abs(other.value)))
+        small = float(min(abs(self.value), abs(other.value)))
 
-        except ZeroDivisionError:
-            return False
+        if factor > 1.0:
+            difference_factor = big / small
+            return math.isfinite(difference_factor) and difference_factor <= factor
+        else:
+            difference_factor = small / big
+            return math.isfinite(difference_factor) and factor <= difference_factor
 
     def range(self) -> tuple[int, int]:
         return self.start_index, self.digit_end_index
@@ -48,59 +50,77 @@ class NumericRange:
         return self.digit_end_index - self.start_index
 
 
-def skip_digits(answer: list[str], index: int) -> int:
-    """Skip over a series of digits, assuming the first digit is valid."""
+# Placeholder for characters which can't be part of a number
+non_numeric_placeholder = "\x00"
 
-    index += 1
 
-    while index < len(answer) and answer[index] in digits:
-        index += 1
+@cache
+def compile_numeric_pattern(
+    allow_factor: bool,
+    negative_numbers: bool,
+    scientific_notation: bool,
+    thousands_separators: str,
+) -> "re.Pattern[str]":
+    """Compile a pattern matching the number formats enabled in the config."""
 
-    return index
+    number = "[0-9]+"
 
+    # Digits can only be grouped in threes, otherwise they're separate numbers
+    if thousands_separators:
+        separators = "".join(re.escape(sep) for sep in thousands_separators)
+        number = f"(?:[0-9]{{1,3}}(?:[{separators}][0-9]{{3}}(?![0-9]))+|{number})"
 
-def skip_float(answer: list[str], index: int) -> int:
-    """Skip over a float with optional decimals, assuming the first digit is valid."""
+    number += r"(?:\.[0-9]+)?"
 
-    index = skip_digits(answer, index)
+    if scientific_notation:
+        number += r"(?:[eE][+\-\u2212]?[0-9]+)?"
 
-    if index + 1 < len(answer) and answer[index] == "." and answer[index + 1] in digits:
-        index = skip_digits(answer, index + 1)
+    # A sign can't come after a letter or digit, since then it's probably a hyphen
+    if negative_numbers:
+        number = r"(?:(?<![\w.])[\-\u2212])?" + number
 
-    return index
+    pattern = f"(?P<number>{number})"
 
+    if allow_factor:
+        pattern += rf"(?:{re.escape(factor_separator)}(?P<factor>[0-9]+(?:\.[0-9]+)?))?"
 
-def find_numeric_ranges(answer: list[str], allow_factor: bool) -> list[NumericRange]:
-    """Find all numeric ranges present in an answer for matching."""
+    return re.compile(pattern)
 
-    try:
-        result: list[NumericRange] = []
 
-        index = 0
-        while index < len(answer):
-            # Find next digit
-            if answer[index] not in digits:
-                index += 1
-                continue
+def parse_number(number: str, thousands_separators: str) -> Union[int, float]:
+    for sep in thousands_separators:
+        number = number.replace(sep, "")
 
-            # Skip over valid float
-            start_index = index
-            index = skip_float(answer, start_index)
-            digit_end_index = index
+    number = number.replace("\u2212", "-")
+    return float(number) if "." in number or "e" in number or "E" in number else int(number)
 
-            # Parse float
-            value_str = "".join(answer[start_index:digit_end_index])
-            value = float(value_str) if "." in value_str else int(value_str)
 
-            factor: Optional[float] = None
+def find_numeric_ranges(answer: list[str], allow_factor: bool, config: Optional[Config] = None) -> list[NumericRange]:
+    """Find all numeric ranges present in an answer for matching."""
+
+    if config is None:
+        pattern = compile_numeric_pattern(allow_factor, False, False, "")
+        thousands_separators = ""
+    else:
+        thousands_separators = config.numeric_thousands_separators
+        pattern = compile_numeric_pattern(
+            allow_factor,
+            config.numeric_negative_numbers,
+            config.numeric_scientific_notation,
+            thousands_separators,
+        )
+
+    # Every character in the string must line up with a character in the
+    # answer, so replace any combined characters with a placeholder
+    string = "".join(ch if len(ch) == 1 else non_numeric_placeholder for ch in answer)
 
-            # Check for factor annotation
-            if allow_factor and index + 1 < len(answer) and answer[index] == factor_separator and answer[index + 1] in digits:
-                factor_start_index = index + 1
-                index = skip_float(answer, factor_start_index)
-                factor = float("".join(answer[factor_start_index:index]))
+    try:
+        result: list[NumericRange] = []
 
-            result.append(NumericRange(start_index, digit_end_index, index, value, factor))
+        for match in pattern.finditer(string):
+            value = parse_number(match["number"], thousands_separators)
+            factor = float(match["factor"]) if allow_factor and match["factor"] else None
+            result.append(NumericRange(match.start(), match.end("number"), match.end(), value, factor))
 
         return result
 
@@ -108,5 +128,9 @@ def find_numeric_ranges(answer: list[str], allow_factor: bool) -> list[NumericRa
         return []
 
 
-def find_numeric_ranges_by_end_index(answer: list[str], allow_factor: bool) -> dict[int, NumericRange]:
-    return {range.digit_end_index: range for range in find_numeric_ranges(answer, allow_factor)}
+def find_numeric_ranges_by_end_index(
+    answer: list[str],
+    allow_factor: bool,
+    config: Optional[Config] = None,
+) -> dict[int, NumericRange]:
+    return {range.digit_end_index: range for range in find_numeric_ranges(answer, allow_factor, config)}
@@ -0,0 +1,267 @@
+"""
+Estimate how long a diff will take before starting it, so that comparisons
+which can't finish before the deadline use a cheaper strategy right away.
+
+Usage: python -m answerset.planner [--output planner.json]
+
+Running this module calibrates the cost model for the current machine and
+saves it with the add-on's user files, where it is loaded from when needed.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, fields
+from typing import TYPE_CHECKING, Optional, TextIO
+
+from .config import Config
+
+if TYPE_CHECKING:
+    from .diff import CompiledText
+
+# Name of the calibrated cost model in the add-on's user files
+cost_model_file = "planner.json"
+
+# Only use a cheaper strategy up front if the estimate is this many times the
+# remaining time, since estimates can be too high
+over_budget_factor = 2.0
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """
+    Cost of filling in a diff table. Each cell takes a base amount of time,
+    which grows with the number of jumps per "correct" character, equivalent
+    strings per "given" character, and numeric ranges per "correct" character.
+    """
+
+    __slots__ = (
+        "seconds_per_cell",
+        "jump_weight",
+        "equivalence_weight",
+        "numeric_weight",
+        "choice_trie_min_pairs",
+    )
+
+    # Time to find a single cell without any jumps, equivalences, or numbers
+    seconds_per_cell: float
+
+    # Extra time per cell, relative to the base, for each kind of transition
+    jump_weight: float
+    equivalence_weight: float
+    numeric_weight: float
+
+    # Minimum number of "correct" choices to diff at once using a trie
+    choice_trie_min_pairs: int
+
+
+# Cost model used until the planner is calibrated. The time per cell is on the
+# fast side of a desktop computer, so that diffs are only started with a
+# cheaper strategy if they clearly can't finish in time. With a time limit of
+# one second, that is a diff of about a million cells.
+default_cost_model = CostModel(2.0e-6, 0.25, 0.3, 0.25, 4)
+
+# Cost model used for planning, loaded when first needed
+cost_model: Optional[CostModel] = None
+
+
+def user_files_path(name: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_files", name)
+
+
+def load_cost_model(path: Optional[str] = None) -> CostModel:
+    """Load a calibrated cost model, or the default one if there isn't one."""
+
+    try:
+        with open(path or user_files_path(cost_model_file), encoding="utf-8") as file:
+            values = json.load(file)
+
+        model = CostModel(**{field.name: values[field.name] for field in fields(CostModel)})
+    except (OSError, ValueError, TypeError, KeyError):
+        return default_cost_model
+
+    return model if is_valid_cost_model(model) else default_cost_model
+
+
+def is_valid_cost_model(model: CostModel) -> bool:
+    """Check the values of a loaded cost model, so that a bad file can't break grading later."""
+
+    weights = [model.seconds_per_cell, model.jump_weight, model.equivalence_weight, model.numeric_weight]
+    return (
+        all(type(weight) in (int, float) and math.isfinite(weight) and weight >= 0.0 for weight in weights)
+        and model.seconds_per_cell > 0.0
+        and type(model.choice_trie_min_pairs) is int
+        and model.choice_trie_min_pairs >= 2
+    )
+
+
+def get_cost_model() -> CostModel:
+    global cost_model
+
+    if cost_model is None:
+        cost_model = load_cost_model()
+
+    return cost_model
+
+
+def save_cost_model(model: CostModel, path: Optional[str] = None) -> str:
+    path = path or user_files_path(cost_model_file)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(asdict(model), file, indent=4)
+        file.write("\n")
+
+    return path
+
+
+def estimate_seconds(
+    config: Config,
+    given_text: "CompiledText",
+    correct_texts: "list[CompiledText]",
+    cells: int,
+    model: Optional[CostModel] = None,
+) -> float:
+    """Estimate how long it will take to find the given number of cells of a diff table."""
+
+    model = model or get_cost_model()
+
+    correct_length = sum(len(correct_text.chars) for correct_text in correct_texts) or 1
+    jumps = sum(len(starts) for correct_text in correct_texts for starts in correct_text.jumps.values())
+    numeric_ranges = sum(len(correct_text.numeric_ranges) for correct_text in correct_texts)
+
+    given_length = len(given_text.chars) or 1
+    equivalences = sum(len(config.equivalent_strings_index.get(ch, ())) for ch in given_text.chars)
+
+    weight = (
+        1.0
+        + model.jump_weight * jumps / correct_length
+        + model.equivalence_weight * equivalences / given_length
+        + model.numeric_weight * numeric_ranges / correct_length
+    )
+
+    return cells * model.seconds_per_cell * weight
+
+
+def is_over_budget(estimate: float, remaining: Optional[float]) -> bool:
+    """Check if a diff is estimated to take much longer than the time remaining."""
+
+    return remaining is not None and estimate > remaining * over_budget_factor
+
+
+def random_text(rng: random.Random, length: int, alphabet: str) -> str:
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def time_diffs(config: Config, pairs: list[tuple[str, str]]) -> tuple[float, int]:
+    """Time diffs for pairs of given and correct answers, returning the time and number of cells."""
+
+    from .diff import compile_text, diff_compiled
+
+    texts = [(compile_text(config, given, False), compile_text(config, correct, True)) for given, correct in pairs]
+
+    start = time.perf_counter()
+    for given_text, correct_text in texts:
+        diff_compiled(config, given_text, correct_text)
+    seconds = time.perf_counter() - start
+
+    cells = sum((len(given_text.chars) + 1) * (len(correct_text.chars) + 1) for given_text, correct_text in texts)
+    return seconds, cells
+
+
+def fit_weight(base: float, seconds: float, cells: int, density: float) -> float:
+    """Find the weight for a feature from a timing of texts with that feature."""
+
+    if density <= 0.0 or cells <= 0:
+        return 0.0
+
+    return max(0.0, (seconds / cells / base - 1.0) / density)
+
+
+def calibrate_choice_trie(rng: random.Random, rounds: int, max_pairs: int = 16) -> int:
+    """Find the smallest number of "correct" choices which is faster to diff using a trie."""
+
+    from .diff import ChoicePair, diff_choice_pairs
+
+    config = Config()
+    words = [random_text(rng, rng.randint(4, 12), "abcdefgh ") for _ in range(max_pairs)]
+
+    def time_pairs(count: int, use_trie: bool) -> float:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            pairs = [ChoicePair(config, (words[0] + "x", ""), (word, "")) for word in words[:count]]
+            if use_trie:
+                diff_choice_pairs(config, pairs)
+            for pair in pairs:
+                pair.diff()
+        return time.perf_counter() - start
+
+    for count in range(2, max_pairs + 1):
+        if time_pairs(count, True) < time_pairs(count, False):
+            return count
+
+    return max_pairs
+
+
+def calibrate(rounds: int = 20, seed: int = 0) -> CostModel:
+    """Measure the cost model on the current machine."""
+
+    from .diff import compile_text
+
+    rng = random.Random(seed)
+    plain = Config()
+    numeric = Config({"Numeric Comparison Factor": 1.5})
+    equivalent = Config({"Equivalent Strings": [["a", "b"], ["c", "d"], ["e", "f"]]})
+
+    def make_pairs(make_correct: Callable[[], str], alphabet: str = "abcdefgh") -> list[tuple[str, str]]:
+        return [(random_text(rng, 40, alphabet), make_correct()) for _ in range(rounds)]
+
+    def density(config: Config, pairs: list[tuple[str, str]], count: Callable[["CompiledText"], int]) -> float:
+        texts = [compile_text(config, correct, True) for _, correct in pairs]
+        return sum(count(text) for text in texts) / max(1, sum(len(text.chars) for text in texts))
+
+    base_seconds, base_cells = time_diffs(plain, make_pairs(lambda: random_text(rng, 40, "abcdefgh")))
+    base = base_seconds / base_cells
+
+    # Brackets add jumps for parts which are allowed to be missing
+    jump_pairs = make_pairs(lambda: " ".join(f"({random_text(rng, 3, 'abcdefgh')})" for _ in range(8)))
+    jump_density = density(plain, jump_pairs, lambda text: sum(len(starts) for starts in text.jumps.values()))
+    jump_weight = fit_weight(base, *time_diffs(plain, jump_pairs), jump_density)
+
+    # Every "given" character has an equivalent string
+    equivalence_pairs = make_pairs(lambda: random_text(rng, 40, "abcdef"), "abcdef")
+    equivalence_weight = fit_weight(base, *time_diffs(equivalent, equivalence_pairs), 1.0)
+
+    # A number every few characters
+    numeric_pairs = make_pairs(lambda: " ".join(str(rng.randint(1, 99)) for _ in range(12)), "0123456789 ")
+    numeric_density = density(numeric, numeric_pairs, lambda text: len(text.numeric_ranges))
+    numeric_weight = fit_weight(base, *time_diffs(numeric, numeric_pairs), numeric_density)
+
+    return CostModel(base, jump_weight, equivalence_weight, numeric_weight, calibrate_choice_trie(rng, rounds))
+
+
+def main(argv: Optional[list[str]] = None, output: TextIO = sys.stdout) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m answerset.planner",
+        description="Calibrate the cost model used to plan comparisons on this machine.",
+    )
+    parser.add_argument("--output", help=f"file to save the cost model to (default: user_files/{cost_model_file})")
+    parser.add_argument("--rounds", type=int, default=20, help="number of diffs to time for each measurement (default: 20)")
+    args = parser.parse_args(argv)
+
+    model = calibrate(args.rounds)
+    path = save_cost_model(model, args.output)
+
+    for name, value in asdict(model).items():
+        output.write(f"{name}: {value:.3g}\n")
+    output.write(f"Saved to {path}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
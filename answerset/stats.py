@@ -0,0 +1,86 @@
+"""
+Counters for the work done while comparing answers, which help explain why
+one answer is much slower to check than another of a similar length:
+
+    with collect_stats() as stats:
+        compare_answer_no_html(config, correct, given)
+
+Nothing is counted outside of collect_stats(). Diff tables only check whether
+stats are being collected once per row, so the cost when off is negligible.
+"""
+
+from collections.abc import Generator
+from contextlib import contextmanager
+from typing import Optional
+
+# Kinds of transitions checked for each cell of a diff table
+transition_kinds = ("missing", "wrong", "match", "equivalence", "numeric", "jump", "factor_skip")
+
+# Caches which are checked before doing any work
+cache_names = ("choice_pair", "diff", "compiled_text")
+
+
+class DiffStats:
+    __slots__ = "cells", "transitions", "diffs_created", "pairs_diffed", "cache_hits"
+
+    def __init__(self) -> None:
+        # Number of cells found in diff tables
+        self.cells = 0
+
+        # Number of candidate transitions checked, by kind
+        self.transitions = dict.fromkeys(transition_kinds, 0)
+
+        # Number of Diff objects created while filling in diff tables
+        self.diffs_created = 0
+
+        # Number of answer choice pairs which needed a new diff
+        self.pairs_diffed = 0
+
+        # Number of times work was reused from a cache, by cache
+        self.cache_hits = dict.fromkeys(cache_names, 0)
+
+    def add(self, other: "DiffStats") -> None:
+        self.cells += other.cells
+        self.diffs_created += other.diffs_created
+        self.pairs_diffed += other.pairs_diffed
+
+        for kind, count in other.transitions.items():
+            self.transitions[kind] += count
+
+        for name, count in other.cache_hits.items():
+            self.cache_hits[name] += count
+
+    def __repr__(self) -> str:
+        return (
+            f"DiffStats(cells={self.cells}, transitions={self.transitions}, diffs_created={self.diffs_created}, "
+            f"pairs_diffed={self.pairs_diffed}, cache_hits={self.cache_hits})"
+        )
+
+
+# Stats for the innermost collect_stats() block (None when not collecting)
+current: Optional[DiffStats] = None
+
+
+@contextmanager
+def collect_stats() -> Generator[DiffStats, None, None]:
+    """
+    Count the work done inside the block. Work done by other threads at the
+    same time is also counted, and nested blocks are added to the outer block.
+    """
+
+    global current
+
+    from .diff import compile_text
+
+    previous = current
+    stats = current = DiffStats()
+    compiled_text_hits = compile_text.cache_info().hits
+
+    try:
+        yield stats
+    finally:
+        current = previous
+        stats.cache_hits["compiled_text"] += compile_text.cache_info().hits - compiled_text_hits
+
+        if previous is not None:
+            previous.add(stats)
@@ -0,0 +1,169 @@
+import bisect
+import heapq
+import json
+import logging
+import math
+import threading
+from dataclasses import asdict, dataclass
+from logging.handlers import RotatingFileHandler
+from typing import Any, Optional
+
+# Upper bounds of the latency histogram buckets in milliseconds, doubling from
+# 0.125 ms up to about 65 seconds. Slower comparisons go in a final bucket.
+bucket_bounds = [0.125 * 2.0**i for i in range(20)]
+
+# Maximum size of the timings file before it is rotated
+max_file_bytes = 1024 * 1024
+
+# Length that recorded answers are cut to
+max_answer_length = 100
+
+
+@dataclass(frozen=True)
+class ComparisonRecord:
+    __slots__ = (
+        "milliseconds",
+        "answer",
+        "given_graphemes",
+        "correct_graphemes",
+        "given_choices",
+        "correct_choices",
+        "stages",
+        "degraded",
+    )
+
+    # Time spent compiling and grading the answer
+    milliseconds: float
+
+    # Start of the expected answer, to help find the card
+    answer: str
+
+    # Number of grapheme clusters in each answer
+    given_graphemes: int
+    correct_graphemes: int
+
+    # Number of answer choices in each answer
+    given_choices: int
+    correct_choices: int
+
+    # Sorted names of the optional stages used for the comparison
+    stages: tuple[str, ...]
+
+    # Whether the comparison went over budget and used a cheaper strategy
+    degraded: bool
+
+
+class LatencyRecorder:
+    """
+    Collects comparison timings in a histogram so that percentiles can be
+    summarized without keeping every record, along with the slowest records.
+    Records can also be written as JSON lines to a rotating file.
+    """
+
+    def __init__(self, path: Optional[str] = None, slowest_count: int = 10) -> None:
+        self.lock = threading.Lock()
+        self.bucket_counts = [0] * (len(bucket_bounds) + 1)
+        self.count = 0
+        self.total_milliseconds = 0.0
+        self.max_milliseconds = 0.0
+        self.slowest_count = slowest_count
+
+        # Min-heap of the slowest records, with a counter to break ties
+        self.slowest: list[tuple[float, int, ComparisonRecord]] = []
+
+        self.logger: Optional[logging.Logger] = None
+        if path:
+            self.logger = logging.Logger(__name__)
+            handler = RotatingFileHandler(path, maxBytes=max_file_bytes, backupCount=1, encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+
+    def record(self, record: ComparisonRecord) -> None:
+        with self.lock:
+            self.bucket_counts[bisect.bisect_left(bucket_bounds, record.milliseconds)] += 1
+            self.count += 1
+            self.total_milliseconds += record.milliseconds
+            self.max_milliseconds = max(self.max_milliseconds, record.milliseconds)
+
+            entry = (record.milliseconds, self.count, record)
+            if len(self.slowest) < self.slowest_count:
+                heapq.heappush(self.slowest, entry)
+            elif self.slowest and entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, entry)
+
+        if self.logger:
+            self.logger.info(json.dumps(asdict(record), ensure_ascii=False))
+
+    def percentile(self, percent: float) -> float:
+        """
+        Find an upper bound for the given percentile of comparison times in
+        milliseconds, based on the histogram buckets.
+        """
+
+        with self.lock:
+            if not self.count:
+                return 0.0
+
+            # Rank of the record at the percentile, starting from 1
+            rank = max(1, math.ceil(self.count * percent / 100))
+
+            seen = 0
+            for bound, bucket_count in zip(bucket_bounds, self.bucket_counts):
+                seen += bucket_count
+                if seen >= rank:
+                    return min(bound, self.max_milliseconds)
+
+            return self.max_milliseconds
+
+    def slowest_records(self) -> list[ComparisonRecord]:
+        """Find the slowest comparisons, from slowest to fastest."""
+
+        with self.lock:
+            return [record for _, _, record in sorted(self.slowest, reverse=True)]
+
+    def summary(self) -> dict[str, Any]:
+        """Summarize the recorded comparison times in milliseconds."""
+
+        with self.lock:
+            count = self.count
+            mean = self.total_milliseconds / count if count else 0.0
+            maximum = self.max_milliseconds
+
+        return {
+            "count": count,
+            "mean": mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": maximum,
+        }
+
+    def report(self) -> str:
+        """Describe the recorded comparison times and the slowest comparisons as text."""
+
+        summary = self.summary()
+        lines = [
+            f"Answers checked: {summary['count']}",
+            f"Mean time: {summary['mean']:.2f} ms",
+            f"50% of answers: at most {summary['p50']:.2f} ms",
+            f"90% of answers: at most {summary['p90']:.2f} ms",
+            f"99% of answers: at most {summary['p99']:.2f} ms",
+            f"Slowest answer: {summary['max']:.2f} ms",
+        ]
+
+        slowest = self.slowest_records()
+        if slowest:
+            lines += ["", "Slowest answers:"]
+            for record in slowest:
+                stages = ", ".join(record.stages) or "none"
+                lines.append(
+                    f"{record.milliseconds:.2f} ms: {record.answer!r} "
+                    f"({record.given_graphemes} given and {record.correct_graphemes} correct characters, stages: {stages})",
+                )
+
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        if self.logger:
+            for handler in self.logger.handlers:
+                handler.close()
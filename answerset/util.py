@@ -1,11 +1,11 @@
-from collections.abc import Iterable
+from collections.abc import Container, Iterable
 from typing import Optional
 
 from .config import Config
 
 
 def is_junk(config: Config, ch: str) -> bool:
-    return len(ch) == 1 and ch in config.junk_chars
+    return ch in config.junk_char_set
 
 
 def find_bracket_ranges(input: Iterable[str], lenient: bool = False, nested: bool = False) -> list[tuple[int, int]]:
@@ -37,32 +37,62 @@ def find_bracket_ranges(input: Iterable[str], lenient: bool = False, nested: boo
     return found_ranges
 
 
-def index_in_any_range(index: int, ranges: list[tuple[int, int]]) -> bool:
-    return any(start <= index < end for start, end in ranges)
+def range_depths(length: int, ranges: list[tuple[int, int]]) -> list[int]:
+    """
+    Find how many of the ranges contain each index, so that checking whether an
+    index is inside of any range takes constant time.
+    """
 
+    depths = [0] * (length + 1)
+    for start, end in ranges:
+        depths[start] += 1
+        depths[end] -= 1
 
-def find_indices(haystack: str, needle: str, ranges: list[tuple[int, int]]) -> Iterable[int]:
-    return (i for i, ch in enumerate(haystack) if ch == needle and not index_in_any_range(i, ranges))
+    depth = 0
+    for i in range(length):
+        depth += depths[i]
+        depths[i] = depth
 
+    depths.pop()
+    return depths
 
-def has_separator(string: str, sep: str, bracket_ranges: list[tuple[int, int]]) -> bool:
-    return any(True for _ in find_indices(string, sep, bracket_ranges))
 
+def find_indices(haystack: str, needle: str, ranges: list[tuple[int, int]]) -> list[int]:
+    if not ranges:
+        return [i for i, ch in enumerate(haystack) if ch == needle]
 
-def split_except_for_ranges(string: str, sep: Optional[str], ranges: list[tuple[int, int]]) -> list[str]:
-    if not sep:
-        return [string]
+    depths = range_depths(len(haystack), ranges)
+    return [i for i, ch in enumerate(haystack) if ch == needle and not depths[i]]
 
-    sep_indices = list(find_indices(string, sep, ranges))
 
-    if not sep_indices:
-        return [string]
+def find_separator_indices(string: str, separators: Container[str], ranges: list[tuple[int, int]]) -> dict[str, list[int]]:
+    """Find the indices of every separator outside of the ranges in a single pass."""
+
+    depths = range_depths(len(string), ranges) if ranges else None
+
+    found: dict[str, list[int]] = {}
+    for i, ch in enumerate(string):
+        if ch in separators and not (depths and depths[i]):
+            found.setdefault(ch, []).append(i)
+
+    return found
+
+
+def split_at_indices(string: str, indices: list[int]) -> list[str]:
+    """Split a string, removing the characters at the given sorted indices."""
 
     parts = []
     last = 0
-    for i in sep_indices:
+    for i in indices:
         parts.append(string[last:i])
         last = i + 1
 
     parts.append(string[last:])
     return parts
+
+
+def split_except_for_ranges(string: str, sep: Optional[str], ranges: list[tuple[int, int]]) -> list[str]:
+    if not sep:
+        return [string]
+
+    return split_at_indices(string, find_indices(string, sep, ranges))
@@ -0,0 +1,200 @@
+import re
+import sys
+import types
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import pytest
+
+from answerset import hooks
+
+
+class FakeModule(types.ModuleType):
+    def __init__(self, name: str, **attrs: Any) -> None:
+        super().__init__(name)
+        self.__dict__.update(attrs)
+
+
+class FakeAddonManager:
+    def __init__(self) -> None:
+        self.config: dict[str, Any] = {}
+        self.config_updated_actions: dict[str, Callable[[Any], None]] = {}
+
+    def getConfig(self, module: str) -> dict[str, Any]:
+        return self.config
+
+    def setConfigUpdatedAction(self, module: str, func: Callable[[Any], None]) -> None:
+        self.config_updated_actions[module] = func
+
+    def writeConfig(self, module: str, conf: dict[str, Any]) -> None:
+        self.config = conf
+        if module in self.config_updated_actions:
+            self.config_updated_actions[module](conf)
+
+
+class FakeMedia:
+    def __init__(self) -> None:
+        self.strip_count = 0
+
+    def strip_av_tags(self, text: str) -> str:
+        self.strip_count += 1
+        return re.sub(r"\[sound:[^\]]*\]", "", text)
+
+
+class FakeCard:
+    def __init__(self, card_id: int, qfmt: str, fields: dict[str, str]) -> None:
+        self.id = card_id
+        self.qfmt = qfmt
+        self.fields = fields
+
+    def template(self) -> dict[str, Any]:
+        return {"qfmt": self.qfmt}
+
+    def note(self) -> dict[str, str]:
+        return self.fields
+
+
+@dataclass
+class FakeQueuedCard:
+    card: FakeCard
+
+
+@dataclass
+class FakeQueuedCards:
+    cards: list[FakeQueuedCard]
+
+
+class FakeScheduler:
+    def __init__(self) -> None:
+        self.queue: list[FakeCard] = []
+
+    def get_queued_cards(self, fetch_limit: int = 1) -> FakeQueuedCards:
+        return FakeQueuedCards([FakeQueuedCard(card) for card in self.queue[:fetch_limit]])
+
+
+class FakeCollection:
+    def __init__(self) -> None:
+        self.media = FakeMedia()
+        self.sched = FakeScheduler()
+
+    def get_card(self, card_id: int) -> FakeCard:
+        return next(card for card in self.sched.queue if card.id == card_id)
+
+
+class FakeReviewer:
+    def __init__(self) -> None:
+        self.typeCorrect: Optional[str] = None
+
+
+class FakeHook:
+    def __init__(self) -> None:
+        self.callbacks: list[Callable[..., None]] = []
+
+    def append(self, callback: Callable[..., None]) -> None:
+        self.callbacks.append(callback)
+
+    def __call__(self, *args: Any) -> None:
+        for callback in self.callbacks:
+            callback(*args)
+
+
+class FakeSignal:
+    def __init__(self) -> None:
+        self.callbacks: list[Callable[[], None]] = []
+
+    def connect(self, callback: Callable[[], None]) -> None:
+        self.callbacks.append(callback)
+
+
+class FakeAction:
+    def __init__(self, text: str, parent: object) -> None:
+        self.text = text
+        self.triggered = FakeSignal()
+
+    def trigger(self) -> None:
+        for callback in self.triggered.callbacks:
+            callback()
+
+
+class FakeMenu:
+    def __init__(self) -> None:
+        self.actions: list[FakeAction] = []
+
+    def addAction(self, action: FakeAction) -> None:
+        self.actions.append(action)
+
+
+class FakeForm:
+    def __init__(self) -> None:
+        self.menuTools = FakeMenu()
+
+
+class FakeMainWindow:
+    def __init__(self) -> None:
+        self.addonManager = FakeAddonManager()
+        self.form = FakeForm()
+        self.col = FakeCollection()
+        self.reviewer = FakeReviewer()
+
+
+class Reviewer:
+    pass
+
+
+class Collection:
+    pass
+
+
+def html_to_text_line(html: str) -> str:
+    return re.sub(r"<[^>]*>", "", html)
+
+
+def qconnect(signal: FakeSignal, func: Callable[[], None]) -> None:
+    signal.connect(func)
+
+
+@dataclass
+class FakeAnki:
+    mw: FakeMainWindow
+    reviewer_did_show_question: FakeHook
+    Reviewer: type[Reviewer]
+    Collection: type[Collection]
+    shown_text: list[str]
+    Card: type[FakeCard] = FakeCard
+
+
+@pytest.fixture
+def fake_anki(monkeypatch: pytest.MonkeyPatch) -> FakeAnki:
+    """Stand-in for the parts of aqt and anki used by the add-on hooks."""
+
+    mw = FakeMainWindow()
+    reviewer_did_show_question = FakeHook()
+    shown_text: list[str] = []
+
+    # Create new classes each time so that patches don't leak between tests
+    reviewer = type("Reviewer", (Reviewer,), {})
+    collection = type("Collection", (Collection,), {})
+
+    modules = {
+        "aqt": FakeModule("aqt", mw=mw),
+        "aqt.gui_hooks": FakeModule("aqt.gui_hooks", reviewer_did_show_question=reviewer_did_show_question),
+        "aqt.qt": FakeModule("aqt.qt", QAction=FakeAction, qconnect=qconnect),
+        "aqt.utils": FakeModule("aqt.utils", showText=lambda text, **kwargs: shown_text.append(text)),
+        "aqt.reviewer": FakeModule("aqt.reviewer", Reviewer=reviewer),
+        "anki": FakeModule("anki"),
+        "anki.collection": FakeModule("anki.collection", Collection=collection),
+        "anki.utils": FakeModule("anki.utils", html_to_text_line=html_to_text_line),
+    }
+
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+
+    monkeypatch.setattr(hooks, "user_config", None)
+    monkeypatch.setattr(hooks, "compiled_answer_cache", OrderedDict())
+    monkeypatch.setattr(hooks, "pending_answers", {})
+    monkeypatch.setattr(hooks, "executor", None)
+    monkeypatch.setattr(hooks, "latency_recorder", None)
+
+    return FakeAnki(mw, reviewer_did_show_question, reviewer, collection, shown_text)
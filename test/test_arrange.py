@@ -1,8 +1,23 @@
+import random
+from dataclasses import replace
 from typing import Union
 
-from answerset.arrange import UnmatchedChoice, arrange
+import pytest
+
+from answerset import arrange as arrange_module
+from answerset import planner
+from answerset.arrange import (
+    CandidateIndex,
+    UnmatchedChoice,
+    arrange,
+    arrange_by_diff,
+    arrange_numbers,
+    find_plain_number,
+)
+from answerset.budget import Budget
+from answerset.compare import compare_answer_no_html
 from answerset.config import Config
-from answerset.diff import Choice, ChoicePair
+from answerset.diff import Choice, ChoicePair, Diff, diff, numeric_diff
 
 test_config = Config()
 
@@ -16,6 +31,10 @@ def to_basic_choices(pairs: list[Union[ChoicePair, UnmatchedChoice]]) -> list[Un
     ]
 
 
+def describe_parts(parts: list[Union[ChoicePair, UnmatchedChoice]]) -> list[Union[tuple[str, str, Diff], UnmatchedChoice]]:
+    return [(part.given_str, part.correct_str, part.diff()) if isinstance(part, ChoicePair) else part for part in parts]
+
+
 def test_arrange_empty() -> None:
     result = arrange(test_config, [], [])
     assert result == []
@@ -215,3 +234,211 @@ def test_arrange_with_only_junk() -> None:
         UnmatchedChoice(True, ("...", "")),
     ]
     assert to_basic_choices(result) == expected
+
+
+numeric_config = Config({
+    "Numeric Comparison Factor": 1.1,
+})
+
+
+def test_numeric_diff_same_as_diff() -> None:
+    pairs = [
+        ("12", "12"),
+        ("12.0", "12"),
+        ("13", "12"),
+        ("42", "12"),
+        ("42", "12?4"),
+        ("12", "12?1.0"),
+        ("9", "10?0.8"),
+    ]
+    for given, correct in pairs:
+        given_number = find_plain_number(numeric_config, given, False)
+        correct_number = find_plain_number(numeric_config, correct, True)
+        assert given_number is not None and correct_number is not None
+        assert numeric_diff(numeric_config, given_number, correct_number) == diff(numeric_config, list(given), list(correct))
+
+
+def test_find_plain_number() -> None:
+    assert find_plain_number(numeric_config, "12?2", True) is not None
+    assert find_plain_number(numeric_config, "12?2", False) is None
+    assert find_plain_number(numeric_config, "12 m", True) is None
+    assert find_plain_number(numeric_config, "1 2", True) is None
+    assert find_plain_number(test_config, "12", True) is None
+
+
+def test_arrange_numbers() -> None:
+    result = arrange(
+        numeric_config,
+        [("11", ""), ("3", ""), ("100", ""), ("6", ""), ("8", "")],
+        [("3", ""), ("5", ""), ("7", ""), ("11.5", "")],
+    )
+    # Pairs with more matching digits are better, even if the values are further apart
+    expected = [
+        ("11", ("5", "")),
+        ("3", ("3", "")),
+        ("100", ("11.5", "")),
+        ("6", ("7", "")),
+        UnmatchedChoice(False, ("8", "")),
+    ]
+    assert to_basic_choices(result) == expected
+
+
+def test_arrange_numbers_unmatched_correct() -> None:
+    result = arrange(
+        numeric_config,
+        [("7", "")],
+        [("3", ""), ("5", ""), ("7", "")],
+    )
+    expected = [
+        ("7", ("7", "")),
+        UnmatchedChoice(True, ("3", "")),
+        UnmatchedChoice(True, ("5", "")),
+    ]
+    assert to_basic_choices(result) == expected
+
+
+def test_arrange_numbers_factor_override() -> None:
+    result = arrange(
+        numeric_config,
+        [("10", "")],
+        [("20?2", ""), ("10.5?1.0", "")],
+    )
+    expected = [
+        ("10", ("10.5?1.0", "")),
+        UnmatchedChoice(True, ("20?2", "")),
+    ]
+    assert to_basic_choices(result) == expected
+
+
+def test_arrange_numbers_not_all_numbers() -> None:
+    result = arrange(
+        numeric_config,
+        [("3", ""), ("x", "")],
+        [("x", ""), ("3", "")],
+    )
+    expected = [
+        ("3", ("3", "")),
+        ("x", ("x", "")),
+    ]
+    assert to_basic_choices(result) == expected
+
+
+@pytest.mark.parametrize(
+    ("factor", "correct", "given", "expected"),
+    [
+        (
+            2.0,
+            "5, 19, 11, 20",
+            "10, 0.5, 3, 11",
+            "<div id=typeans><code><span class=typePass>10</span></code>, <code><span class=typeBad>0.5</span></code>, <code><span class=typePass>3</span></code>, <code><span class=typeGood>11</span><br><span id=typearrow>&darr;</span><br><span class=typePass>19</span></code>, <code><span class=typeMissed>20</span></code>, <code><span class=typePass>5</span></code>, <code><span class=typeGood>11</span></code></div>",
+        ),
+        (
+            2.0,
+            "10?1.5, 19, 11",
+            "20, 12, 20, 3.5, 3.5",
+            "<div id=typeans><code><span class=typePass>20</span></code>, <code><span class=typePass>12</span></code>, <code><span class=typePass>20</span></code>, <code><span class=typeBad>3.5</span></code>, <code><span class=typeBad>3.5</span><br><span id=typearrow>&darr;</span><br><span class=typePass>19</span></code>, <code><span class=typePass>10</span></code>, <code><span class=typePass>11</span></code></div>",
+        ),
+    ],
+)
+def test_compare_numbers_best_pair_first(factor: float, correct: str, given: str, expected: str) -> None:
+    config = Config({"Numeric Comparison Factor": factor})
+    result = compare_answer_no_html(config, correct, given)
+    assert result == expected
+
+
+def test_arrange_numbers_matches_diffs() -> None:
+    rng = random.Random(0)
+    numbers = ["1", "2", "3", "5", "10", "11", "12", "19", "20", "100", "0.5", "3.5", "1.0", "01", "-4", "1,000", "2e3", "10?1.5", "13?2"]
+    for _ in range(500):
+        config = Config({
+            "Numeric Comparison Factor": rng.choice([1.0, 1.5, 2.0]),
+            "Numeric Negative Numbers": rng.random() < 0.5,
+            "Numeric Scientific Notation": rng.random() < 0.5,
+            "Numeric Thousands Separators": rng.choice(["", ","]),
+        })
+        given: list[Choice] = [(rng.choice(numbers), "") for _ in range(rng.randint(1, 6))]
+        correct: list[Choice] = [(rng.choice(numbers), "") for _ in range(rng.randint(1, 6))]
+
+        result = arrange_numbers(config, given, correct)
+        if result is not None:
+            assert describe_parts(result) == describe_parts(arrange_by_diff(config, given, correct))
+
+
+def test_compare_numbers_rendering() -> None:
+    correct = "3, 5, 7?1.5"
+    given = "5.0, 3.2, 9"
+    result = compare_answer_no_html(numeric_config, correct, given)
+    assert result == "<div id=typeans><code><span class=typePass>5.0</span></code>, <code><span class=typePass>3.2</span></code>, <code><span class=typeBad>9</span><br><span id=typearrow>&darr;</span><br><span class=typePass>7</span></code>, <code><span class=typePass>3</span></code>, <code><span class=typeMissed>5</span></code></div>"
+
+
+def many_choices(count: int) -> list[Choice]:
+    return [(f"{word}{i}", "") for i in range(count) for word in ("apple", "banana")]
+
+
+def test_candidate_index_rank() -> None:
+    index = CandidateIndex(test_config, [("cat", ""), ("dog", ""), ("cart", ""), ("CAT", "")])
+    assert index.rank(test_config, ("cat", "")) == [0, 3, 2]
+    assert index.rank(test_config, ("xyz", "")) == []
+
+
+def test_arrange_many_choices(monkeypatch: pytest.MonkeyPatch) -> None:
+    correct = many_choices(50)
+    given = [("banan7", ""), ("apple12", ""), ("aple3", ""), ("cherry", "")]
+    budget = Budget()
+    result = to_basic_choices(arrange(test_config, given, correct, budget))
+    assert "candidate_index" in budget.stages
+
+    # Checking every pair gives the same result
+    monkeypatch.setattr(arrange_module, "candidate_index_min_choices", len(correct) + 1)
+    assert to_basic_choices(arrange(test_config, given, correct)) == result
+    assert result[:4] == [
+        ("banan7", ("banana7", "")),
+        ("apple12", ("apple12", "")),
+        ("aple3", ("apple3", "")),
+        ("cherry", ("apple0", "")),
+    ]
+
+
+def test_arrange_many_choices_fallback(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(arrange_module, "candidate_count", 1)
+    correct = [(f"{i:03}xyzw", "") for i in range(64)] + [("abcd", "")]
+
+    # The only candidate shares more bigrams, but "abcd" is a better match
+    budget = Budget()
+    result = to_basic_choices(arrange(test_config, [("xyzw abcd", "")], correct, budget))
+    assert result[0] == ("xyzw abcd", ("abcd", ""))
+    assert "candidate_index" not in budget.stages
+
+
+def test_arrange_many_choices_approximate(monkeypatch: pytest.MonkeyPatch) -> None:
+    # The closest choice has many other letters, so it shares fewer bigrams
+    # than the candidates which are only missing one letter
+    correct = [(f"abcdefg{i}", "") for i in range(1, arrange_module.candidate_count + 1)]
+    correct += [("abcdefghijklmnopqrstuvw", "")]
+    correct += [(f"zz{i}", "") for i in range(arrange_module.candidate_index_min_choices - len(correct))]
+    given: list[Choice] = [("abcdefgh", "")]
+
+    budget = Budget()
+    result = to_basic_choices(arrange(test_config, given, correct, budget))
+    assert "candidate_index" in budget.stages
+    assert result[0] == ("abcdefgh", ("abcdefg1", ""))
+
+    # Checking every pair finds the closest choice instead
+    monkeypatch.setattr(arrange_module, "candidate_index_min_choices", len(correct) + 1)
+    assert to_basic_choices(arrange(test_config, given, correct))[0] == ("abcdefgh", ("abcdefghijklmnopqrstuvw", ""))
+
+
+def test_arrange_choice_trie(monkeypatch: pytest.MonkeyPatch) -> None:
+    correct: list[Choice] = [("to run", ""), ("to ride", ""), ("to rise", ""), ("to rid", ""), ("to ruin", "")]
+    given: list[Choice] = [("to rize", ""), ("to rum", "")]
+    budget = Budget()
+    result = to_basic_choices(arrange(test_config, given, correct, budget))
+    assert "choice_trie" in budget.stages
+
+    # Diffing each pair separately gives the same result
+    monkeypatch.setattr(planner, "cost_model", replace(planner.default_cost_model, choice_trie_min_pairs=len(correct) + 1))
+    assert to_basic_choices(arrange(test_config, given, correct)) == result
+    assert result[:2] == [
+        ("to rize", ("to ride", "")),
+        ("to rum", ("to run", "")),
+    ]
@@ -0,0 +1,189 @@
+import io
+import json
+import sqlite3
+from pathlib import Path
+
+from answerset.audit import (
+    AnswerSource,
+    audit_answer,
+    audit_answers,
+    decode_template_question,
+    load_config,
+    main,
+    read_collection,
+    read_export,
+    strip_tags,
+)
+from answerset.config import Config
+
+test_config = Config()
+
+
+def encode_varint(value: int) -> bytes:
+    result = b""
+    while value >= 0x80:
+        result += bytes([value & 0x7F | 0x80])
+        value >>= 7
+    return result + bytes([value])
+
+
+def encode_template_config(qfmt: str) -> bytes:
+    qfmt_bytes = qfmt.encode("utf-8")
+    return (
+        # Unrelated fields before the question format are skipped
+        encode_varint(5 << 3 | 0)
+        + encode_varint(300)
+        + encode_varint(6 << 3 | 1)
+        + bytes(8)
+        + encode_varint(7 << 3 | 5)
+        + bytes(4)
+        + encode_varint(2 << 3 | 2)
+        + encode_varint(3)
+        + b"{{}"
+        + encode_varint(1 << 3 | 2)
+        + encode_varint(len(qfmt_bytes))
+        + qfmt_bytes
+    )
+
+
+def create_collection(path: Path) -> None:
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE notetypes (id INTEGER PRIMARY KEY, name TEXT, config BLOB);
+        CREATE TABLE fields (ntid INTEGER, ord INTEGER, name TEXT, config BLOB);
+        CREATE TABLE templates (ntid INTEGER, ord INTEGER, name TEXT, config BLOB);
+        CREATE TABLE notes (id INTEGER PRIMARY KEY, mid INTEGER, flds TEXT);
+    """)
+    db.executemany("INSERT INTO fields VALUES (?, ?, ?, '')", [(1, 0, "Front"), (1, 1, "Back"), (2, 0, "Text")])
+    db.executemany(
+        "INSERT INTO templates VALUES (?, ?, ?, ?)",
+        [
+            (1, 0, "Forward", encode_template_config("{{Front}}\n\n{{type:Back}}")),
+            (1, 1, "Reverse", encode_template_config("{{Back}}")),
+            (2, 0, "Cloze", encode_template_config("{{cloze:Text}} {{type:cloze:Text}}")),
+        ],
+    )
+    db.executemany(
+        "INSERT INTO notes VALUES (?, ?, ?)",
+        [
+            (10, 1, "go\x1fto go (somewhere)[sound:go.mp3]"),
+            (11, 1, "café\x1f"),
+            (12, 2, "{{c1::ignored}}"),
+        ],
+    )
+    db.commit()
+    db.close()
+
+
+def create_legacy_collection(path: Path) -> None:
+    models = {
+        "1": {
+            "flds": [{"name": "Front", "ord": 0}, {"name": "Back", "ord": 1}],
+            "tmpls": [{"qfmt": "{{Front}} {{type:nc:Back}}"}],
+        },
+    }
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE col (id INTEGER PRIMARY KEY, models TEXT);
+        CREATE TABLE notes (id INTEGER PRIMARY KEY, mid INTEGER, flds TEXT);
+    """)
+    db.execute("INSERT INTO col VALUES (1, ?)", (json.dumps(models),))
+    db.execute("INSERT INTO notes VALUES (20, 1, 'front\x1fa, b, c')")
+    db.commit()
+    db.close()
+
+
+def test_strip_tags() -> None:
+    assert strip_tags("<b>to go</b>[sound:go.mp3]<br>&amp; leave&nbsp;") == "to go & leave"
+
+
+def test_decode_template_question() -> None:
+    assert decode_template_question(encode_template_config("{{type:Back}} é")) == "{{type:Back}} é"
+    assert decode_template_question(b"") == ""
+    assert decode_template_question(encode_varint(3 << 3 | 3)) == ""
+
+
+def test_audit_answer() -> None:
+    report = audit_answer(test_config, AnswerSource(1, "Back", "to go (somewhere), leave"))
+    assert report.answer == "to go (somewhere), leave"
+    assert report.graphemes == 22
+    assert report.choices == 2
+    assert report.jumps == 1
+    assert report.estimated_cells == 24 * 24
+    assert report.problems == ()
+
+
+def test_audit_answer_problems() -> None:
+    report = audit_answer(test_config, AnswerSource(1, "Back", "to go (somewhere, leave"))
+    assert report.problems == ("unbalanced brackets",)
+
+
+def test_audit_answer_equivalence_hits() -> None:
+    config = Config({
+        "Equivalent Strings": [["colour", "color"]],
+    })
+    report = audit_answer(config, AnswerSource(1, "Back", "Colour or color"))
+    assert report.equivalence_hits == 2
+
+
+def test_read_collection(tmp_path: Path) -> None:
+    path = tmp_path / "collection.anki2"
+    create_collection(path)
+    assert list(read_collection(str(path))) == [AnswerSource(10, "Back", "to go (somewhere)[sound:go.mp3]")]
+
+
+def test_read_legacy_collection(tmp_path: Path) -> None:
+    path = tmp_path / "collection.anki2"
+    create_legacy_collection(path)
+    assert list(read_collection(str(path))) == [AnswerSource(20, "Back", "a, b, c")]
+
+
+def test_read_export() -> None:
+    file = io.StringIO('#separator:semicolon\n#html:true\nfront;"a; b"\nfront;\nfront\n')
+    assert list(read_export(file, 2)) == [AnswerSource(3, "2", "a; b")]
+
+
+def test_audit_answers_in_processes() -> None:
+    sources = [AnswerSource(i, "Back", f"answer {i}, other") for i in range(100)]
+    assert audit_answers(test_config, sources, jobs=2) == audit_answers(test_config, sources)
+
+
+def test_load_config(tmp_path: Path) -> None:
+    assert load_config(None) == Config()
+
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"Separators": "/"}), encoding="utf-8")
+    assert load_config(str(path)).separators == "/"
+
+    path = tmp_path / "meta.json"
+    path.write_text(json.dumps({"name": "answerset", "config": {"Separators": "|"}}), encoding="utf-8")
+    assert load_config(str(path)).separators == "|"
+
+
+def test_main_collection(tmp_path: Path) -> None:
+    path = tmp_path / "collection.anki2"
+    create_collection(path)
+
+    output = io.StringIO()
+    assert main([str(path), "--jobs", "1"], output) == 0
+    assert output.getvalue().splitlines()[:4] == [
+        "Audited 1 answers.",
+        "",
+        "Most expensive answers:",
+        "       cells graphemes choices jumps equiv  note / field / answer",
+    ]
+    assert "10 / Back / to go (somewhere)" in output.getvalue()
+
+
+def test_main_export(tmp_path: Path) -> None:
+    path = tmp_path / "notes.txt"
+    path.write_text("front\t(a]\nfront\tok\n", encoding="utf-8")
+
+    output = io.StringIO()
+    assert main([str(path), "--jobs", "1", "--json"], output) == 0
+    reports = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [report["problems"] for report in reports] == [["unbalanced brackets"], []]
+
+    output = io.StringIO()
+    assert main([str(path), "--jobs", "1", "--limit", "0"], output) == 0
+    assert output.getvalue() == "Audited 2 answers.\n\nAnswers which don't parse as expected:\n1 / 2 / (a]: unbalanced brackets\n"
@@ -0,0 +1,141 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from answerset import benchmark
+from answerset.benchmark import (
+    Measurement,
+    Regression,
+    Scenario,
+    build_scenarios,
+    compiled_module_names,
+    compiled_modules,
+    find_regressions,
+    is_compiled,
+    load_baseline,
+    main,
+    measure_scenarios,
+    memory_ceilings,
+    peak_kib,
+    python_version,
+    save_baseline,
+    write_report,
+)
+
+baseline = {
+    "diff": Measurement(10.0, 100.0),
+    "arrange": Measurement(20.0, 200.0),
+}
+
+
+@pytest.fixture
+def tiny_scenarios(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(benchmark, "build_scenarios", lambda: [Scenario("tiny", lambda: sum(range(100)))])
+
+
+def test_build_scenarios() -> None:
+    names = [scenario.name for scenario in build_scenarios()]
+    assert names == ["diff_short", "diff_long", "arrange", "compare_answer", "long_answer", "many_choices"]
+
+
+def test_scenarios_are_seeded() -> None:
+    assert build_scenarios()[0].run() == build_scenarios()[0].run()
+
+
+def test_measure_scenarios() -> None:
+    measurements = measure_scenarios([Scenario("tiny", lambda: [0] * 1000)], 2)
+    assert measurements["tiny"].relative_time > 0.0
+    assert measurements["tiny"].peak_kib > 0.0
+
+
+def test_peak_kib_counts_allocations() -> None:
+    assert peak_kib(lambda: [0] * 100000) > peak_kib(lambda: [0] * 100)
+
+
+def test_find_regressions_within_tolerance() -> None:
+    current = {"diff": Measurement(14.0, 120.0), "arrange": Measurement(10.0, 150.0)}
+    assert find_regressions(baseline, current) == []
+
+
+def test_find_regressions_slower() -> None:
+    current = {"diff": Measurement(16.0, 100.0), "arrange": Measurement(20.0, 260.0)}
+    assert find_regressions(baseline, current) == [
+        Regression("diff", "time", 10.0, 16.0),
+        Regression("arrange", "memory", 200.0, 260.0),
+    ]
+
+
+def test_find_regressions_tolerance() -> None:
+    current = {"diff": Measurement(14.0, 100.0)}
+    assert find_regressions(baseline, current, 1.2) == [Regression("diff", "time", 10.0, 14.0)]
+
+
+def test_find_regressions_new_scenario() -> None:
+    assert find_regressions(baseline, {"new": Measurement(1000.0, 1000.0)}) == []
+
+
+def test_find_regressions_memory_ceiling() -> None:
+    current = {"long_answer": Measurement(1.0, 10000.0)}
+    assert find_regressions({}, current) == [Regression("long_answer", "memory ceiling", 192.0, 10000.0)]
+
+
+@pytest.mark.parametrize("name", list(memory_ceilings))
+def test_memory_ceilings(name: str) -> None:
+    scenario = next(scenario for scenario in build_scenarios() if scenario.name == name)
+    assert peak_kib(scenario.run) <= memory_ceilings[name]
+
+
+def test_compiled_modules() -> None:
+    # Modules which aren't in the mypyc build are never compiled
+    assert not is_compiled("answerset.benchmark")
+    assert set(compiled_modules()) <= set(compiled_module_names)
+
+
+def test_save_and_load_baseline(tmp_path: Path) -> None:
+    path = str(tmp_path / "baseline.json")
+    save_baseline(path, {"diff": Measurement(1.23456, 5678.9)})
+    version, measurements = load_baseline(path)
+    assert version == benchmark.python_version()
+    assert measurements == {"diff": Measurement(1.235, 5679.0)}
+
+
+def test_write_report_regressions() -> None:
+    output = io.StringIO()
+    current = {"diff": Measurement(16.0, 100.0), "new": Measurement(1.0, 1.0)}
+    write_report(output, baseline, current, find_regressions(baseline, current))
+    assert "diff: time grew 1.60x (10.0 -> 16.0)" in output.getvalue()
+    assert "new" in output.getvalue()
+
+
+def test_main_update_and_check(tmp_path: Path, tiny_scenarios: None) -> None:
+    path = str(tmp_path / "baseline.json")
+    output = io.StringIO()
+    assert main([path, "--update", "--repeats", "2"], output) == 0
+    assert f"Saved to {path}" in output.getvalue()
+
+    output = io.StringIO()
+    assert main([path, "--repeats", "2", "--tolerance", "1000", "--memory-tolerance", "1000"], output) == 0
+    assert "No regressions." in output.getvalue()
+
+
+def test_main_fails_on_regression(tmp_path: Path, tiny_scenarios: None) -> None:
+    path = tmp_path / "baseline.json"
+    path.write_text(
+        json.dumps({"python": python_version(), "scenarios": {"tiny": {"relative_time": 0.0, "peak_kib": 0.0}}}),
+    )
+
+    output = io.StringIO()
+    assert main([str(path), "--repeats", "1"], output) == 1
+    assert "tiny: time grew" in output.getvalue()
+
+
+def test_main_skips_other_python_version(tmp_path: Path, tiny_scenarios: None) -> None:
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps({"python": "2.7", "scenarios": {"tiny": {"relative_time": 0.0, "peak_kib": 0.0}}}))
+
+    output = io.StringIO()
+    assert main([str(path), "--repeats", "1"], output) == 2
+    assert "saved with Python 2.7" in output.getvalue()
+    assert "tiny: time grew" not in output.getvalue()
@@ -0,0 +1,155 @@
+import time
+
+import pytest
+
+from answerset.budget import Budget, BudgetExceeded
+from answerset.compare import compare_answer_no_html, grade_answer
+from answerset.config import Config
+from answerset.diff import ChoicePair, ErrorKind, ErrorRange, diff, quick_diff
+
+test_config = Config()
+
+
+def expired_budget() -> Budget:
+    budget = Budget(max_seconds=1.0)
+    budget.deadline = time.monotonic() - 1.0
+    return budget
+
+
+def test_budget_unlimited() -> None:
+    budget = Budget()
+    assert budget.spend(10**12)
+    assert not budget.degraded
+
+
+def test_budget_size_limit() -> None:
+    budget = Budget(max_cells=100)
+    assert budget.spend(60)
+    assert not budget.spend(60)
+    assert budget.degraded
+
+    # Once degraded, no more full diffs are allowed
+    assert not budget.spend(1)
+
+
+def test_budget_deadline() -> None:
+    budget = expired_budget()
+    assert not budget.spend(1)
+    assert budget.degraded
+
+
+def test_budget_check_deadline() -> None:
+    budget = expired_budget()
+    with pytest.raises(BudgetExceeded):
+        budget.check_deadline()
+
+
+def test_budget_from_config() -> None:
+    config = Config({
+        "Comparison Size Limit": 0,
+        "Comparison Time Limit": 0,
+    })
+    budget = Budget.from_config(config)
+    assert budget.remaining_cells is None
+    assert budget.deadline is None
+
+
+def test_budget_off_by_default() -> None:
+    # Grading must not depend on how fast the computer is unless enabled
+    budget = Budget.from_config(Config())
+    assert budget.remaining_cells is None
+    assert budget.deadline is None
+
+
+def test_diff_expired_budget() -> None:
+    with pytest.raises(BudgetExceeded):
+        diff(test_config, list("abc"), list("abd"), expired_budget())
+
+
+def test_quick_diff_exact() -> None:
+    result = quick_diff(test_config, list("ABC"), list("abc"))
+    assert result.error_ranges == []
+
+
+def test_quick_diff_middle() -> None:
+    result = quick_diff(test_config, list("abxyzef"), list("abcdef"))
+    assert result.matched_count == 4
+    assert result.error_ranges == [ErrorRange((2, 4), (2, 5), True, ErrorKind.REGULAR)]
+
+
+def test_quick_diff_prefix_and_suffix_overlap() -> None:
+    result = quick_diff(test_config, list("aa"), list("aaa"))
+    assert result.matched_count == 2
+    assert result.error_ranges == [ErrorRange((2, 3), (2, 2), True, ErrorKind.REGULAR)]
+
+
+def test_quick_diff_missing_junk() -> None:
+    result = quick_diff(test_config, list("abc"), list("ab.c"))
+    assert result.error_ranges == [ErrorRange((2, 3), (2, 2), False, ErrorKind.REGULAR)]
+
+
+def test_choice_pair_over_budget() -> None:
+    pair = ChoicePair(test_config, ("abxyzef", ""), ("abcdef", ""), Budget(max_cells=10))
+    assert pair.error_ranges() == [ErrorRange((2, 4), (2, 5), True, ErrorKind.REGULAR)]
+
+
+def test_choice_pair_past_deadline() -> None:
+    budget = Budget(max_cells=1000)
+
+    # Make the deadline pass after the cells were reserved
+    budget.spend(1)
+    budget.deadline = time.monotonic() - 1.0
+
+    pair = ChoicePair(test_config, ("abxyzef", ""), ("abcdef", ""), budget)
+    assert pair.error_ranges() == [ErrorRange((2, 4), (2, 5), True, ErrorKind.REGULAR)]
+    assert budget.degraded
+
+
+def test_grade_answer_not_degraded() -> None:
+    result = grade_answer(test_config, "abc, def", "def, abd")
+    assert result.has_error
+    assert not result.degraded
+    assert result.html.startswith("<div id=typeans><code>")
+
+
+def test_grade_answer_degraded() -> None:
+    correct = "the quick brown fox jumps over the lazy dog"
+    given = "the quick brown cat jumps over the lazy dog"
+    config = Config({
+        "Comparison Size Limit": 100,
+    })
+    result = grade_answer(config, correct, given)
+    assert result.has_error
+    assert result.degraded
+    assert result.html == "<div id=typeans class=typeDegraded><code><span class=typeGood>the quick brown </span><span class=typeBad>cat</span><span class=typeGood> jumps over the lazy dog</span><br><span id=typearrow>&darr;</span><br><span class=typeGood>the quick brown </span><span class=typeMissed>fox</span><span class=typeGood> jumps over the lazy dog</span></code></div>"
+
+
+def test_grade_answer_degraded_exact_match() -> None:
+    correct = "the quick brown fox"
+    config = Config({
+        "Comparison Size Limit": 1,
+    })
+    result = grade_answer(config, correct, correct)
+    assert not result.has_error
+    assert not result.degraded
+
+
+def test_grade_answer_many_choices_degraded() -> None:
+    correct = ", ".join(f"word{i}/other{i}" for i in range(300))
+    given = ", ".join(f"wrd{i}" for i in range(300))
+    config = Config({
+        "Comparison Size Limit": 100000,
+        "Comparison Time Limit": 1.0,
+    })
+    start = time.monotonic()
+    result = grade_answer(config, correct, given)
+    assert result.degraded
+    assert time.monotonic() - start < 10.0
+
+
+def test_compare_answer_no_html_degraded() -> None:
+    config = Config({
+        "Comparison Size Limit": 1,
+    })
+    result = compare_answer_no_html(config, "abc", "abd")
+    assert "typeDegraded" in result
@@ -1,4 +1,20 @@
-from answerset.compare import compare_answer_no_html, split_comment
+import pytest
+
+from answerset import compare
+from answerset.compare import (
+    CompiledAnswer,
+    GivenAnswer,
+    GradedAnswer,
+    compare_answer_keys_no_html,
+    compare_answer_no_html,
+    compile_answer,
+    compile_answer_keys,
+    grade_answer,
+    grade_answer_keys,
+    grade_compiled_answer,
+    grade_compiled_answer_keys,
+    split_comment,
+)
 from answerset.config import Config
 
 test_config = Config()
@@ -171,3 +187,138 @@ def test_compare_duplicate_5() -> None:
     given = "aaa, bbb"
     result = compare_answer_no_html(test_config, correct, given)
     assert result == "<div id=typeans><code><span class=typeGood>aaa</span><span class=typeMissed>-</span></code>, <code><span class=typeGood>bbb</span><span class=typeMissed>.</span></code>, <code><span class=typeMissed>bbb-</span></code>, <code><span class=typeMissed>aaa.</span></code></div>"
+
+
+def test_compile_answer() -> None:
+    compiled = compile_answer(test_config_with_comments, "dog,  cat [animal] (pets)")
+    assert compiled.text == "dog, cat [animal]"
+    assert compiled.comment == " (pets)"
+    assert compiled.sep == ","
+    assert compiled.choices == [("dog", ""), ("cat", " [animal]")]
+
+
+def test_grade_compiled_answer_reused() -> None:
+    compiled = compile_answer(test_config, "depart, go, leave")
+    for given in ["leave, go", "go, depart, leave", "gone"]:
+        result = grade_compiled_answer(test_config, compiled, given)
+        assert result == grade_answer(test_config, "depart, go, leave", given)
+
+
+def test_grade_compiled_answer_exact_match() -> None:
+    correct = "Dog,  cat [animal] (pets)"
+    compiled = compile_answer(test_config_with_comments, correct)
+
+    # The exact match is only graded once it is given
+    assert compiled.exact is None
+    result = grade_compiled_answer(test_config_with_comments, compiled, "dog,  CAT [animal] (pets)")
+    assert result is compiled.exact
+    assert result.stages == frozenset({"exact_match"})
+    assert not result.has_error
+
+    # It is graded the same as the correct answer itself, whichever exact match came first
+    expected = grade_compiled_answer(test_config_with_comments, compile_answer(test_config_with_comments, correct), correct)
+    assert result.html == expected.html
+
+    for given in ["Dog, cat [animal] (pets)", "DOG, cat [animal] (pets)"]:
+        assert grade_compiled_answer(test_config_with_comments, compiled, given) is result
+
+
+def test_grade_answer_only_grades_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    graded = []
+    grade_given_answer = compare.grade_given_answer
+
+    def record_grade(config: Config, compiled: CompiledAnswer, given: GivenAnswer) -> GradedAnswer:
+        graded.append(given.text)
+        return grade_given_answer(config, compiled, given)
+
+    monkeypatch.setattr(compare, "grade_given_answer", record_grade)
+
+    # The correct answer isn't also graded against itself
+    grade_answer(test_config, "depart, go, leave", "leave, go")
+    assert graded == ["leave, go"]
+
+
+def test_grade_compiled_answer_exact_match_case_sensitive() -> None:
+    config = Config({"Ignore Case": False})
+    compiled = compile_answer(config, "Dog")
+    result = grade_compiled_answer(config, compiled, "dog")
+    assert result is not compiled.exact
+    assert result.has_error
+
+
+def test_grade_compiled_answer_exact_permutation() -> None:
+    correct = "abc, def [x], ghi (note)"
+    compiled = compile_answer(test_config_with_comments, correct)
+    for given in ["ghi, abc, def [x] (note)", "def, GHI, abc", "def [y], ghi, abc"]:
+        result = grade_compiled_answer(test_config_with_comments, compiled, given)
+        assert ("exact_permutation" in result.stages) == (given != "def [y], ghi, abc")
+        assert result == grade_answer(test_config_with_comments, correct, given)
+
+    assert compare_answer_no_html(test_config, "abc, def, ghi", "def, ghi, abc") == compare_answer_no_html(test_config, "abc, def, ghi", "def, ghi, abc,")
+
+
+def test_grade_compiled_answer_exact_permutation_numbers() -> None:
+    # Numbers are always matched by value instead
+    config = Config({
+        "Numeric Comparison Factor": 1.5,
+    })
+    result = grade_answer(config, "1, 2, 3", "3, 1, 2")
+    assert result.stages == frozenset({"numeric_arrange"})
+
+
+def test_grade_answer_keys_exact_match(monkeypatch: pytest.MonkeyPatch) -> None:
+    compiled = compile_answer_keys(test_config, ["colour, grey", "color, gray", "Color, Gray"])
+
+    # Exact matches don't need any comparisons
+    monkeypatch.setattr(compare, "grade_compiled_answer", None)
+    index, result = grade_compiled_answer_keys(test_config, compiled, "COLOR,  gray")
+    assert index == 1
+    assert result is compiled.answers[1].exact
+
+
+def test_grade_answer_keys_closest() -> None:
+    correct = ["colour, grey", "color, gray"]
+    for given, expected in [("gray, colr", 1), ("grey, colr", 0), ("grey", 0), ("gry", 1), ("", 0)]:
+        index, result = grade_answer_keys(test_config, correct, given)
+        assert index == expected
+        assert result == grade_answer(test_config, correct[expected], given)
+
+
+def test_grade_answer_keys_prefers_no_error() -> None:
+    correct = ["to go", "to go (somewhere)"]
+    index, result = grade_answer_keys(test_config, correct, "to go somewhere")
+    assert index == 1
+    assert not result.has_error
+
+
+def test_grade_answer_keys_pruned(monkeypatch: pytest.MonkeyPatch) -> None:
+    graded = []
+    original = compare.grade_compiled_answer
+
+    def grade_and_count(config: Config, compiled: compare.CompiledAnswer, given: str) -> compare.GradedAnswer:
+        graded.append(compiled.text)
+        return original(config, compiled, given)
+
+    monkeypatch.setattr(compare, "grade_compiled_answer", grade_and_count)
+    correct = ["a much longer answer than was given", "neighbour", "neighbor", "neighbours"]
+    compiled = compile_answer_keys(test_config, correct)
+    graded.clear()
+
+    # Once an answer without errors matches completely, the rest can be skipped
+    assert grade_compiled_answer_keys(test_config, compiled, "neighbor ")[0] == 2
+    assert graded == ["neighbour", "neighbor"]
+
+    # Answers with errors don't give a bound, so every answer is checked
+    graded.clear()
+    assert grade_compiled_answer_keys(test_config, compiled, "neighbr")[0] == 2
+    assert sorted(graded) == sorted(correct)
+
+
+def test_grade_answer_keys_no_keys() -> None:
+    with pytest.raises(ValueError):
+        compile_answer_keys(test_config, [])
+
+
+def test_compare_answer_keys_no_html() -> None:
+    result = compare_answer_keys_no_html(test_config, ["grey", "gray"], "gray")
+    assert result == compare_answer_no_html(test_config, "gray", "gray")
@@ -1,3 +1,8 @@
+import pickle
+from dataclasses import FrozenInstanceError
+
+import pytest
+
 from answerset.compare import compare_answer_no_html
 from answerset.config import Config
 
@@ -199,3 +204,85 @@ def test_separator_none() -> None:
     })
     result = compare_answer_no_html(config, correct, given)
     assert "typearrow" in result
+
+
+def test_config_immutable() -> None:
+    config = Config()
+    with pytest.raises(FrozenInstanceError):
+        config.ignore_case = False
+
+
+def test_config_fingerprint_equal() -> None:
+    config_1 = Config({
+        "Ignore Case": False,
+        "Numeric Comparison Factor": 2,
+    })
+    config_2 = Config({
+        "Numeric Comparison Factor": 2.0,
+        "Ignore Case": False,
+        "Unknown Option": True,
+    })
+    assert config_1.fingerprint == config_2.fingerprint
+    assert config_1 == config_2
+    assert hash(config_1) == hash(config_2)
+
+
+def test_config_fingerprint_different() -> None:
+    config_1 = Config()
+    config_2 = Config({
+        "Equivalent Strings": [
+            ["I am", "I'm"],
+        ],
+    })
+    assert config_1.fingerprint != config_2.fingerprint
+    assert config_1 != config_2
+
+
+def test_config_fingerprint_ignores_ungraded_options() -> None:
+    config_1 = Config()
+    config_2 = Config({
+        "Comparison Timings File": "timings.jsonl",
+        "Precompile Answers": True,
+        "Precompile Upcoming Cards": 5,
+        "Record Comparison Timings": True,
+    })
+    assert config_1 == config_2
+    assert config_2.precompile_answers
+    assert config_2.options["Precompile Upcoming Cards"] == 5
+
+
+def test_config_pickle() -> None:
+    config = Config({
+        "Equivalent Strings": [
+            ["I am", "I'm"],
+        ],
+        "Separators": ";",
+    })
+    unpickled = pickle.loads(pickle.dumps(config))
+    assert unpickled == config
+    assert unpickled.equivalent_strings == config.equivalent_strings
+    assert unpickled.separators == ";"
+
+
+def test_config_lookup_tables() -> None:
+    config = Config({
+        "Ignored Characters": "!",
+    })
+    assert config.junk_char_set == frozenset("!()[]")
+    assert config.bracket_char_set == frozenset("()[]")
+
+
+def test_config_equivalent_strings_index() -> None:
+    config = Config({
+        "Equivalent Strings": [
+            ["I am", "I'm", "Im"],
+        ],
+    })
+    index = config.equivalent_strings_index
+    assert sorted(index) == ["m"]
+    assert [("".join(a), ["".join(b) for b in bs]) for a, bs in index["m"]] == [
+        ("i am", ["i'm", "im"]),
+        ("i'm", ["i am", "im"]),
+        ("im", ["i am", "i'm"]),
+    ]
+    assert config.equivalent_strings_lookbehind == 4
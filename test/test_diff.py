@@ -0,0 +1,170 @@
+import time
+
+import pytest
+
+from answerset.budget import Budget, BudgetExceeded
+from answerset.config import Config
+from answerset.diff import ChoicePair, IncrementalDiff, compile_text, diff, diff_choice_pairs, diff_many
+from answerset.group import group_combining
+
+test_config = Config()
+
+numeric_config = Config({
+    "Numeric Comparison Factor": 1.5,
+})
+
+
+def full_diff(config: Config, given: str, correct: str) -> object:
+    return diff(config, group_combining(given), group_combining(correct))
+
+
+def test_incremental_diff_typing() -> None:
+    correct = "to go (somewhere) / leave"
+    incremental = IncrementalDiff(test_config, correct)
+    assert incremental.diff() == full_diff(test_config, "", correct)
+
+    given = ""
+    for ch in "to og somwhere":
+        given += ch
+        assert incremental.append(ch) == full_diff(test_config, given, correct)
+
+    # Only one new row is needed for each character
+    assert len(incremental.rows) == len(given) + 2
+
+
+def test_incremental_diff_delete() -> None:
+    correct = "colour"
+    incremental = IncrementalDiff(test_config, correct)
+    incremental.append("colr")
+    rows = incremental.rows[:5]
+
+    # Deleting a character only drops the last row
+    assert incremental.delete() == full_diff(test_config, "col", correct)
+    assert len(incremental.rows) == len(rows)
+    assert all(row is prev_row for row, prev_row in zip(incremental.rows, rows))
+    assert incremental.delete(10) == full_diff(test_config, "", correct)
+    assert incremental.append("colour").error_ranges == []
+
+
+def test_incremental_diff_numbers() -> None:
+    correct = "12 m"
+    incremental = IncrementalDiff(numeric_config, correct)
+
+    # The row for "1" can't be reused once it becomes part of "12"
+    assert incremental.append("1") == full_diff(numeric_config, "1", correct)
+    assert incremental.append("2") == full_diff(numeric_config, "12", correct)
+    assert incremental.append(" m").error_ranges == []
+
+
+def test_incremental_diff_case_folding() -> None:
+    correct = "strasse"
+    incremental = IncrementalDiff(test_config, correct)
+    incremental.append("stra")
+
+    # Typing "ß" adds a new equivalence for "ss"
+    assert incremental.append("ß") == full_diff(test_config, "straß", correct)
+    assert incremental.append("e").error_ranges == []
+
+
+def test_incremental_diff_combining() -> None:
+    correct = "café"
+    incremental = IncrementalDiff(Config({"Ignore Case": False}), "café")
+    incremental.append("cafe")
+
+    # A combining character changes the last grapheme instead of adding one
+    assert incremental.append("́").error_ranges == []
+    assert incremental.set_given(correct) == full_diff(Config({"Ignore Case": False}), correct, "café")
+
+
+def test_diff_many() -> None:
+    correct = "the mitochondria is the powerhouse of the cell"
+    given = [
+        "the mitochondria is the powerhose of the cell",
+        "the mitochondria is a power house",
+        "",
+        "the mitochondria",
+        "the mitochondria is the powerhose of the cell",
+        "THE MITOCHONDRIA IS STRAßE",
+    ]
+    result = diff_many(test_config, [group_combining(answer) for answer in given], group_combining(correct))
+    assert result == [full_diff(test_config, answer, correct) for answer in given]
+
+
+def test_diff_many_numbers() -> None:
+    correct = "12 m"
+    given = ["1", "12", "12 m", "120 m", "13 m"]
+    result = diff_many(numeric_config, [group_combining(answer) for answer in given], group_combining(correct))
+    assert result == [full_diff(numeric_config, answer, correct) for answer in given]
+
+
+def test_diff_many_expired_budget() -> None:
+    budget = Budget(max_seconds=1.0)
+    budget.deadline = time.monotonic() - 1.0
+    with pytest.raises(BudgetExceeded):
+        diff_many(test_config, [list("abc")], list("abd"), budget)
+
+
+def test_diff_choice_pairs() -> None:
+    given = "to rize"
+    correct = ["to run", "to ride", "to rise (up)", "to ride / go", "TO RISE", "straße", "strasse"]
+    pairs = [ChoicePair(test_config, (given, ""), (answer, "")) for answer in correct]
+
+    budget = Budget()
+    diff_choice_pairs(test_config, pairs, budget)
+    assert "choice_trie" in budget.stages
+    assert "lenient_jumps" in budget.stages
+
+    # Every pair is already diffed except the only one with "ß"
+    assert [pair.cached_diff is None for pair in pairs] == [False] * 5 + [True, False]
+    assert [pair.diff() for pair in pairs] == [full_diff(test_config, given, answer) for answer in correct]
+
+
+def test_diff_choice_pairs_numbers() -> None:
+    given = "12 m"
+    correct = ["1 m", "12 m", "120 m", "13 m", "12 km"]
+    pairs = [ChoicePair(numeric_config, (given, ""), (answer, "")) for answer in correct]
+
+    budget = Budget()
+    diff_choice_pairs(numeric_config, pairs, budget)
+    assert "numeric" in budget.stages
+    assert [pair.diff() for pair in pairs] == [full_diff(numeric_config, given, answer) for answer in correct]
+
+
+def test_diff_choice_pairs_empty_given() -> None:
+    pairs = [ChoicePair(test_config, ("", ""), (answer, "")) for answer in ("abc", "abd")]
+    diff_choice_pairs(test_config, pairs)
+    assert all(pair.cached_diff is None for pair in pairs)
+
+
+def test_diff_choice_pairs_over_budget() -> None:
+    pairs = [ChoicePair(test_config, ("abc", ""), (answer, "")) for answer in ("abd", "abe")]
+    budget = Budget(max_cells=10)
+    diff_choice_pairs(test_config, pairs, budget)
+    assert all(pair.cached_diff is None for pair in pairs)
+    assert budget.degraded
+
+
+def test_diff_choice_pairs_past_deadline(monkeypatch: pytest.MonkeyPatch) -> None:
+    pairs = [ChoicePair(test_config, ("abc", ""), (answer, "")) for answer in ("abd", "abe")]
+    budget = Budget(max_seconds=1.0)
+
+    # Make the deadline pass after the cells were reserved
+    checks = iter([False, True])
+    monkeypatch.setattr(Budget, "is_expired", lambda self: next(checks))
+
+    diff_choice_pairs(test_config, pairs, budget)
+    assert all(pair.cached_diff is None for pair in pairs)
+    assert budget.degraded
+
+
+def test_diff_records_compare_by_value() -> None:
+    first = full_diff(test_config, "to og", "to go (somewhere)")
+    second = full_diff(test_config, "to og", "to go (somewhere)")
+    assert first == second
+    assert hash(first) == hash(second)
+    assert repr(first) == repr(second)
+    assert first != full_diff(test_config, "to go", "to go (somewhere)")
+
+    given = compile_text(test_config, "to og", False)
+    assert given == compile_text.__wrapped__(test_config, "to og", False)
+    assert given != compile_text(test_config, "to go", False)
@@ -0,0 +1,164 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from answerset import compare
+from answerset.compare import grade_answer
+from answerset.config import Config
+from answerset.evaluate import (
+    affecting_options,
+    changed_options,
+    compare_verdicts,
+    equivalent_strings_changed,
+    evaluate_configs,
+    find_dependencies,
+    grade_pairs,
+    main,
+    read_pairs,
+    regrade_pairs,
+)
+
+test_configs = [
+    Config(),
+    Config({"Ignore Case": False}),
+    Config({"Numeric Comparison Factor": 1.5}),
+    Config({"Separators": ";"}),
+]
+
+test_pairs = [
+    ("Paris", "paris"),
+    ("5 m", "6 m"),
+    ("to go, to leave", "to leave, to go"),
+    ("to go, to leave", "to go"),
+    ("color (US)", "colour"),
+]
+
+
+def test_evaluate_configs_same_as_grading() -> None:
+    for evaluation in evaluate_configs(test_configs, test_pairs):
+        assert len(evaluation.results) == len(test_configs)
+        for config, result in zip(test_configs, evaluation.results):
+            assert result.html == grade_answer(config, evaluation.correct, evaluation.given).html
+
+
+def test_evaluate_configs_shares_parsing(monkeypatch: pytest.MonkeyPatch) -> None:
+    parsed = []
+    original = compare.parse_answer
+
+    def parse_and_count(config: Config, correct: str) -> compare.CompiledAnswer:
+        parsed.append(correct)
+        return original(config, correct)
+
+    monkeypatch.setattr("answerset.evaluate.parse_answer", parse_and_count)
+    list(evaluate_configs(test_configs, [("to go, to leave", "to go"), ("to go, to leave", "to leave")]))
+
+    # Only the config with different separators needs to split answers again
+    assert parsed == ["to go, to leave", "to go, to leave"]
+
+
+def test_evaluate_configs_reuses_results() -> None:
+    evaluations = list(evaluate_configs(test_configs, test_pairs))
+
+    # Only the answer with a number can be affected by the numeric options
+    reused = [evaluation.results[2] is evaluation.results[0] for evaluation in evaluations]
+    assert reused == [True, False, True, True, True]
+
+
+def test_find_dependencies() -> None:
+    result = grade_answer(test_configs[0], "Straße, go", "strasse")
+    dependencies = find_dependencies("Straße, go", "strasse", result)
+    assert {"ß", "s", "S", ","} <= dependencies.chars
+    assert "ß" in dependencies.correct_chars
+    assert dependencies.has_case
+    assert dependencies.cell_count == result.cell_count > 0
+    assert not dependencies.degraded
+
+
+def test_changed_options() -> None:
+    old = Config()
+    new = Config({"Ignore Case": False, "Record Comparison Timings": True})
+    assert changed_options(old, new) == ["Ignore Case"]
+
+    dependencies = find_dependencies("abc", "abd", grade_answer(old, "abc", "abd"))
+    assert affecting_options(dependencies, old, new) == []
+    assert affecting_options(dependencies, old, Config({"Separators": "b"})) == ["Separators"]
+
+
+def test_equivalent_strings_reordered() -> None:
+    old = Config({"Equivalent Strings": [["colour", "color"], ["grey", "gray"], ["a", "b"]]})
+    new = Config({"Equivalent Strings": [["grey", "gray"], ["colour", "color"], ["a", "b"]]})
+    assert set(equivalent_strings_changed(old, new)) == {"color", "colour", "gray", "grey"}
+    assert equivalent_strings_changed(old, old) == []
+
+    dependencies = find_dependencies("grey", "gray", grade_answer(old, "grey", "gray"))
+    assert affecting_options(dependencies, old, new) == ["Equivalent Strings"]
+
+
+def test_regrade_pairs_numeric() -> None:
+    old = Config()
+    new = Config({"Numeric Comparison Factor": 1.5})
+    graded = list(grade_pairs(old, test_pairs))
+    regraded = list(regrade_pairs(old, new, graded))
+
+    assert [pair is old_pair for pair, old_pair in zip(regraded, graded)] == [True, False, True, True, True]
+    assert regraded[1].result == grade_answer(new, "5 m", "6 m")
+
+
+def test_regrade_pairs_same_as_grading() -> None:
+    configs = [
+        Config(),
+        Config({"Ignore Case": False}),
+        Config({"Ignored Characters": " "}),
+        Config({"Equivalent Strings": [["colour", "color"]]}),
+        Config({"Enable Lenient Validation": False}),
+        Config({"Enable Answer Comments (...)": True}),
+        Config({"Comparison Size Limit": 10}),
+    ]
+    pairs = [*test_pairs, ("to-go", "togo"), ("colour", "color"), ("a/b (c)", "a"), ("abc", "ABC")]
+
+    for old in configs:
+        graded = list(grade_pairs(old, pairs))
+        for new in configs:
+            for pair in regrade_pairs(old, new, graded):
+                assert pair.result.html == grade_answer(new, pair.correct, pair.given).html
+
+
+def test_compare_verdicts() -> None:
+    evaluations = list(evaluate_configs(test_configs, test_pairs))
+
+    baseline = compare_verdicts(evaluations, 0)
+    assert baseline.accepted == 3
+    assert not baseline.newly_accepted
+    assert not baseline.newly_rejected
+    assert baseline.changed_html == 0
+
+    case_sensitive = compare_verdicts(evaluations, 1)
+    assert case_sensitive.accepted == 2
+    assert [evaluation.given for evaluation in case_sensitive.newly_rejected] == ["paris"]
+
+    # Close numbers are still shown as errors
+    numeric = compare_verdicts(evaluations, 2)
+    assert numeric.accepted == 3
+    assert numeric.changed_html == 1
+
+
+def test_read_pairs() -> None:
+    assert list(read_pairs(io.StringIO("a\tb\nno tab\nc\td\textra\n"))) == [("a", "b"), ("c", "d")]
+
+
+def test_main(tmp_path: Path) -> None:
+    pairs_path = tmp_path / "answers.txt"
+    pairs_path.write_text("".join(f"{correct}\t{given}\n" for correct, given in test_pairs), encoding="utf-8")
+
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({"Ignore Case": False}), encoding="utf-8")
+
+    output = io.StringIO()
+    assert main([str(pairs_path), "--config", str(config_path)], output) == 0
+    lines = output.getvalue().splitlines()
+    assert lines[0] == "Evaluated 5 answers."
+    assert lines[3].split() == ["default", "3", "0", "0", "0"]
+    assert lines[4].split() == [str(config_path), "2", "0", "1", "1"]
+    assert lines[-1] == "- Paris / paris"
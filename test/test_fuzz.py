@@ -0,0 +1,189 @@
+import io
+import os
+import random
+import subprocess
+import sys
+from typing import Optional, Union
+
+import pytest
+
+from answerset import diff
+from answerset.arrange import UnmatchedChoice, arrange_numbers
+from answerset.benchmark import is_compiled
+from answerset.budget import Budget
+from answerset.compare import compare_answer_no_html
+from answerset.config import Config
+from answerset.diff import (
+    Choice,
+    ChoicePair,
+    Diff,
+    compile_text,
+    diff_compiled,
+    diff_engine_env_var,
+    get_diff_engine,
+    register_diff_engine,
+)
+from answerset.fuzz import fast_paths, fuzz_engines, main, mutate_answer, random_answer
+
+test_config = Config()
+
+
+def empty_engine(config: Config, given_text: object, correct_text: object, budget: object) -> Diff:
+    return Diff(0, 0, [], None)
+
+
+@pytest.fixture
+def broken_engine(monkeypatch: pytest.MonkeyPatch) -> str:
+    monkeypatch.setattr(diff, "diff_engines", dict(diff.diff_engines))
+    monkeypatch.setattr("answerset.fuzz.diff_engines", diff.diff_engines)
+    register_diff_engine("broken", empty_engine)
+    return "broken"
+
+
+def test_default_engine_is_reference(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(diff, "diff_engine_override", "")
+    assert get_diff_engine(test_config) is diff_compiled
+
+
+def test_engine_from_config(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(diff, "diff_engine_override", "")
+    assert get_diff_engine(Config({"Diff Engine": "full_rows"})) is diff.diff_compiled_full_rows
+
+
+def test_engine_from_environment(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(diff, "diff_engine_override", "full_rows")
+    assert get_diff_engine(Config({"Diff Engine": "reference"})) is diff.diff_compiled_full_rows
+
+
+def test_environment_is_read_on_import() -> None:
+    code = "from answerset import diff; print(diff.diff_engine_override)"
+    env = {**os.environ, diff_engine_env_var: "full_rows"}
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True, env=env).stdout
+    assert output.strip() == "full_rows"
+
+
+def test_unknown_engine_is_reference(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(diff, "diff_engine_override", "missing")
+    assert get_diff_engine(test_config) is diff_compiled
+
+
+def test_reference_engine_cannot_be_replaced() -> None:
+    with pytest.raises(ValueError):
+        register_diff_engine("reference", empty_engine)
+
+
+def test_selected_engine_is_used(monkeypatch: pytest.MonkeyPatch, broken_engine: str) -> None:
+    monkeypatch.setattr(diff, "diff_engine_override", broken_engine)
+    assert ChoicePair(test_config, ("ab", ""), ("abc", "")).diff() == Diff(0, 0, [], None)
+    assert diff.diff(test_config, ["a"], ["b"]) == Diff(0, 0, [], None)
+
+
+def test_selected_engine_skips_choice_trie(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(diff, "diff_engine_override", "full_rows")
+    budget = Budget()
+    pairs = [ChoicePair(test_config, ("abx", ""), (correct, ""), budget) for correct in ["abc", "abd", "abe", "abf"]]
+    diff.diff_choice_pairs(test_config, pairs, budget)
+    assert all(pair.cached_diff is None for pair in pairs)
+    assert "choice_trie" not in budget.stages
+
+
+def test_full_rows_engine_compares_answers(monkeypatch: pytest.MonkeyPatch) -> None:
+    correct = "start(ing), set in one's/my ways, 12"
+    given = "starting, set in my ways, 13"
+    expected = compare_answer_no_html(test_config, correct, given)
+
+    monkeypatch.setattr(diff, "diff_engine_override", "full_rows")
+    assert compare_answer_no_html(test_config, correct, given) == expected
+
+
+def test_full_rows_engine_records_stages() -> None:
+    budget = Budget()
+    config = Config({"Numeric Comparison Factor": 1.0})
+    diff.diff_compiled_full_rows(config, compile_text(config, "12", False), compile_text(config, "(a) 1", True), budget)
+    assert budget.stages == {"numeric", "lenient_jumps"}
+
+
+def test_full_rows_engine_empty_given() -> None:
+    expected = diff_compiled(test_config, compile_text(test_config, "", False), compile_text(test_config, "ab", True))
+    assert diff.diff_compiled_full_rows(test_config, compile_text(test_config, "", False), compile_text(test_config, "ab", True)) == expected
+
+
+def test_random_answers_are_seeded() -> None:
+    first = [random_answer(random.Random(3)) for _ in range(5)]
+    second = [random_answer(random.Random(3)) for _ in range(5)]
+    assert first == second
+
+
+def test_mutate_answer_uses_equivalences() -> None:
+    rng = random.Random(0)
+    assert any("i'm" in mutate_answer(rng, "i am here") for _ in range(20))
+
+
+def test_fuzz_engines_match_reference() -> None:
+    report = fuzz_engines(0, 100)
+    assert report.rounds == 100
+    assert set(report.seconds) == set(diff.diff_engines)
+    assert report.mismatches == []
+    assert report.relative_speed("reference") == 1.0
+
+
+def test_fuzz_fast_paths_are_checked() -> None:
+    report = fuzz_engines(0, 50)
+    assert set(report.fast_path_checks) == set(fast_paths)
+    assert all(count > 0 for count in report.fast_path_checks.values())
+
+
+def empty_numeric_diff(config: Config, given_range: object, correct_range: object) -> Diff:
+    return Diff(0, 0, [], None)
+
+
+def reversed_arrange_numbers(config: Config, given: list[Choice], correct: list[Choice]) -> Optional[list[Union[ChoicePair, UnmatchedChoice]]]:
+    # Checks the "correct" parts in the wrong order, so ties go to the wrong part
+    return arrange_numbers(config, given, correct[::-1])
+
+
+def empty_choice_pairs(config: Config, pairs: list[ChoicePair]) -> None:
+    for pair in pairs:
+        pair.cached_diff = Diff(0, 0, [], None)
+
+
+@pytest.mark.parametrize(
+    ("name", "target", "broken"),
+    [
+        ("choice_trie", "answerset.fuzz.diff_choice_pairs", empty_choice_pairs),
+        ("diff_many", "answerset.fuzz.diff_many", lambda config, given, correct: [Diff(0, 0, [], None)] * len(given)),
+        # Compiled classes and modules can't have their functions replaced
+        pytest.param(
+            "incremental",
+            "answerset.diff.IncrementalDiff.diff",
+            lambda self: Diff(0, 0, [], None),
+            marks=pytest.mark.skipif(is_compiled("answerset.diff"), reason="answerset.diff is compiled"),
+        ),
+        ("numbers", "answerset.fuzz.arrange_numbers", reversed_arrange_numbers),
+        pytest.param(
+            "numbers",
+            "answerset.arrange.numeric_diff",
+            empty_numeric_diff,
+            marks=pytest.mark.skipif(is_compiled("answerset.arrange"), reason="answerset.arrange is compiled"),
+        ),
+    ],
+)
+def test_fuzz_fast_paths_find_mismatches(monkeypatch: pytest.MonkeyPatch, name: str, target: str, broken: object) -> None:
+    monkeypatch.setattr(target, broken)
+    report = fuzz_engines(0, 20, [], [name])
+    assert report.mismatches
+    assert all(mismatch.engine == name for mismatch in report.mismatches)
+
+
+def test_main_reports_speed() -> None:
+    output = io.StringIO()
+    assert main(["--rounds", "10", "--engine", "full_rows"], output) == 0
+    assert "Compared 10 random answers." in output.getvalue()
+    assert "full_rows" in output.getvalue()
+
+
+def test_main_reports_mismatches(broken_engine: str) -> None:
+    output = io.StringIO()
+    assert main(["--rounds", "10", "--engine", broken_engine, "--limit", "1"], output) == 1
+    assert "didn't match the reference engine" in output.getvalue()
+    assert output.getvalue().count("expected:") == 1
@@ -0,0 +1,33 @@
+from answerset.group import group_combining, has_multiple_chars
+
+
+def test_group_combining_empty() -> None:
+    assert group_combining("") == []
+
+
+def test_group_combining_ascii() -> None:
+    assert group_combining("abc") == ["a", "b", "c"]
+
+
+def test_group_combining_no_combining() -> None:
+    assert group_combining("ßøé") == ["ß", "ø", "é"]
+
+
+def test_group_combining_tamil() -> None:
+    assert group_combining("திரும்பு") == ["தி", "ரு", "ம்", "பு"]
+
+
+def test_group_combining_leading_combining() -> None:
+    assert group_combining("\u0301\u0302\u00e1") == ["\xa0\u0301\u0302", "\u00e1"]
+
+
+def test_group_combining_cached_copy() -> None:
+    result = group_combining("திரு")
+    result.append("x")
+    assert group_combining("திரு") == ["தி", "ரு"]
+
+
+def test_has_multiple_chars() -> None:
+    assert has_multiple_chars("ss")
+    assert not has_multiple_chars("á")
+    assert not has_multiple_chars("a")
@@ -0,0 +1,257 @@
+from concurrent.futures import Future
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+from answerset import hooks
+from answerset.compare import CompiledAnswer, compile_answer
+from answerset.config import Config
+
+if TYPE_CHECKING:
+    from .conftest import FakeAnki
+
+
+def test_install_hooks(fake_anki: "FakeAnki") -> None:
+    hooks.install_hooks()
+    assert vars(fake_anki.Reviewer)["correct"] is hooks.correct
+    assert vars(fake_anki.Collection)["compare_answer"] is hooks.compare_answer
+
+
+def test_compare_answer(fake_anki: "FakeAnki") -> None:
+    hooks.install_hooks()
+    collection: Any = fake_anki.Collection()
+    result = collection.compare_answer("<b>depart</b>, go[sound:go.mp3]", "go, depart")
+    assert result == hooks.new_css + "<div id=typeans><code><span class=typeGood>go</span></code>, <code><span class=typeGood>depart</span></code></div>"
+
+
+def test_reviewer_correct(fake_anki: "FakeAnki") -> None:
+    hooks.install_hooks()
+    reviewer: Any = fake_anki.Reviewer()
+    result = reviewer.correct("go", "go", showBad=True)
+    assert result == hooks.new_css + "<div id=typeans><code><span class=typeGood>go</span></code></div>"
+
+
+def test_user_config(fake_anki: "FakeAnki") -> None:
+    fake_anki.mw.addonManager.config = {
+        "Ignore Case": False,
+    }
+    assert not hooks.get_user_config().ignore_case
+
+    # The config is only loaded once
+    fake_anki.mw.addonManager.config = {}
+    assert not hooks.get_user_config().ignore_case
+
+
+def test_user_config_without_anki() -> None:
+    assert hooks.get_config().ignore_case
+
+
+def test_compiled_answer_cache(fake_anki: "FakeAnki") -> None:
+    hooks.install_hooks()
+    collection: Any = fake_anki.Collection()
+    expected = "<b>depart</b>, go[sound:go.mp3]"
+
+    first = collection.compare_answer(expected, "go")
+    second = collection.compare_answer(expected, "go")
+    assert first == second
+    assert fake_anki.mw.col.media.strip_count == 1
+    assert list(hooks.compiled_answer_cache) == [expected]
+
+
+def test_compiled_answer_cache_eviction(fake_anki: "FakeAnki", monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(hooks, "compiled_answer_cache_size", 2)
+
+    hooks.get_compiled_answer("a")
+    hooks.get_compiled_answer("b")
+    hooks.get_compiled_answer("a")
+    hooks.get_compiled_answer("c")
+    assert list(hooks.compiled_answer_cache) == ["a", "c"]
+
+
+def test_config_updated(fake_anki: "FakeAnki") -> None:
+    hooks.install_hooks()
+    collection: Any = fake_anki.Collection()
+    assert "typearrow" not in collection.compare_answer("Go", "go")
+
+    fake_anki.mw.addonManager.writeConfig(hooks.addon_name, {"Ignore Case": False})
+    assert not hooks.compiled_answer_cache
+    assert "typearrow" in collection.compare_answer("Go", "go")
+
+
+def test_config_updated_ungraded_option(fake_anki: "FakeAnki") -> None:
+    hooks.install_hooks()
+    hooks.get_compiled_answer("go")
+
+    # Answers don't need to be compiled again if grading didn't change
+    fake_anki.mw.addonManager.writeConfig(hooks.addon_name, {"Precompile Answers": True})
+    assert list(hooks.compiled_answer_cache) == ["go"]
+    assert hooks.get_user_config().precompile_answers
+
+
+def wait_for_precompiling() -> None:
+    if hooks.executor is not None:
+        hooks.executor.shutdown(wait=True)
+
+
+def test_precompile_disabled(fake_anki: "FakeAnki") -> None:
+    hooks.install_hooks()
+    fake_anki.mw.reviewer.typeCorrect = "depart, go"
+    fake_anki.reviewer_did_show_question(fake_anki.Card(1, "{{type:Back}}", {"Back": "depart, go"}))
+    assert hooks.executor is None
+    assert not hooks.compiled_answer_cache
+
+
+def test_precompile_current_card(fake_anki: "FakeAnki") -> None:
+    fake_anki.mw.addonManager.config = {
+        "Precompile Answers": True,
+    }
+    hooks.install_hooks()
+
+    fake_anki.mw.reviewer.typeCorrect = "depart, go[sound:go.mp3]"
+    fake_anki.reviewer_did_show_question(fake_anki.Card(1, "{{type:Back}}", {"Back": "depart, go[sound:go.mp3]"}))
+    wait_for_precompiling()
+    assert list(hooks.compiled_answer_cache) == ["depart, go[sound:go.mp3]"]
+    assert not hooks.pending_answers
+
+    # Comparing the answer doesn't need to compile it again
+    collection: Any = fake_anki.Collection()
+    assert "typearrow" not in collection.compare_answer("depart, go[sound:go.mp3]", "go, depart")
+    assert fake_anki.mw.col.media.strip_count == 1
+
+
+def test_precompile_upcoming_cards(fake_anki: "FakeAnki") -> None:
+    fake_anki.mw.addonManager.config = {
+        "Precompile Answers": True,
+        "Precompile Upcoming Cards": 3,
+    }
+    hooks.install_hooks()
+
+    current = fake_anki.Card(1, "{{Front}} {{type:Back}}", {"Front": "a", "Back": "one"})
+    fake_anki.mw.col.sched.queue = [
+        current,
+        fake_anki.Card(2, "{{type:nc:Back}}", {"Back": "two"}),
+        fake_anki.Card(3, "{{cloze:Text}} {{type:cloze:Text}}", {"Text": "{{c1::three}}"}),
+        fake_anki.Card(4, "{{type:Missing}}", {"Back": "four"}),
+        fake_anki.Card(5, "{{type:Back}}", {"Back": "five"}),
+    ]
+    fake_anki.mw.reviewer.typeCorrect = "one"
+    fake_anki.reviewer_did_show_question(current)
+    wait_for_precompiling()
+    assert sorted(hooks.compiled_answer_cache) == ["one", "two"]
+
+
+def test_precompile_upcoming_cards_old_scheduler(fake_anki: "FakeAnki", monkeypatch: pytest.MonkeyPatch) -> None:
+    fake_anki.mw.addonManager.config = {
+        "Precompile Answers": True,
+        "Precompile Upcoming Cards": 3,
+    }
+    hooks.install_hooks()
+
+    # Schedulers before v3 can't list upcoming cards
+    monkeypatch.delattr(type(fake_anki.mw.col.sched), "get_queued_cards")
+
+    current = fake_anki.Card(1, "{{type:Back}}", {"Back": "one"})
+    fake_anki.mw.reviewer.typeCorrect = "one"
+    fake_anki.reviewer_did_show_question(current)
+    wait_for_precompiling()
+    assert list(hooks.compiled_answer_cache) == ["one"]
+
+
+def test_precompile_already_cached(fake_anki: "FakeAnki") -> None:
+    fake_anki.mw.addonManager.config = {
+        "Precompile Answers": True,
+    }
+    hooks.get_compiled_answer("go")
+    hooks.precompile_answer("go")
+    assert hooks.executor is None
+
+
+def test_get_compiled_answer_pending(fake_anki: "FakeAnki") -> None:
+    compiled = compile_answer(Config(), "go")
+    future: Future[CompiledAnswer] = Future()
+    future.set_result(compiled)
+    hooks.pending_answers["<b>go</b>"] = future
+
+    assert hooks.get_compiled_answer("<b>go</b>") is compiled
+    assert fake_anki.mw.col.media.strip_count == 0
+
+
+def test_get_compiled_answer_pending_failed(fake_anki: "FakeAnki") -> None:
+    future: Future[CompiledAnswer] = Future()
+    future.set_exception(ValueError())
+    hooks.pending_answers["<b>go</b>"] = future
+
+    assert hooks.get_compiled_answer("<b>go</b>").text == "go"
+    assert fake_anki.mw.col.media.strip_count == 1
+
+
+def test_precompile_config_updated(fake_anki: "FakeAnki") -> None:
+    future: Future[CompiledAnswer] = Future()
+    hooks.pending_answers["go"] = future
+
+    hooks.on_config_updated({})
+    assert future.cancelled()
+    assert not hooks.pending_answers
+
+    # A result from before the config was updated is ignored
+    hooks.finish_precompiling("go", future)
+    assert not hooks.compiled_answer_cache
+
+
+def test_record_timings_disabled(fake_anki: "FakeAnki") -> None:
+    hooks.install_hooks()
+    collection: Any = fake_anki.Collection()
+    collection.compare_answer("go", "go")
+    assert hooks.latency_recorder is None
+
+
+def test_record_timings(fake_anki: "FakeAnki", tmp_path: Path) -> None:
+    path = tmp_path / "timings" / "timings.jsonl"
+    fake_anki.mw.addonManager.config = {
+        "Record Comparison Timings": True,
+        "Comparison Timings File": str(path),
+    }
+    hooks.install_hooks()
+
+    collection: Any = fake_anki.Collection()
+    collection.compare_answer("hello, world", "hello world")
+    reviewer: Any = fake_anki.Reviewer()
+    reviewer.correct("go", "go")
+
+    recorder = hooks.latency_recorder
+    assert recorder is not None
+    assert recorder.summary()["count"] == 2
+
+    slowest = {record.answer: record for record in recorder.slowest_records()}
+    assert slowest["hello, world"].given_graphemes == 11
+    assert slowest["hello, world"].correct_graphemes == 12
+    assert slowest["hello, world"].given_choices == 1
+    assert slowest["hello, world"].correct_choices == 2
+    assert slowest["hello, world"].stages == ("separator_retry", "unsplit")
+    assert slowest["go"].stages == ("exact_match",)
+
+    # Updating the config closes the file and starts a new recorder
+    fake_anki.mw.addonManager.writeConfig(hooks.addon_name, {})
+    assert hooks.latency_recorder is None
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_show_timings_disabled(fake_anki: "FakeAnki") -> None:
+    hooks.install_hooks()
+    [action] = fake_anki.mw.form.menuTools.actions
+    action.trigger()
+    assert "Record Comparison Timings" in fake_anki.shown_text[0]
+
+
+def test_show_timings(fake_anki: "FakeAnki") -> None:
+    fake_anki.mw.addonManager.config = {"Record Comparison Timings": True}
+    hooks.install_hooks()
+
+    collection: Any = fake_anki.Collection()
+    collection.compare_answer("hello, world", "hello world")
+
+    [action] = fake_anki.mw.form.menuTools.actions
+    action.trigger()
+    assert "Answers checked: 1" in fake_anki.shown_text[0]
+    assert "'hello, world'" in fake_anki.shown_text[0]
@@ -0,0 +1,46 @@
+import json
+import subprocess
+import sys
+
+fake_anki_setup = """
+import types
+
+for name in ["aqt", "aqt.reviewer", "anki", "anki.collection", "anki.utils"]:
+    sys.modules[name] = types.ModuleType(name)
+
+sys.modules["aqt"].mw = None
+sys.modules["aqt.reviewer"].Reviewer = type("Reviewer", (), {})
+sys.modules["anki.collection"].Collection = type("Collection", (), {})
+sys.modules["anki.utils"].html_to_text_line = lambda html: html
+"""
+
+
+def import_package(setup: str = "") -> list[str]:
+    """Import the package in a new interpreter and find which modules were loaded."""
+
+    code = f"""
+import json
+import sys
+{setup}
+import answerset
+print(json.dumps(sorted(name for name in sys.modules if name.startswith("answerset"))))
+"""
+
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    modules: list[str] = json.loads(output)
+    return modules
+
+
+def test_import_library() -> None:
+    assert import_package() == ["answerset"]
+
+
+def test_import_addon() -> None:
+    assert import_package(fake_anki_setup) == ["answerset", "answerset.hooks"]
+
+
+def test_lazy_attributes() -> None:
+    import answerset
+
+    config = answerset.Config()
+    assert "typearrow" not in answerset.compare_answer_no_html(config, "abc", "abc")
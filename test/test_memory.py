@@ -0,0 +1,31 @@
+import io
+
+from answerset.config import Config
+from answerset.memory import main, profile_answer, short_location
+
+test_config = Config()
+
+
+def test_profile_answer() -> None:
+    profile = profile_answer(test_config, "depart, go, leave", "leave, go, left", 5)
+    assert profile.peak_kib > 0.0
+    assert 0 < len(profile.sites) <= 5
+    assert all(site.kib > 0.0 and site.count > 0 for site in profile.sites)
+    assert all("memory.py" not in site.location for site in profile.sites)
+
+
+def test_profile_answer_sites_are_largest_first() -> None:
+    profile = profile_answer(test_config, "a long answer " * 10, "a lung answer " * 10)
+    sizes = [site.kib for site in profile.sites]
+    assert sizes == sorted(sizes, reverse=True)
+
+
+def test_short_location() -> None:
+    assert short_location("/home/user/answerset/diff.py", 42) == "answerset/diff.py:42"
+
+
+def test_main() -> None:
+    output = io.StringIO()
+    assert main(["start(ing)", "starting", "--limit", "3"], output) == 0
+    assert output.getvalue().startswith("Peak memory: ")
+    assert "Largest allocations near the peak:" in output.getvalue()
@@ -1,3 +1,5 @@
+import pytest
+
 from answerset.compare import compare_answer_no_html
 from answerset.config import Config
 from answerset.numeric import NumericRange, find_numeric_ranges
@@ -216,3 +218,140 @@ def test_number_string_comparison_with_factor() -> None:
     given = "the answer is 12.0"
     result = compare_answer_no_html(factor(0.0), correct, given)
     assert result == "<div id=typeans><code><span class=typeGood>the answer is 1</span><span class=typeBad>2.</span><span class=typeGood>0</span><span class=typeBad>-</span><br><span id=typearrow>&darr;</span><br><span class=typeGood>the answer is 1</span><span class=typeGood>0</span><span class=typeMissed>?1.2</span></code></div>"
+
+
+extended_config = Config({
+    "Numeric Comparison Factor": 1.0,
+    "Numeric Negative Numbers": True,
+    "Numeric Scientific Notation": True,
+    "Numeric Thousands Separators": ",'",
+    "Separators": ";",
+})
+
+
+def test_parse_negative_number() -> None:
+    answer = "-5 and −2.5"
+    result = [NumericRange(0, 2, 2, -5, None), NumericRange(7, 11, 11, -2.5, None)]
+    assert find_numeric_ranges(list(answer), False, extended_config) == result
+
+
+def test_parse_negative_number_disabled() -> None:
+    answer = "-5"
+    result = [NumericRange(1, 2, 2, 5, None)]
+    assert find_numeric_ranges(list(answer), False, factor(1.0)) == result
+
+
+def test_parse_hyphen_not_negative() -> None:
+    answer = "10-12"
+    result = [NumericRange(0, 2, 2, 10, None), NumericRange(3, 5, 5, 12, None)]
+    assert find_numeric_ranges(list(answer), False, extended_config) == result
+
+
+def test_parse_scientific_notation() -> None:
+    answer = "6.02e23 1E-9?2"
+    result = [NumericRange(0, 7, 7, 6.02e23, None), NumericRange(8, 12, 14, 1e-9, 2.0)]
+    assert find_numeric_ranges(list(answer), True, extended_config) == result
+
+
+def test_parse_scientific_notation_not_exponent() -> None:
+    answer = "3em"
+    result = [NumericRange(0, 1, 1, 3, None)]
+    assert find_numeric_ranges(list(answer), False, extended_config) == result
+
+
+def test_parse_thousands_separators() -> None:
+    answer = "1,234,567.5 1'000"
+    result = [NumericRange(0, 11, 11, 1234567.5, None), NumericRange(12, 17, 17, 1000, None)]
+    assert find_numeric_ranges(list(answer), False, extended_config) == result
+
+
+def test_parse_thousands_separators_invalid_group() -> None:
+    answer = "1,23 1,2345"
+    result = [
+        NumericRange(0, 1, 1, 1, None),
+        NumericRange(2, 4, 4, 23, None),
+        NumericRange(5, 6, 6, 1, None),
+        NumericRange(7, 11, 11, 2345, None),
+    ]
+    assert find_numeric_ranges(list(answer), False, extended_config) == result
+
+
+def test_parse_combined_characters() -> None:
+    answer = ["1", "2\u0301", "3"]
+    result = [NumericRange(0, 1, 1, 1, None), NumericRange(2, 3, 3, 3, None)]
+    assert find_numeric_ranges(answer, False) == result
+
+
+def test_parse_too_many_digits() -> None:
+    answer = "1" * 5000
+    assert find_numeric_ranges(list(answer), False) == []
+
+
+negative_config = Config({
+    "Numeric Comparison Factor": 1.1,
+    "Numeric Negative Numbers": True,
+})
+
+
+def test_numeric_range_negative_inexact_match() -> None:
+    correct = NumericRange(0, 0, 0, -100, None)
+    given = NumericRange(0, 0, 0, -105, None)
+    assert correct.accepts(given, negative_config)
+    assert given.accepts(correct, negative_config)
+
+
+def test_numeric_range_negative_too_different() -> None:
+    correct = NumericRange(0, 0, 0, -100, None)
+    given = NumericRange(0, 0, 0, -1, None)
+    assert not correct.accepts(given, negative_config)
+    assert not given.accepts(correct, negative_config)
+
+
+def test_numeric_range_opposite_signs() -> None:
+    positive = NumericRange(0, 0, 0, 4, None)
+    negative = NumericRange(0, 0, 0, -4, None)
+    assert not positive.accepts(negative, negative_config)
+    assert not negative.accepts(positive, negative_config)
+    assert not positive.accepts(negative, factor(0.5))
+
+
+def test_numeric_range_zero() -> None:
+    zero = NumericRange(0, 0, 0, 0, None)
+    small = NumericRange(0, 0, 0, -0.001, None)
+    assert not zero.accepts(small, negative_config)
+    assert not small.accepts(zero, negative_config)
+    assert zero.accepts(NumericRange(0, 0, 0, 0.0, None), negative_config)
+
+
+def test_number_negative_minor_error() -> None:
+    result = compare_answer_no_html(negative_config, "-100 m", "-105 m")
+    assert "typePass" in result
+    assert "typeBad" not in result
+
+
+@pytest.mark.parametrize(
+    ("correct", "given"),
+    [
+        ("-100 m", "-1 m"),
+        ("-4 m", "4 m"),
+        ("4 m", "-4 m"),
+    ],
+)
+def test_number_negative_wrong_with_factor(correct: str, given: str) -> None:
+    result = compare_answer_no_html(negative_config, correct, given)
+    assert "typePass" not in result
+    assert "typeBad" in result or "typeMissed" in result
+
+
+def test_number_negative_wrong() -> None:
+    correct = "-5 m/s"
+    given = "5 m/s"
+    result = compare_answer_no_html(extended_config, correct, given)
+    assert result == "<div id=typeans><code><span class=typeBad>5</span><span class=typeGood> m/s</span><br><span id=typearrow>&darr;</span><br><span class=typeMissed>-5</span><span class=typeGood> m/s</span></code></div>"
+
+
+def test_number_scientific_notation_exact() -> None:
+    correct = "1e3 J"
+    given = "1,000 J"
+    result = compare_answer_no_html(extended_config, correct, given)
+    assert "typearrow" not in result
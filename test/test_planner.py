@@ -0,0 +1,134 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from answerset import diff as diff_module
+from answerset import planner
+from answerset.budget import Budget
+from answerset.config import Config
+from answerset.diff import ChoicePair, compile_text, quick_diff
+from answerset.planner import (
+    CostModel,
+    default_cost_model,
+    estimate_seconds,
+    is_over_budget,
+    load_cost_model,
+    main,
+    save_cost_model,
+)
+
+test_config = Config()
+
+test_model = CostModel(1.0, 1.0, 1.0, 1.0, 4)
+
+
+def estimate(config: Config, given: str, correct: str) -> float:
+    return estimate_seconds(config, compile_text(config, given, False), [compile_text(config, correct, True)], 100, test_model)
+
+
+def test_estimate_seconds_plain() -> None:
+    assert estimate(test_config, "abcd", "abcd") == 100.0
+
+
+def test_estimate_seconds_jumps() -> None:
+    # One jump for the brackets in four characters
+    assert estimate(test_config, "abcd", "(ab)") == 125.0
+
+
+def test_estimate_seconds_equivalences() -> None:
+    config = Config({"Equivalent Strings": [["a", "b"]]})
+    assert estimate(config, "abcd", "abcd") == 150.0
+
+
+def test_estimate_seconds_numeric() -> None:
+    config = Config({"Numeric Comparison Factor": 1.5})
+    assert estimate(config, "1 2", "1 2") == pytest.approx(100.0 + 100.0 * 2 / 3)
+
+
+def test_is_over_budget() -> None:
+    assert not is_over_budget(10.0, None)
+    assert not is_over_budget(1.5, 1.0)
+    assert is_over_budget(2.5, 1.0)
+
+
+def test_budget_spend_planned_quick() -> None:
+    budget = Budget(0, 1.0)
+    assert budget.spend(100, 0.1)
+    assert not budget.degraded
+
+    assert not budget.spend(100, 10.0)
+    assert budget.degraded
+    assert "planned_quick" in budget.stages
+
+
+def test_choice_pair_planned_quick(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(planner, "cost_model", CostModel(1.0, 0.0, 0.0, 0.0, 4))
+    budget = Budget(0, 1.0)
+    pair = ChoicePair(test_config, ("abcdef", ""), ("abcxyz", ""), budget)
+    assert pair.diff() == quick_diff(test_config, pair.given, pair.correct)
+    assert budget.stages == {"planned_quick"}
+
+
+def test_save_and_load_cost_model(tmp_path: Path) -> None:
+    path = str(tmp_path / "user_files" / "planner.json")
+    assert save_cost_model(test_model, path) == path
+    assert load_cost_model(path) == test_model
+
+
+def test_load_cost_model_invalid(tmp_path: Path) -> None:
+    assert load_cost_model(str(tmp_path / "missing.json")) == default_cost_model
+
+    path = tmp_path / "planner.json"
+    path.write_text(json.dumps({"seconds_per_cell": 1.0}), encoding="utf-8")
+    assert load_cost_model(str(path)) == default_cost_model
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        ["not", "an", "object"],
+        {"seconds_per_cell": "fast", "jump_weight": 1.0, "equivalence_weight": 1.0, "numeric_weight": 1.0, "choice_trie_min_pairs": 4},
+        {"seconds_per_cell": 0.0, "jump_weight": 1.0, "equivalence_weight": 1.0, "numeric_weight": 1.0, "choice_trie_min_pairs": 4},
+        {"seconds_per_cell": 1.0, "jump_weight": -1.0, "equivalence_weight": 1.0, "numeric_weight": 1.0, "choice_trie_min_pairs": 4},
+        {"seconds_per_cell": 1.0, "jump_weight": 1.0, "equivalence_weight": None, "numeric_weight": 1.0, "choice_trie_min_pairs": 4},
+        {"seconds_per_cell": 1.0, "jump_weight": 1.0, "equivalence_weight": 1.0, "numeric_weight": 1.0, "choice_trie_min_pairs": 2.5},
+        {"seconds_per_cell": 1.0, "jump_weight": 1.0, "equivalence_weight": 1.0, "numeric_weight": 1.0, "choice_trie_min_pairs": True},
+    ],
+)
+def test_load_cost_model_wrong_types(tmp_path: Path, values: object) -> None:
+    path = tmp_path / "planner.json"
+    path.write_text(json.dumps(values), encoding="utf-8")
+    assert load_cost_model(str(path)) == default_cost_model
+
+
+def test_default_cost_model_can_plan_quick() -> None:
+    # A diff of a few million cells can't finish within a one second limit
+    given_text = compile_text(test_config, "a" * 2000, False)
+    correct_text = compile_text(test_config, "b" * 2000, True)
+    cells = 2001 * 2001
+    estimate = estimate_seconds(test_config, given_text, [correct_text], cells, default_cost_model)
+    assert is_over_budget(estimate, 1.0)
+
+
+def test_no_estimate_without_deadline(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fail(*args: object) -> float:
+        raise AssertionError("estimated without a deadline")
+
+    monkeypatch.setattr(diff_module, "estimate_seconds", fail)
+    budget = Budget(max_cells=1000)
+    pair = ChoicePair(test_config, ("abcdef", ""), ("abcxyz", ""), budget)
+    pair.diff()
+    assert budget.spent_cells == 7 * 7
+
+
+def test_main(tmp_path: Path) -> None:
+    path = tmp_path / "planner.json"
+    output = io.StringIO()
+    assert main(["--output", str(path), "--rounds", "1"], output) == 0
+    assert output.getvalue().endswith(f"Saved to {path}\n")
+
+    model = load_cost_model(str(path))
+    assert model.seconds_per_cell > 0.0
+    assert 2 <= model.choice_trie_min_pairs <= 16
@@ -0,0 +1,156 @@
+from typing import Any
+
+import pytest
+
+from answerset import stats
+from answerset.arrange import arrange
+from answerset.benchmark import is_compiled
+from answerset.compare import compare_answer_no_html
+from answerset.config import Config
+from answerset.diff import ChoicePair, Diff, compile_text, diff
+from answerset.fuzz import fuzz_equivalent_strings
+from answerset.group import group_combining
+from answerset.stats import DiffStats, collect_stats
+
+test_config = Config()
+
+
+@pytest.fixture
+def created_diffs(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    """Count every Diff which is actually created."""
+
+    created = [0]
+    init = Diff.__init__
+
+    def counting_init(self: Diff, *args: Any) -> None:
+        created[0] += 1
+        init(self, *args)
+
+    monkeypatch.setattr(Diff, "__init__", counting_init)
+    return created
+
+
+def test_off_by_default() -> None:
+    assert stats.current is None
+    diff(test_config, list("abc"), list("abd"))
+    assert stats.current is None
+
+
+def test_counts_cells() -> None:
+    with collect_stats() as counts:
+        diff(test_config, list("ab"), list("abc"))
+
+    # Every cell except the one for both empty prefixes
+    assert counts.cells == 3 * 4 - 1
+    assert counts.transitions["missing"] == 3 * 3
+    assert counts.transitions["wrong"] == 2 * 4
+    assert counts.transitions["match"] == 2
+
+
+def test_counts_jumps() -> None:
+    with collect_stats() as counts:
+        diff(test_config, list("a"), list("a(b)"))
+
+    # One jump for the brackets in each of the 2 rows
+    assert counts.transitions["jump"] == 2
+
+
+def test_counts_equivalences() -> None:
+    config = Config({"Equivalent Strings": [["ab", "c"]]})
+    with collect_stats() as counts:
+        diff(config, list("ab"), list("c"))
+
+    assert counts.transitions["equivalence"] == 1
+
+
+def test_counts_numeric() -> None:
+    config = Config({"Numeric Comparison Factor": 1.5})
+    with collect_stats() as counts:
+        diff(config, list("12"), list("13"))
+
+    assert counts.transitions["numeric"] == 1
+
+
+def test_counts_factor_skips() -> None:
+    config = Config({"Numeric Comparison Factor": 1.5})
+    with collect_stats() as counts:
+        diff(config, list("12"), list("13?2"))
+
+    assert counts.transitions["factor_skip"] > 0
+
+
+# Compiled classes can't have their methods replaced
+@pytest.mark.skipif(is_compiled("answerset.diff"), reason="answerset.diff is compiled")
+@pytest.mark.parametrize(
+    ("config", "given", "correct"),
+    [
+        (test_config, "starting", "start(ing)"),
+        (test_config, "set in my ways", "set in one's/my ways"),
+        (Config({"Equivalent Strings": fuzz_equivalent_strings}), "i'm here", "I am here"),
+        (Config({"Numeric Comparison Factor": 1.5}), "12 or 20", "13?2 or 2"),
+        (test_config, "", "abc"),
+    ],
+)
+def test_counts_created_diffs(config: Config, given: str, correct: str, created_diffs: list[int]) -> None:
+    given_chars = group_combining(given)
+    correct_chars = group_combining(correct)
+
+    with collect_stats() as counts:
+        diff(config, given_chars, correct_chars)
+
+    assert counts.diffs_created == created_diffs[0]
+
+
+def test_counts_pairs_and_cache_hits() -> None:
+    given = [("abc", ""), ("abx", "")]
+    correct = [("abd", ""), ("abe", "")]
+
+    with collect_stats() as counts:
+        arrange(test_config, given, correct)
+
+    assert counts.pairs_diffed > 0
+    assert counts.cache_hits["choice_pair"] > 0
+    assert counts.cache_hits["diff"] > 0
+
+
+def test_counts_choice_pair_diffs() -> None:
+    pair = ChoicePair(test_config, ("ab", ""), ("ac", ""))
+    with collect_stats() as counts:
+        pair.diff()
+        pair.diff()
+
+    assert counts.pairs_diffed == 1
+    assert counts.cache_hits["diff"] == 1
+
+
+def test_counts_compiled_text_cache_hits() -> None:
+    compile_text(test_config, "stats test", True)
+    with collect_stats() as counts:
+        compile_text(test_config, "stats test", True)
+
+    assert counts.cache_hits["compiled_text"] == 1
+
+
+def test_nested_stats_are_added() -> None:
+    with collect_stats() as outer:
+        diff(test_config, list("a"), list("a"))
+        with collect_stats() as inner:
+            diff(test_config, list("b"), list("b"))
+        assert stats.current is outer
+
+    assert inner.cells == 3
+    assert outer.cells == 6
+    assert stats.current is None
+
+
+def test_stats_do_not_change_results() -> None:
+    correct = "start(ing), set in one's/my ways, 12"
+    given = "starting, my ways, 13"
+    expected = compare_answer_no_html(test_config, correct, given)
+
+    with collect_stats():
+        assert compare_answer_no_html(test_config, correct, given) == expected
+
+
+def test_repr() -> None:
+    assert repr(DiffStats()).startswith("DiffStats(cells=0, transitions={'missing': 0")
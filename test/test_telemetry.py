@@ -0,0 +1,109 @@
+import json
+from pathlib import Path
+
+from answerset.compare import grade_answer
+from answerset.config import Config
+from answerset.telemetry import ComparisonRecord, LatencyRecorder
+
+
+def make_record(milliseconds: float, answer: str = "abc") -> ComparisonRecord:
+    return ComparisonRecord(milliseconds, answer, 3, 3, 1, 1, (), False)
+
+
+def test_percentiles() -> None:
+    recorder = LatencyRecorder()
+    for i in range(100):
+        recorder.record(make_record(0.1 if i < 90 else 3.0))
+
+    summary = recorder.summary()
+    assert summary["count"] == 100
+    assert summary["p50"] == 0.125
+    assert summary["p90"] == 0.125
+    assert summary["p99"] == 3.0
+    assert summary["max"] == 3.0
+
+
+def test_percentiles_empty() -> None:
+    recorder = LatencyRecorder()
+    assert recorder.summary() == {
+        "count": 0,
+        "mean": 0.0,
+        "p50": 0.0,
+        "p90": 0.0,
+        "p99": 0.0,
+        "max": 0.0,
+    }
+
+
+def test_percentiles_over_largest_bucket() -> None:
+    recorder = LatencyRecorder()
+    recorder.record(make_record(100000.0))
+    assert recorder.percentile(50) == 100000.0
+
+
+def test_slowest_records() -> None:
+    recorder = LatencyRecorder(slowest_count=2)
+    for milliseconds in (5.0, 1.0, 7.0, 3.0):
+        recorder.record(make_record(milliseconds, str(milliseconds)))
+
+    assert [record.answer for record in recorder.slowest_records()] == ["7.0", "5.0"]
+
+
+def test_report() -> None:
+    recorder = LatencyRecorder()
+    recorder.record(make_record(2.5, "slow"))
+    recorder.record(ComparisonRecord(0.5, "fast", 4, 5, 1, 2, ("numeric",), False))
+
+    assert recorder.report().splitlines() == [
+        "Answers checked: 2",
+        "Mean time: 1.50 ms",
+        "50% of answers: at most 0.50 ms",
+        "90% of answers: at most 2.50 ms",
+        "99% of answers: at most 2.50 ms",
+        "Slowest answer: 2.50 ms",
+        "",
+        "Slowest answers:",
+        "2.50 ms: 'slow' (3 given and 3 correct characters, stages: none)",
+        "0.50 ms: 'fast' (4 given and 5 correct characters, stages: numeric)",
+    ]
+
+
+def test_timings_file(tmp_path: Path) -> None:
+    path = tmp_path / "timings.jsonl"
+    recorder = LatencyRecorder(str(path))
+    recorder.record(make_record(2.5, "café"))
+    recorder.close()
+
+    (line,) = path.read_text(encoding="utf-8").splitlines()
+    assert json.loads(line) == {
+        "milliseconds": 2.5,
+        "answer": "café",
+        "given_graphemes": 3,
+        "correct_graphemes": 3,
+        "given_choices": 1,
+        "correct_choices": 1,
+        "stages": [],
+        "degraded": False,
+    }
+
+
+def test_stages_none() -> None:
+    assert grade_answer(Config(), "abc", "abd").stages == frozenset()
+
+
+def test_stages_lenient_jumps() -> None:
+    assert grade_answer(Config(), "to go (somewhere)", "to go").stages == frozenset({"lenient_jumps"})
+
+
+def test_stages_numeric() -> None:
+    config = Config({
+        "Numeric Comparison Factor": 1.5,
+    })
+    assert grade_answer(config, "5 m", "6 m").stages == frozenset({"numeric"})
+    assert grade_answer(config, "5, 7", "7, 6").stages == frozenset({"numeric_arrange"})
+
+
+def test_stages_separator_retry() -> None:
+    result = grade_answer(Config(), "hello, world", "hello world")
+    assert result.stages == frozenset({"separator_retry", "unsplit"})
+    assert result.given_choice_count == 1
@@ -1,4 +1,11 @@
-from answerset.util import find_bracket_ranges
+from answerset.util import (
+    find_bracket_ranges,
+    find_indices,
+    find_separator_indices,
+    range_depths,
+    split_at_indices,
+    split_except_for_ranges,
+)
 
 
 def visualize_range(input: str, bracket_ranges: list[tuple[int, int]]) -> str:
@@ -80,3 +87,42 @@ def test_find_bracket_ranges_lenient_3() -> None:
     string = "a(bc (d[e)f] gh)i"
     result = "-----------------"
     assert visualize_range(string, find_bracket_ranges(string, lenient=True, nested=True)) == result
+
+
+def test_range_depths_empty() -> None:
+    assert range_depths(3, []) == [0, 0, 0]
+
+
+def test_range_depths_nested() -> None:
+    string = "a(b[c]d)e"
+    assert range_depths(len(string), find_bracket_ranges(string, nested=True)) == [0, 1, 1, 2, 2, 2, 1, 1, 0]
+
+
+def test_find_indices_except_for_ranges() -> None:
+    string = "a,b (c,d), e"
+    assert find_indices(string, ",", find_bracket_ranges(string)) == [1, 9]
+
+
+def test_find_separator_indices() -> None:
+    string = "a,b; (c;d), e"
+    result = {",": [1, 10], ";": [3]}
+    assert find_separator_indices(string, ";,", find_bracket_ranges(string)) == result
+
+
+def test_find_separator_indices_no_ranges() -> None:
+    string = "a,b;c"
+    result = {",": [1], ";": [3]}
+    assert find_separator_indices(string, ";,", []) == result
+
+
+def test_split_at_indices() -> None:
+    assert split_at_indices("a,b;c", [1, 3]) == ["a", "b", "c"]
+
+
+def test_split_except_for_ranges() -> None:
+    string = "a, (b, c), d"
+    assert split_except_for_ranges(string, ",", find_bracket_ranges(string)) == ["a", " (b, c)", " d"]
+
+
+def test_split_except_for_ranges_no_separator() -> None:
+    assert split_except_for_ranges("a, b", None, []) == ["a, b"]